@@ -0,0 +1,145 @@
+"""
+Compara la latencia de los repositorios con cada backend de base de datos:
+    supabase  HTTP -> PostgREST -> Postgres (JSON)
+    postgres  conexión directa con asyncpg (DATABASE_URL)
+
+Cada backend se mide en un subproceso propio (DB_BACKEND se lee al importar los
+repositorios) con las mismas consultas de lectura, incluida la más pesada:
+obtener_registros_por_rango con el personal embebido.
+
+Para medir contra una BD local en lugar de Supabase, crear las tablas con
+migrations/ y cargar datos sintéticos con --preparar (solo backend postgres):
+    DATABASE_URL=postgresql://postgres@localhost/postgres python benchmark_backends.py --preparar 200 --dias 31
+
+Uso:
+    python benchmark_backends.py                          # ambos backends
+    python benchmark_backends.py --backends postgres --repeticiones 50
+"""
+import argparse
+import asyncio
+import json
+import os
+import subprocess
+import sys
+import time
+from datetime import date, datetime, timedelta, timezone
+
+import numpy as np
+
+BACKENDS = ["supabase", "postgres"]
+TIPOS = ["ENTRADA_M", "SALIDA_M", "ENTRADA_T", "SALIDA_T"]
+
+
+async def preparar(personas: int, dias: int):
+    """Inserta personal y asistencias sintéticas con el backend postgres."""
+    from repository.postgres.consultas import insertar
+
+    sufijo = int(time.time())
+    personal = await insertar("personal", [
+        {
+            "dni": f"B{sufijo % 100000:05d}{i:05d}",
+            "nombre": f"Persona{i}",
+            "apellido_paterno": "Benchmark",
+            "apellido_materno": "Sintetico",
+            "email": f"benchmark{sufijo}_{i}@example.com",
+            "password_hash": "-",
+        }
+        for i in range(personas)
+    ])
+    fin = date.today()
+    filas = []
+    for p in personal:
+        for d in range(dias):
+            fecha = fin - timedelta(days=d)
+            for h, tipo in enumerate(TIPOS):
+                filas.append({
+                    "personal_id": p["id"],
+                    "fecha": fecha.isoformat(),
+                    "marca_tiempo": datetime(fecha.year, fecha.month, fecha.day, 8 + h * 3, tzinfo=timezone.utc).isoformat(),
+                    "tipo_registro": tipo,
+                    "estado": "A TIEMPO",
+                })
+    for i in range(0, len(filas), 5000):
+        await insertar("asistencias", filas[i:i + 5000])
+    print(f"Insertados {len(personal)} registros de personal y {len(filas)} asistencias")
+
+
+async def medir(repeticiones: int, dias: int) -> list[dict]:
+    from repository.asistencia_repository import AsistenciaRepository
+    from repository.personal_repository import PersonalRepository
+
+    hoy = date.today()
+    personal = await PersonalRepository.find_all() or []
+    personal_id = personal[0]["id"] if personal else "00000000-0000-0000-0000-000000000000"
+
+    consultas = {
+        "obtener_registros_del_dia": lambda: AsistenciaRepository.obtener_registros_del_dia(personal_id, hoy),
+        "personal.find_by_id": lambda: PersonalRepository.find_by_id(personal_id),
+        "personal.find_all": PersonalRepository.find_all,
+        "obtener_registros_por_rango": lambda: AsistenciaRepository.obtener_registros_por_rango(hoy - timedelta(days=dias - 1), hoy),
+    }
+
+    resultados = []
+    for nombre, consulta in consultas.items():
+        filas = len(await consulta() or [])  # calentamiento (conexión y sentencia preparada)
+        latencias = np.empty(repeticiones)
+        for i in range(repeticiones):
+            inicio = time.perf_counter()
+            await consulta()
+            latencias[i] = time.perf_counter() - inicio
+        resultados.append({
+            "consulta": nombre,
+            "filas": filas,
+            "p50_ms": round(float(np.percentile(latencias, 50)) * 1000, 3),
+            "p99_ms": round(float(np.percentile(latencias, 99)) * 1000, 3),
+        })
+
+    from config.postgresClient import cerrar_pool
+    await cerrar_pool()
+    return resultados
+
+
+def ejecutar_backend(backend: str, args) -> list[dict]:
+    env = dict(os.environ, DB_BACKEND=backend)
+    proceso = subprocess.run(
+        [sys.executable, __file__, "--interno", "--repeticiones", str(args.repeticiones), "--dias", str(args.dias)],
+        env=env, capture_output=True, text=True,
+    )
+    if proceso.returncode != 0:
+        print(f"  {backend}: error\n{proceso.stderr.strip()}")
+        return []
+    return json.loads(proceso.stdout.strip().splitlines()[-1])
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Compara los backends de base de datos de los repositorios")
+    parser.add_argument("--backends", nargs="+", choices=BACKENDS, default=BACKENDS)
+    parser.add_argument("--repeticiones", type=int, default=20, help="Ejecuciones medidas por consulta")
+    parser.add_argument("--dias", type=int, default=31, help="Días del rango de obtener_registros_por_rango (y de --preparar)")
+    parser.add_argument("--preparar", type=int, metavar="N", help="Cargar N personas sintéticas en DATABASE_URL")
+    parser.add_argument("--salida", default="benchmark_backends.json", help="Archivo JSON de resultados")
+    parser.add_argument("--interno", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.interno:
+        print(json.dumps(asyncio.run(medir(args.repeticiones, args.dias))))
+        sys.exit(0)
+
+    if args.preparar:
+        os.environ["DB_BACKEND"] = "postgres"
+        asyncio.run(preparar(args.preparar, args.dias))
+
+    resultados = {}
+    for backend in args.backends:
+        print(f"Backend {backend}")
+        resultados[backend] = ejecutar_backend(backend, args)
+        for r in resultados[backend]:
+            print(f"  {r['consulta']:30s} filas={r['filas']:6d} p50={r['p50_ms']:9.3f}ms p99={r['p99_ms']:9.3f}ms")
+
+    with open(args.salida, "w", encoding="utf-8") as f:
+        json.dump({
+            "fecha": datetime.now().isoformat(timespec="seconds"),
+            "parametros": {"repeticiones": args.repeticiones, "dias": args.dias},
+            "resultados": resultados,
+        }, f, indent=2, ensure_ascii=False)
+    print(f"Resultados guardados en {args.salida}")
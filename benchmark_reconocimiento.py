@@ -0,0 +1,227 @@
+"""
+Benchmark del reconocimiento facial con galerías sintéticas.
+
+Construye galerías de N plantillas (varias por persona, agrupadas alrededor de un
+centro por persona, como los embeddings reales) y mide para cada modo de búsqueda:
+latencia p50/p99 por consulta, consultas por segundo, memoria de los vectores (e
+índice), tiempo de construcción y precisión top-1 (personal_id correcto).
+
+Modos:
+    loop     recorrido Python registro por registro (implementación original de
+             /asistencia/realtime, como referencia)
+    float32  FaceGallery, escaneo vectorizado exacto
+    float16  FaceGallery cuantizada a float16
+    int8     FaceGallery cuantizada a int8 con escala por fila
+    ann      FaceGallery float32 con índice IVF (incluye recall contra float32)
+
+Uso:
+    python benchmark_reconocimiento.py
+    python benchmark_reconocimiento.py --tamanos 1000 10000 --modos float32 ann --salida resultados.json
+    python benchmark_reconocimiento.py --comparar base.json     # falla si p50 empeora más de la tolerancia
+"""
+import argparse
+import json
+import math
+import platform
+import sys
+import time
+from datetime import datetime
+
+import numpy as np
+
+from services.face_gallery import FaceGallery
+from services.face_index_ivf import IndiceIVF
+
+MODOS = ["loop", "float32", "float16", "int8", "ann"]
+_LOTE_CONSTRUCCION = 10000
+
+
+def generar_galeria(filas: int, dim: int, por_persona: int, dispersion: float, rng):
+    """Centros por persona y plantillas = centro + ruido (ya normalizadas)."""
+    personas = max(1, filas // por_persona)
+    centros = rng.standard_normal((personas, dim)).astype(np.float32)
+    centros /= np.linalg.norm(centros, axis=1, keepdims=True)
+    duenos = np.arange(filas) % personas
+    plantillas = centros[duenos] + rng.normal(scale=dispersion / math.sqrt(dim), size=(filas, dim)).astype(np.float32)
+    plantillas /= np.linalg.norm(plantillas, axis=1, keepdims=True)
+    return centros, duenos, plantillas
+
+
+def generar_consultas(centros, cantidad: int, dispersion: float, rng):
+    personas = rng.integers(0, centros.shape[0], size=cantidad)
+    dim = centros.shape[1]
+    consultas = centros[personas] + rng.normal(scale=dispersion / math.sqrt(dim), size=(cantidad, dim)).astype(np.float32)
+    return personas, consultas
+
+
+def construir_galeria(precision: str, duenos, plantillas) -> FaceGallery:
+    gallery = FaceGallery(precision)
+    gallery.construir([])
+    # Por lotes para no materializar todas las plantillas como listas Python a la vez
+    for i in range(0, plantillas.shape[0], _LOTE_CONSTRUCCION):
+        gallery.agregar([
+            {"id": f"e{j}", "personal_id": f"p{duenos[j]}", "embedding": plantillas[j].tolist()}
+            for j in range(i, min(i + _LOTE_CONSTRUCCION, plantillas.shape[0]))
+        ])
+    return gallery
+
+
+def _coseno(a, b):
+    # Copia de la similitud original de AsistenciaService (registro por registro)
+    n = min(len(a), len(b))
+    dot = na = nb = 0.0
+    for i in range(n):
+        x = float(a[i])
+        y = float(b[i])
+        dot += x * y
+        na += x * x
+        nb += y * y
+    if na == 0 or nb == 0:
+        return 0.0
+    return dot / (math.sqrt(na) * math.sqrt(nb))
+
+
+def buscar_loop(registros, embedding):
+    best_score, second_score, best = -1.0, -1.0, None
+    for r in registros:
+        score = _coseno(embedding, r["embedding"])
+        if score > best_score:
+            second_score = best_score
+            best_score = score
+            best = r
+        elif score > second_score:
+            second_score = score
+    return best["personal_id"] if best else None
+
+
+def medir(buscar, consultas, esperados) -> dict:
+    latencias = np.empty(len(consultas))
+    aciertos = 0
+    inicio_total = time.perf_counter()
+    for i, (q, esperado) in enumerate(zip(consultas, esperados)):
+        inicio = time.perf_counter()
+        personal_id = buscar(q)
+        latencias[i] = time.perf_counter() - inicio
+        aciertos += personal_id == esperado
+    total = time.perf_counter() - inicio_total
+    return {
+        "consultas": len(consultas),
+        "p50_ms": round(float(np.percentile(latencias, 50)) * 1000, 4),
+        "p99_ms": round(float(np.percentile(latencias, 99)) * 1000, 4),
+        "media_ms": round(float(latencias.mean()) * 1000, 4),
+        "consultas_por_seg": round(len(consultas) / total, 2) if total else None,
+        "precision_top1": aciertos / len(consultas),
+    }
+
+
+def ejecutar(filas: int, args, rng) -> list[dict]:
+    centros, duenos, plantillas = generar_galeria(filas, args.dim, args.por_persona, args.dispersion, rng)
+    personas, consultas = generar_consultas(centros, args.consultas, args.dispersion, rng)
+    esperados = [f"p{p}" for p in personas]
+    consultas_lista = [q.tolist() for q in consultas]
+    resultados = []
+    referencia = None
+
+    for modo in args.modos:
+        base = {"modo": modo, "filas": filas, "dim": args.dim, "personas": centros.shape[0]}
+
+        if modo == "loop":
+            if filas > args.max_loop:
+                print(f"  {modo:8s} omitido (filas > --max-loop {args.max_loop})")
+                continue
+            inicio = time.perf_counter()
+            registros = [{"personal_id": f"p{duenos[j]}", "embedding": plantillas[j].tolist()} for j in range(filas)]
+            construccion = time.perf_counter() - inicio
+            k = min(args.consultas_loop, len(consultas_lista))
+            r = medir(lambda q: buscar_loop(registros, q), consultas_lista[:k], esperados[:k])
+            r.update(base, construccion_s=round(construccion, 3), bytes=None)
+            resultados.append(r)
+            print(f"  {modo:8s} p50={r['p50_ms']:.3f}ms p99={r['p99_ms']:.3f}ms qps={r['consultas_por_seg']}")
+            continue
+
+        inicio = time.perf_counter()
+        gallery = construir_galeria("float32" if modo == "ann" else modo, duenos, plantillas)
+        bytes_indice = 0
+        if modo == "ann":
+            gallery.nprobe = args.nprobe
+            for bloque in gallery._bloques.values():
+                bloque.ivf = IndiceIVF.entrenar(bloque.leer())
+                bytes_indice += bloque.ivf.centroides.nbytes + bloque.ivf.asignacion.nbytes
+        construccion = time.perf_counter() - inicio
+
+        r = medir(lambda q: gallery.buscar(q).personal_id, consultas_lista, esperados)
+        r.update(base, construccion_s=round(construccion, 3), bytes=gallery.estadisticas()["bytes"] + bytes_indice)
+
+        encontrados = [gallery.buscar(q).encoding_id for q in consultas_lista]
+        if modo == "float32":
+            referencia = encontrados
+        elif referencia is not None:
+            # Fracción de consultas cuyo mejor candidato coincide con la búsqueda exacta
+            r["recall_vs_float32"] = sum(a == b for a, b in zip(encontrados, referencia)) / len(referencia)
+
+        resultados.append(r)
+        print(f"  {modo:8s} p50={r['p50_ms']:.3f}ms p99={r['p99_ms']:.3f}ms qps={r['consultas_por_seg']} "
+              f"bytes={r['bytes']} top1={r['precision_top1']:.3f}")
+
+    return resultados
+
+
+def comparar(resultados: list[dict], path: str, tolerancia: float) -> list[str]:
+    """Regresiones de p50 respecto de un archivo de resultados anterior."""
+    with open(path, encoding="utf-8") as f:
+        base = {(r["modo"], r["filas"], r["dim"]): r for r in json.load(f)["resultados"]}
+    regresiones = []
+    for r in resultados:
+        anterior = base.get((r["modo"], r["filas"], r["dim"]))
+        if anterior and anterior["p50_ms"] and r["p50_ms"] > anterior["p50_ms"] * (1 + tolerancia):
+            regresiones.append(
+                f"{r['modo']} filas={r['filas']}: p50 {anterior['p50_ms']}ms -> {r['p50_ms']}ms"
+            )
+    return regresiones
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark de búsqueda en la galería facial")
+    parser.add_argument("--tamanos", type=int, nargs="+", default=[1000, 10000, 100000], help="Filas de cada galería")
+    parser.add_argument("--dim", type=int, default=128, help="Dimensión de los embeddings")
+    parser.add_argument("--por-persona", type=int, default=3, help="Plantillas por persona")
+    parser.add_argument("--dispersion", type=float, default=0.35, help="Ruido de plantillas y consultas respecto del centro")
+    parser.add_argument("--consultas", type=int, default=200, help="Consultas por modo")
+    parser.add_argument("--consultas-loop", type=int, default=20, help="Consultas en modo loop (es lento)")
+    parser.add_argument("--max-loop", type=int, default=10000, help="Tamaño máximo de galería para el modo loop")
+    parser.add_argument("--modos", nargs="+", choices=MODOS, default=MODOS)
+    parser.add_argument("--nprobe", type=int, default=16, help="Listas revisadas por consulta en modo ann")
+    parser.add_argument("--semilla", type=int, default=0)
+    parser.add_argument("--salida", default="benchmark_reconocimiento.json", help="Archivo JSON de resultados")
+    parser.add_argument("--comparar", help="Resultados anteriores para detectar regresiones")
+    parser.add_argument("--tolerancia", type=float, default=0.2, help="Aumento máximo de p50 permitido (0.2 = 20%%)")
+    args = parser.parse_args()
+
+    # float32 primero: es la referencia para el recall de los demás modos
+    args.modos = sorted(set(args.modos), key=lambda m: (m != "float32", MODOS.index(m)))
+    rng = np.random.default_rng(args.semilla)
+
+    resultados = []
+    for filas in args.tamanos:
+        print(f"Galería de {filas} plantillas (dim={args.dim}, {args.por_persona} por persona)")
+        resultados.extend(ejecutar(filas, args, rng))
+
+    salida = {
+        "fecha": datetime.now().isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "numpy": np.__version__,
+        "plataforma": platform.platform(),
+        "parametros": {k: v for k, v in vars(args).items() if k not in ("salida", "comparar")},
+        "resultados": resultados,
+    }
+    with open(args.salida, "w", encoding="utf-8") as f:
+        json.dump(salida, f, indent=2, ensure_ascii=False)
+    print(f"Resultados guardados en {args.salida}")
+
+    if args.comparar:
+        regresiones = comparar(resultados, args.comparar, args.tolerancia)
+        for r in regresiones:
+            print(f"REGRESIÓN: {r}")
+        if regresiones:
+            sys.exit(1)
+        print("Sin regresiones de latencia")
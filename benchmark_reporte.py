@@ -0,0 +1,348 @@
+"""
+Benchmark del cálculo del reporte mensual con datos sintéticos (sin BD).
+
+Genera el personal, sus marcaciones del mes (con tardanzas, salidas anticipadas,
+días sin marcar y turnos incompletos) y solicitudes de ausencia y sobretiempo en
+todos los estados, y mide el tiempo de cálculo de cada modo:
+
+    loop      cálculo registro por registro y día por día (como la implementación
+              original de generar_reporte_mensual, con las solicitudes de cada
+              persona ya en memoria y las reglas actuales de ausencias: días en
+              la unión de las ausencias, permisos por horas)
+    columnar  services/reporte_columnar.calcular_reporte
+    resumen   services/reporte_columnar.calcular_reporte_resumen, sobre las filas
+              de asistencia_resumen_diario que corresponden a las marcaciones
+
+Además verifica que todos los modos produzcan exactamente el mismo JSON.
+
+Uso:
+    python benchmark_reporte.py                                # 1000 personas, mes actual
+    python benchmark_reporte.py --personas 5000 --mes 3 --anio 2025 --repeticiones 3
+"""
+import argparse
+import calendar
+import json
+import random
+import sys
+from time import perf_counter
+from datetime import date, datetime, time, timedelta, timezone
+
+import numpy as np
+
+from config.config_horarios import HORARIOS
+from dto.reporte_dto.reporte_mensual_item_dto import ReporteMensualItemDTO
+from services.reporte_columnar import calcular_reporte, calcular_reporte_resumen
+
+MODOS = ["loop", "columnar", "resumen"]
+TURNOS = [("ENTRADA_M", 8, "TARDE"), ("SALIDA_M", 13, "SALIDA_ANTICIPADA"), ("ENTRADA_T", 14, "TARDE"), ("SALIDA_T", 18, "SALIDA_ANTICIPADA")]
+ESTADOS_SOLICITUD = ["APROBADA", "APROBADA", "PENDIENTE", "DENEGADA", "ANULADA"]
+ZONAS = [timezone.utc, timezone(timedelta(hours=-5))]
+# Hora del turno que un permiso por horas debe cubrir para justificar la marcación
+HORA_PROGRAMADA = {
+    "ENTRADA_M": ("ENTRADA_M", "entrada"),
+    "SALIDA_M": ("SALIDA_M", "a_tiempo"),
+    "ENTRADA_T": ("ENTRADA_T", "entrada"),
+    "SALIDA_T": ("SALIDA_T", "a_tiempo"),
+}
+
+
+def generar_datos(personas: int, fecha_inicio: date, fecha_fin: date, rng: random.Random):
+    lista_personal = [
+        {
+            "id": f"00000000-0000-4000-8000-{i:012d}",
+            "dni": f"{10000000 + i}",
+            "nombre": f"Nombre{i}",
+            "apellido_paterno": f"Paterno{i % 97}",
+            "apellido_materno": f"Materno{i % 89}",
+        }
+        for i in range(personas)
+    ]
+    dias = (fecha_fin - fecha_inicio).days + 1
+
+    asistencias = []
+    for p in lista_personal:
+        for d in range(dias):
+            fecha = fecha_inicio + timedelta(days=d)
+            if fecha.weekday() >= 5 and rng.random() > 0.05:
+                continue
+            if rng.random() < 0.08:
+                continue  # no marcó
+            for tipo, hora, estado_malo in TURNOS:
+                if rng.random() < 0.04:
+                    continue  # turno incompleto
+                marca = datetime(fecha.year, fecha.month, fecha.day, hora, tzinfo=timezone(timedelta(hours=-5)))
+                marca += timedelta(seconds=rng.randint(-1800, 1800), microseconds=rng.randint(0, 999999))
+                asistencias.append({
+                    "personal_id": p["id"],
+                    "fecha": fecha.isoformat(),
+                    # Como llega de la BD: a veces en UTC, a veces con offset local
+                    "marca_tiempo": marca.astimezone(rng.choice(ZONAS)).isoformat(),
+                    "tipo_registro": tipo,
+                    "estado": estado_malo if rng.random() < 0.1 else "A TIEMPO",
+                })
+    # Como obtener_registros_por_rango: de la más reciente a la más antigua
+    asistencias.sort(key=lambda a: datetime.fromisoformat(a["marca_tiempo"]), reverse=True)
+
+    ausencias, sobretiempos = [], []
+    for p in lista_personal:
+        for _ in range(rng.randint(0, 3)):
+            inicio = fecha_inicio + timedelta(days=rng.randint(-20, dias))
+            ausencia = {
+                "personal_id": p["id"],
+                "fecha_inicio": inicio.isoformat(),
+                "fecha_fin": (inicio + timedelta(days=rng.randint(0, 12))).isoformat(),
+                "hora_inicio": None,
+                "hora_fin": None,
+                "estado_solicitud": rng.choice(ESTADOS_SOLICITUD),
+            }
+            if rng.random() < 0.3:
+                # Permiso por horas (a veces con un solo extremo, a veces toda la jornada)
+                ausencia["hora_inicio"] = rng.choice([None, "07:30:00", "08:00:00", "10:00:00", "14:00:00"])
+                ausencia["hora_fin"] = rng.choice([None, "09:00:00", "13:30:00", "17:00:00", "18:00:00"])
+            ausencias.append(ausencia)
+        for _ in range(rng.randint(0, 4)):
+            sobretiempos.append({
+                "personal_id": p["id"],
+                "fecha_trabajo": (fecha_inicio + timedelta(days=rng.randint(-10, dias + 10))).isoformat(),
+                "horas_solicitadas": round(rng.uniform(0.25, 4), 2),
+                "estado_solicitud": rng.choice(ESTADOS_SOLICITUD),
+            })
+    return lista_personal, asistencias, ausencias, sobretiempos
+
+
+def filtrar_como_bd(ausencias, sobretiempos, fecha_inicio: date, fecha_fin: date):
+    """Lo que devuelven find_aprobadas_por_rango de cada repositorio."""
+    inicio, fin = fecha_inicio.isoformat(), fecha_fin.isoformat()
+    return (
+        [a for a in ausencias if a["estado_solicitud"] == "APROBADA" and a["fecha_inicio"] <= fin and a["fecha_fin"] >= inicio],
+        [s for s in sobretiempos if s["estado_solicitud"] == "APROBADA" and inicio <= s["fecha_trabajo"] <= fin],
+    )
+
+
+def resumen_como_bd(asistencias):
+    """Las filas de asistencia_resumen_diario (vista asistencia_resumen_calculado de migrations/006)."""
+    por_dia = {}
+    for a in asistencias:
+        por_dia.setdefault((a["personal_id"], a["fecha"]), []).append(a)
+
+    resumenes = []
+    for (personal_id, fecha), marcas in sorted(por_dia.items(), key=lambda x: x[0][1]):
+        tiempos = {}
+        for a in marcas:
+            t = datetime.fromisoformat(a["marca_tiempo"])
+            tiempos[a["tipo_registro"]] = min(t, tiempos.get(a["tipo_registro"], t))
+
+        def minutos(entrada, salida):
+            if entrada not in tiempos or salida not in tiempos:
+                return 0.0
+            return (tiempos[salida] - tiempos[entrada]).total_seconds() / 60
+
+        def bandera(tipo, estado):
+            return any(a["tipo_registro"] == tipo and a["estado"] == estado for a in marcas)
+
+        resumenes.append({
+            "personal_id": personal_id,
+            "fecha": fecha,
+            "minutos_manana": minutos("ENTRADA_M", "SALIDA_M"),
+            "minutos_tarde": minutos("ENTRADA_T", "SALIDA_T"),
+            "tardanza_m": bandera("ENTRADA_M", "TARDE"),
+            "tardanza_t": bandera("ENTRADA_T", "TARDE"),
+            "salida_anticipada_m": bandera("SALIDA_M", "SALIDA_ANTICIPADA"),
+            "salida_anticipada_t": bandera("SALIDA_T", "SALIDA_ANTICIPADA"),
+        })
+    return resumenes
+
+
+def reporte_loop(lista_personal, asistencias_mes, ausencias_por_personal, sobretiempos_por_personal, fecha_inicio, fecha_fin):
+    """Cálculo de referencia, persona por persona y día por día."""
+    reporte = []
+
+    dias_laborables_mes = 0
+    current = fecha_inicio
+    while current <= fecha_fin:
+        if current.weekday() < 5:
+            dias_laborables_mes += 1
+        current += timedelta(days=1)
+
+    numero_correlativo = 1
+    for p in lista_personal:
+        p_id = str(p['id'])
+        asistencias_p = [a for a in asistencias_mes if a['personal_id'] == p_id]
+
+        dias_asistidos = set()
+        tardanzas = 0
+        salidas_anticipadas = 0
+        horas_trabajadas = 0.0
+        by_date = {}
+        for a in asistencias_p:
+            d_fecha_str = a['fecha']
+            d_fecha = date.fromisoformat(d_fecha_str)
+            dias_asistidos.add(d_fecha)
+            if d_fecha_str not in by_date: by_date[d_fecha_str] = []
+            by_date[d_fecha_str].append(a)
+            estado = a.get('estado', '')
+            if estado == 'TARDE':
+                tardanzas += 1
+            elif estado == 'SALIDA_ANTICIPADA':
+                salidas_anticipadas += 1
+
+        for d_str, regs in by_date.items():
+            e_m = next((r for r in regs if r['tipo_registro'] == 'ENTRADA_M'), None)
+            s_m = next((r for r in regs if r['tipo_registro'] == 'SALIDA_M'), None)
+            e_t = next((r for r in regs if r['tipo_registro'] == 'ENTRADA_T'), None)
+            s_t = next((r for r in regs if r['tipo_registro'] == 'SALIDA_T'), None)
+            if e_m and s_m:
+                t1 = datetime.fromisoformat(e_m['marca_tiempo'].replace('Z', '+00:00'))
+                t2 = datetime.fromisoformat(s_m['marca_tiempo'].replace('Z', '+00:00'))
+                horas_trabajadas += (t2 - t1).total_seconds() / 3600
+            if e_t and s_t:
+                t1 = datetime.fromisoformat(e_t['marca_tiempo'].replace('Z', '+00:00'))
+                t2 = datetime.fromisoformat(s_t['marca_tiempo'].replace('Z', '+00:00'))
+                horas_trabajadas += (t2 - t1).total_seconds() / 3600
+
+        # Ausencias: días completos (o permisos que cubren toda la jornada) y permisos por horas
+        dias_justificados = set()
+        permisos = {}
+        for aus in ausencias_por_personal.get(p_id, []):
+            if aus['estado_solicitud'] != 'APROBADA':
+                continue
+            desde = time.fromisoformat(aus['hora_inicio']) if aus.get('hora_inicio') else None
+            hasta = time.fromisoformat(aus['hora_fin']) if aus.get('hora_fin') else None
+            completo = (desde is None and hasta is None) or (
+                (desde or time.min) <= HORARIOS["ENTRADA_M"]["entrada"] and (hasta or time.max) >= HORARIOS["SALIDA_T"]["a_tiempo"]
+            )
+            curr = max(date.fromisoformat(aus['fecha_inicio']), fecha_inicio)
+            while curr <= min(date.fromisoformat(aus['fecha_fin']), fecha_fin):
+                if completo:
+                    dias_justificados.add(curr)
+                else:
+                    permisos.setdefault(curr, []).append((desde or time.min, hasta or time.max))
+                curr += timedelta(days=1)
+        dias_ausencia_justificada = sum(1 for d in dias_justificados if d.weekday() < 5)
+
+        for a in asistencias_p:
+            estado = a.get('estado', '')
+            turno, campo = HORA_PROGRAMADA.get(a['tipo_registro'], (None, None))
+            hora = HORARIOS.get(turno, {}).get(campo)
+            ventanas = permisos.get(date.fromisoformat(a['fecha']), [])
+            if estado in ('TARDE', 'SALIDA_ANTICIPADA') and hora and any(d <= hora <= h for d, h in ventanas):
+                if estado == 'TARDE':
+                    tardanzas -= 1
+                else:
+                    salidas_anticipadas -= 1
+
+        horas_sobretiempo = 0.0
+        for st in sobretiempos_por_personal.get(p_id, []):
+            if st['estado_solicitud'] == 'APROBADA':
+                fecha_st = date.fromisoformat(st['fecha_trabajo'])
+                if fecha_inicio <= fecha_st <= fecha_fin:
+                    horas_sobretiempo += float(st['horas_solicitadas'])
+
+        dias_falta = 0
+        curr = fecha_inicio
+        while curr <= fecha_fin:
+            if curr.weekday() < 5 and curr not in dias_asistidos and curr not in dias_justificados:
+                dias_falta += 1
+            curr += timedelta(days=1)
+
+        obs = []
+        if tardanzas > 2:
+            obs.append("Tardanza reiterada")
+        if dias_ausencia_justificada > 0:
+            obs.append("Ausencia justificada")
+        if horas_sobretiempo > 5:
+            obs.append("Sobretiempo frecuente")
+
+        reporte.append(ReporteMensualItemDTO(
+            numero=numero_correlativo,
+            dni=p.get('dni', ''),
+            apellidos_y_nombres=f"{p.get('apellido_paterno', '')} {p.get('apellido_materno', '')} {p.get('nombre', '')}".strip(),
+            dias_laborables=dias_laborables_mes,
+            dias_asistidos=len(dias_asistidos),
+            tardanzas=tardanzas,
+            faltas=dias_falta,
+            ausencias_justificadas=dias_ausencia_justificada,
+            salidas_anticipadas=salidas_anticipadas,
+            horas_sobretiempo=horas_sobretiempo,
+            horas_trabajadas=round(horas_trabajadas, 2),
+            total_horas=round(horas_trabajadas + horas_sobretiempo, 2),
+            observaciones=", ".join(obs),
+        ))
+        numero_correlativo += 1
+    return reporte
+
+
+def serializar(reporte) -> bytes:
+    return json.dumps([item.model_dump(mode="json") for item in reporte], ensure_ascii=False).encode()
+
+
+def medir(funcion, repeticiones: int):
+    tiempos = []
+    for _ in range(repeticiones):
+        inicio = perf_counter()
+        resultado = funcion()
+        tiempos.append(perf_counter() - inicio)
+    return resultado, tiempos
+
+
+if __name__ == "__main__":
+    hoy = date.today()
+    parser = argparse.ArgumentParser(description="Benchmark del cálculo del reporte mensual")
+    parser.add_argument("--personas", type=int, default=1000)
+    parser.add_argument("--mes", type=int, default=hoy.month)
+    parser.add_argument("--anio", type=int, default=hoy.year)
+    parser.add_argument("--modos", nargs="+", choices=MODOS, default=MODOS)
+    parser.add_argument("--repeticiones", type=int, default=5)
+    parser.add_argument("--semilla", type=int, default=7)
+    parser.add_argument("--salida", help="Guardar los resultados en JSON")
+    args = parser.parse_args()
+
+    fecha_inicio = date(args.anio, args.mes, 1)
+    fecha_fin = date(args.anio, args.mes, calendar.monthrange(args.anio, args.mes)[1])
+    datos = generar_datos(args.personas, fecha_inicio, fecha_fin, random.Random(args.semilla))
+    lista_personal, asistencias, ausencias, sobretiempos = datos
+    aprobadas, sobretiempo_aprobado = filtrar_como_bd(ausencias, sobretiempos, fecha_inicio, fecha_fin)
+    print(f"{args.personas} personas, {len(asistencias)} asistencias, {len(ausencias)} ausencias, "
+          f"{len(sobretiempos)} sobretiempos ({fecha_inicio} a {fecha_fin})")
+
+    resumenes = resumen_como_bd(asistencias) if "resumen" in args.modos else []
+
+    ausencias_por_personal, sobretiempos_por_personal = {}, {}
+    for a in ausencias:
+        ausencias_por_personal.setdefault(a["personal_id"], []).append(a)
+    for s in sobretiempos:
+        sobretiempos_por_personal.setdefault(s["personal_id"], []).append(s)
+
+    funciones = {
+        "loop": lambda: reporte_loop(lista_personal, asistencias, ausencias_por_personal, sobretiempos_por_personal, fecha_inicio, fecha_fin),
+        "columnar": lambda: calcular_reporte(lista_personal, asistencias, aprobadas, sobretiempo_aprobado, fecha_inicio, fecha_fin),
+        "resumen": lambda: calcular_reporte_resumen(lista_personal, resumenes, aprobadas, sobretiempo_aprobado, fecha_inicio, fecha_fin),
+    }
+
+    resultados, salidas = [], {}
+    for modo in args.modos:
+        # El loop es cuadrático: una sola ejecución basta
+        reporte, tiempos = medir(funciones[modo], 1 if modo == "loop" else args.repeticiones)
+        salidas[modo] = serializar(reporte)
+        resultados.append({
+            "modo": modo,
+            "p50_ms": round(float(np.percentile(tiempos, 50)) * 1000, 2),
+            "min_ms": round(min(tiempos) * 1000, 2),
+            "bytes": len(salidas[modo]),
+        })
+        print(f"  {modo:9s} p50={resultados[-1]['p50_ms']:10.2f}ms min={resultados[-1]['min_ms']:10.2f}ms")
+
+    identicos = len(set(salidas.values())) <= 1
+    if len(salidas) > 1:
+        print("Salidas idénticas" if identicos else "FALLA: las salidas difieren")
+
+    if args.salida:
+        with open(args.salida, "w", encoding="utf-8") as f:
+            json.dump({
+                "fecha": datetime.now().isoformat(timespec="seconds"),
+                "parametros": vars(args),
+                "identicos": identicos,
+                "resultados": resultados,
+            }, f, indent=2, ensure_ascii=False)
+    if not identicos:
+        sys.exit(1)
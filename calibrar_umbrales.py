@@ -0,0 +1,233 @@
+"""
+Calibración offline de threshold y min_margin para /asistencia/realtime.
+
+Recorre toda la galería por bloques de filas (nunca la matriz N x N completa) y calcula:
+
+1. Verificación (pares de plantillas): histogramas de scores genuinos (misma persona)
+   e impostores (personas distintas) -> curvas FAR/FRR y EER.
+2. Identificación, con la misma regla que AsistenciaService._validar_match:
+   se acepta si score >= threshold y, cuando el segundo score es > 0, el margen
+   (score - segundo) >= min_margin (la mitad si score > 0.92).
+   - Consultas genuinas: cada plantilla contra la galería sin ella misma
+     (solo personas con 2+ plantillas). Error = rechazo o persona equivocada.
+   - Consultas impostoras: cada plantilla contra la galería sin su persona
+     (simula alguien no registrado). Error = cualquier aceptación.
+
+Recomienda el par (threshold, min_margin) con menor tasa de rechazo cuyo FAR de
+identificación no supera --far-objetivo.
+
+Uso:
+    python calibrar_umbrales.py                         # galería real (codificacion_facial)
+    python calibrar_umbrales.py --sintetico 20000       # galería sintética (ver benchmark_reconocimiento.py)
+"""
+import argparse
+import asyncio
+import json
+import time
+from datetime import datetime
+
+import numpy as np
+
+from config.reconocimiento_config import EMBEDDING_DIMENSION
+
+_BINS = 2000
+
+
+def cargar_galeria_bd():
+    from repository.encoding_face_repository import EncodingFaceRepository
+    from services.face_gallery import FaceGallery
+
+    gallery = FaceGallery("float32")
+    gallery.construir(asyncio.run(EncodingFaceRepository.find_all()) or [])
+    bloque = gallery._bloques.get(EMBEDDING_DIMENSION)
+    if bloque is None:
+        raise SystemExit(f"No hay codificaciones de dimensión {EMBEDDING_DIMENSION}")
+    vivos = np.flatnonzero(bloque.vivos[:bloque.n])
+    return np.ascontiguousarray(bloque.leer(vivos)), np.array([bloque.personal_ids[i] for i in vivos])
+
+
+def cargar_galeria_sintetica(filas: int, dim: int, por_persona: int, dispersion: float, semilla: int):
+    from benchmark_reconocimiento import generar_galeria
+
+    _, duenos, plantillas = generar_galeria(filas, dim, por_persona, dispersion, np.random.default_rng(semilla))
+    return plantillas, duenos
+
+
+def _top2(s: np.ndarray):
+    """Mejor columna, su score y el segundo score de cada fila (-1.0 si no hay)."""
+    filas = np.arange(s.shape[0])
+    mejor = np.argmax(s, axis=1)
+    top = s[filas, mejor].copy()
+    s[filas, mejor] = -np.inf
+    segundo = s.max(axis=1)
+    segundo[~np.isfinite(segundo)] = -1.0
+    return mejor, top, segundo
+
+
+def recorrer(matriz: np.ndarray, codigos: np.ndarray, max_elementos: int = 1 << 24):
+    """
+    Un solo recorrido por bloques: histogramas de pares y top-2 de las consultas
+    genuinas (sin la propia fila) e impostoras (sin la persona).
+    """
+    n = matriz.shape[0]
+    hist_gen = np.zeros(_BINS, dtype=np.int64)
+    hist_imp = np.zeros(_BINS, dtype=np.int64)
+    conteo = np.bincount(codigos)
+
+    gen_top = np.full(n, -np.inf, dtype=np.float32)
+    gen_seg = np.full(n, -1.0, dtype=np.float32)
+    gen_ok = np.zeros(n, dtype=bool)
+    imp_top = np.full(n, -np.inf, dtype=np.float32)
+    imp_seg = np.full(n, -1.0, dtype=np.float32)
+
+    por_lote = max(1, max_elementos // n)
+    for i in range(0, n, por_lote):
+        j = min(i + por_lote, n)
+        s = matriz[i:j] @ matriz.T
+        misma = codigos[i:j, None] == codigos[None, :]
+        locales = np.arange(j - i)
+
+        # Pares (a, b) con b > a para contar cada par una sola vez
+        superior = np.arange(n)[None, :] > np.arange(i, j)[:, None]
+        bins = np.clip(((s + 1.0) * (_BINS / 2)).astype(np.int64), 0, _BINS - 1)
+        hist_gen += np.bincount(bins[superior & misma], minlength=_BINS)
+        hist_imp += np.bincount(bins[superior & ~misma], minlength=_BINS)
+
+        # Genuinas: sin la propia plantilla
+        g = s.copy()
+        g[locales, np.arange(i, j)] = -np.inf
+        mejor, gen_top[i:j], gen_seg[i:j] = _top2(g)
+        gen_ok[i:j] = codigos[mejor] == codigos[i:j]
+
+        # Impostoras: sin ninguna plantilla de la misma persona
+        s[misma] = -np.inf
+        _, imp_top[i:j], imp_seg[i:j] = _top2(s)
+
+    genuinas = conteo[codigos] >= 2
+    return {
+        "hist_gen": hist_gen, "hist_imp": hist_imp,
+        "gen_top": gen_top[genuinas], "gen_seg": gen_seg[genuinas], "gen_ok": gen_ok[genuinas],
+        "imp_top": imp_top[np.isfinite(imp_top)], "imp_seg": imp_seg[np.isfinite(imp_top)],
+    }
+
+
+def aceptar(top: np.ndarray, segundo: np.ndarray, threshold: float, min_margin: float) -> np.ndarray:
+    """Versión vectorizada de AsistenciaService._validar_match."""
+    margen_requerido = np.where(top > 0.92, min_margin * 0.5, min_margin)
+    ambiguo = (segundo > 0) & (top - segundo < margen_requerido)
+    return (top >= threshold) & ~ambiguo
+
+
+def curvas_verificacion(hist_gen, hist_imp) -> dict:
+    umbrales = np.arange(_BINS) / (_BINS / 2) - 1.0
+    total_gen, total_imp = hist_gen.sum(), hist_imp.sum()
+    # FAR(t): impostores con score >= t; FRR(t): genuinos con score < t
+    far = hist_imp[::-1].cumsum()[::-1] / max(total_imp, 1)
+    frr = np.concatenate([[0], hist_gen.cumsum()[:-1]]) / max(total_gen, 1)
+    k = int(np.argmin(np.abs(far - frr)))
+    return {
+        "pares_genuinos": int(total_gen),
+        "pares_impostores": int(total_imp),
+        "eer": float((far[k] + frr[k]) / 2),
+        "umbral_eer": float(umbrales[k]),
+        "curva": [
+            {"umbral": round(float(umbrales[b]), 3), "far": float(far[b]), "frr": float(frr[b])}
+            for b in range(0, _BINS, 10)
+        ],
+    }
+
+
+def grilla_identificacion(datos: dict, umbrales, margenes) -> list[dict]:
+    n_gen, n_imp = len(datos["gen_top"]), len(datos["imp_top"])
+    grilla = []
+    for t in umbrales:
+        for m in margenes:
+            acepta_gen = aceptar(datos["gen_top"], datos["gen_seg"], t, m)
+            acepta_imp = aceptar(datos["imp_top"], datos["imp_seg"], t, m)
+            grilla.append({
+                "threshold": round(float(t), 3),
+                "min_margin": round(float(m), 3),
+                "frr": float(1 - (acepta_gen & datos["gen_ok"]).sum() / n_gen) if n_gen else None,
+                "far": float(acepta_imp.sum() / n_imp) if n_imp else None,
+                "identificacion_erronea": float((acepta_gen & ~datos["gen_ok"]).sum() / n_gen) if n_gen else None,
+            })
+    return grilla
+
+
+def recomendar(grilla: list[dict], far_objetivo: float):
+    validas = [
+        g for g in grilla
+        if g["far"] is not None and g["frr"] is not None
+        and g["far"] <= far_objetivo and g["identificacion_erronea"] <= far_objetivo
+    ]
+    if not validas:
+        return None
+    # Menor rechazo; a igualdad, el threshold más alto y el margen más grande (más conservador)
+    return min(validas, key=lambda g: (g["frr"], -g["threshold"], -g["min_margin"]))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Calibra threshold/min_margin del reconocimiento facial")
+    parser.add_argument("--sintetico", type=int, help="Usar una galería sintética de N plantillas en vez de la BD")
+    parser.add_argument("--por-persona", type=int, default=3)
+    parser.add_argument("--dispersion", type=float, default=0.35)
+    parser.add_argument("--semilla", type=int, default=0)
+    parser.add_argument("--far-objetivo", type=float, default=0.001, help="FAR máximo aceptado (identificación)")
+    parser.add_argument("--umbral-min", type=float, default=0.5)
+    parser.add_argument("--umbral-max", type=float, default=0.99)
+    parser.add_argument("--margen-max", type=float, default=0.2)
+    parser.add_argument("--paso", type=float, default=0.01)
+    parser.add_argument("--salida", default="calibracion_umbrales.json", help="Archivo JSON con curvas y grilla")
+    args = parser.parse_args()
+
+    if args.sintetico:
+        matriz, personas = cargar_galeria_sintetica(
+            args.sintetico, EMBEDDING_DIMENSION, args.por_persona, args.dispersion, args.semilla
+        )
+    else:
+        matriz, personas = cargar_galeria_bd()
+    _, codigos = np.unique(personas, return_inverse=True)
+    print(f"Galería: {matriz.shape[0]} plantillas, {codigos.max() + 1} personas, dim={matriz.shape[1]}")
+
+    inicio = time.perf_counter()
+    datos = recorrer(matriz, codigos)
+    print(f"Recorrido por bloques: {time.perf_counter() - inicio:.2f}s")
+
+    verificacion = curvas_verificacion(datos["hist_gen"], datos["hist_imp"])
+    print(f"Verificación: EER={verificacion['eer']:.4f} en umbral {verificacion['umbral_eer']:.3f} "
+          f"({verificacion['pares_genuinos']} pares genuinos, {verificacion['pares_impostores']} impostores)")
+
+    umbrales = np.arange(args.umbral_min, args.umbral_max + 1e-9, args.paso)
+    margenes = np.arange(0.0, args.margen_max + 1e-9, args.paso)
+    grilla = grilla_identificacion(datos, umbrales, margenes)
+
+    # Valores usados hoy: defaults del DTO y respaldo del servicio
+    actuales = {
+        (g["threshold"], g["min_margin"]): g for g in grilla_identificacion(datos, [0.78, 0.75], [0.08, 0.06])
+    }
+    for t, m in ((0.78, 0.08), (0.75, 0.06)):
+        g = actuales[(t, m)]
+        print(f"Actual threshold={t} min_margin={m}: FAR={g['far']} FRR={g['frr']} "
+              f"identificación errónea={g['identificacion_erronea']}")
+
+    recomendacion = recomendar(grilla, args.far_objetivo)
+    if recomendacion:
+        print(f"Recomendado (FAR <= {args.far_objetivo}): threshold={recomendacion['threshold']} "
+              f"min_margin={recomendacion['min_margin']} -> FAR={recomendacion['far']:.5f} "
+              f"FRR={recomendacion['frr']:.5f}")
+    else:
+        print(f"Ninguna combinación de la grilla alcanza FAR <= {args.far_objetivo}")
+
+    with open(args.salida, "w", encoding="utf-8") as f:
+        json.dump({
+            "fecha": datetime.now().isoformat(timespec="seconds"),
+            "plantillas": int(matriz.shape[0]),
+            "personas": int(codigos.max() + 1),
+            "consultas_genuinas": int(len(datos["gen_top"])),
+            "consultas_impostoras": int(len(datos["imp_top"])),
+            "verificacion": verificacion,
+            "identificacion": grilla,
+            "actuales": list(actuales.values()),
+            "recomendacion": recomendacion,
+        }, f, indent=2, ensure_ascii=False)
+    print(f"Resultados guardados en {args.salida}")
@@ -0,0 +1,25 @@
+# config/cache_config.py
+
+import os
+
+# Caché de lectura de PersonalRepository.find_by_id (por proceso).
+# El personal cambia pocas veces al día y se lee en cada marcación; las
+# modificaciones hechas por este proceso invalidan la entrada al instante, las de
+# otros workers se ven como máximo tras el TTL. 0 = deshabilitada.
+PERSONAL_CACHE_SEGUNDOS = float(os.getenv("PERSONAL_CACHE_SEGUNDOS", "300"))
+PERSONAL_CACHE_MAX = int(os.getenv("PERSONAL_CACHE_MAX", "2048"))
+
+# Estado del día por persona (qué tipos de registro ya marcó hoy), mantenido por
+# las inserciones de este proceso. Con varios workers cada uno ve solo sus propias
+# marcaciones al instante; las de los demás tras ASISTENCIA_DIA_CACHE_SEGUNDOS.
+# ASISTENCIA_DIA_CACHE_MAX = 0 la deshabilita.
+ASISTENCIA_DIA_CACHE_SEGUNDOS = float(os.getenv("ASISTENCIA_DIA_CACHE_SEGUNDOS", "600"))
+ASISTENCIA_DIA_CACHE_MAX = int(os.getenv("ASISTENCIA_DIA_CACHE_MAX", "4096"))
+
+# Reportes mensuales calculados, por (mes, año, personal). Cada consulta compara la
+# versión del mes en reporte_version (migrations/007, la incrementan los triggers
+# de asistencias y solicitudes) y la de HORARIOS; si no cambiaron, el reporte se
+# sirve sin recalcular. Los meses cerrados se guardan además en REPORTE_CACHE_DIR
+# para sobrevivir reinicios ("" = solo memoria). REPORTE_CACHE_MAX = 0 la deshabilita.
+REPORTE_CACHE_MAX = int(os.getenv("REPORTE_CACHE_MAX", "64"))
+REPORTE_CACHE_DIR = os.getenv("REPORTE_CACHE_DIR", ".cache/reportes")
@@ -0,0 +1,16 @@
+# config/fotos_config.py
+
+import os
+
+# Lado máximo (px) de las miniaturas que genera GET /personal/{id}/foto/{hash}?tamano=N.
+# Solo se aceptan estos tamaños para que la caché no crezca con valores arbitrarios.
+FOTO_MINIATURA_TAMANOS = [
+    int(t) for t in os.getenv("FOTO_MINIATURA_TAMANOS", "64,128,256").split(",") if t.strip()
+]
+
+# Memoria máxima (MB) de la caché de fotos decodificadas y miniaturas, por proceso
+FOTO_CACHE_MAX_MB = float(os.getenv("FOTO_CACHE_MAX_MB", "32"))
+
+# max-age del header Cache-Control de las fotos. La URL incluye el hash del
+# contenido, así que puede cachearse indefinidamente (1 año por defecto).
+FOTO_CACHE_SEGUNDOS = int(os.getenv("FOTO_CACHE_SEGUNDOS", str(365 * 24 * 3600)))
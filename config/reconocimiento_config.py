@@ -0,0 +1,46 @@
+# config/reconocimiento_config.py
+
+import os
+
+# Cada cuántos segundos la galería de embeddings en memoria se reconcilia con la BD
+# (se comparan solo los ids y se aplican las diferencias). Con varios workers, las altas
+# y bajas hechas en otro proceso se reflejan como máximo tras este intervalo.
+GALERIA_RECONCILIAR_SEGUNDOS = float(os.getenv("GALERIA_RECONCILIAR_SEGUNDOS", "60"))
+
+# Fracción de filas eliminadas (tombstones) a partir de la cual se compacta un bloque
+GALERIA_COMPACTAR_FRACCION = float(os.getenv("GALERIA_COMPACTAR_FRACCION", "0.25"))
+
+# Búsqueda aproximada (ANN) con índice IVF para galerías grandes.
+# "auto": IVF solo si el bloque tiene al menos GALERIA_ANN_MIN_FILAS filas; "exacto": siempre fuerza bruta
+GALERIA_ANN_MODO = os.getenv("GALERIA_ANN_MODO", "auto").lower()
+GALERIA_ANN_MIN_FILAS = int(os.getenv("GALERIA_ANN_MIN_FILAS", "20000"))
+# Listas (clusters) revisadas por consulta: más listas => mejor recall, más latencia
+GALERIA_ANN_NPROBE = int(os.getenv("GALERIA_ANN_NPROBE", "16"))
+
+# Formato de almacenamiento de la galería: "float32", "float16" o "int8" (escala por fila)
+GALERIA_PRECISION = os.getenv("GALERIA_PRECISION", "float32").lower()
+# Error absoluto máximo de score tolerado al pasar a un formato cuantizado
+GALERIA_PRECISION_TOLERANCIA = float(os.getenv("GALERIA_PRECISION_TOLERANCIA", "0.01"))
+
+# Snapshot binario de la galería en disco (se mapea con mmap al arrancar). Vacío = deshabilitado
+GALERIA_SNAPSHOT_PATH = os.getenv("GALERIA_SNAPSHOT_PATH", ".cache/galeria_facial.bin")
+# Intervalo mínimo (segundos) entre escrituras del snapshot cuando la galería cambia
+GALERIA_SNAPSHOT_SEGUNDOS = float(os.getenv("GALERIA_SNAPSHOT_SEGUNDOS", "300"))
+
+# Galería en memoria compartida entre los workers de una misma máquina (solo POSIX).
+# Un worker a la vez publica cada cambio y los demás lo adoptan al leer el contador de generación
+GALERIA_COMPARTIDA = os.getenv("GALERIA_COMPARTIDA", "false").lower() in ("1", "true", "si", "yes")
+GALERIA_COMPARTIDA_NOMBRE = os.getenv("GALERIA_COMPARTIDA_NOMBRE", "galeria_facial")
+GALERIA_COMPARTIDA_LOCK = os.getenv("GALERIA_COMPARTIDA_LOCK", ".cache/galeria_facial.lock")
+
+# Caché de reconocimientos recientes por kiosco para frames consecutivos de /asistencia/realtime.
+# Un embedding con similitud >= REALTIME_DEBOUNCE_SIMILITUD a uno resuelto hace menos de
+# REALTIME_DEBOUNCE_SEGUNDOS reutiliza la respuesta anterior. 0 segundos = deshabilitada
+REALTIME_DEBOUNCE_SEGUNDOS = float(os.getenv("REALTIME_DEBOUNCE_SEGUNDOS", "3"))
+REALTIME_DEBOUNCE_SIMILITUD = float(os.getenv("REALTIME_DEBOUNCE_SIMILITUD", "0.98"))
+REALTIME_DEBOUNCE_MAX_KIOSCOS = int(os.getenv("REALTIME_DEBOUNCE_MAX_KIOSCOS", "64"))
+REALTIME_DEBOUNCE_MAX_POR_KIOSCO = int(os.getenv("REALTIME_DEBOUNCE_MAX_POR_KIOSCO", "8"))
+
+# Dimensión de los embeddings del modelo facial del frontend (face-api.js: 128).
+# Las codificaciones con otra dimensión se rechazan al registrarlas
+EMBEDDING_DIMENSION = int(os.getenv("EMBEDDING_DIMENSION", "128"))
@@ -0,0 +1,23 @@
+# config/reportes_config.py
+
+import os
+
+# Cola de reportes en segundo plano (POST /reportes/trabajos). Los trabajos corren
+# en este proceso, en a lo más REPORTE_TRABAJOS_WORKERS a la vez, para que un
+# reporte anual no compita con el tráfico de los kioscos.
+REPORTE_TRABAJOS_WORKERS = int(os.getenv("REPORTE_TRABAJOS_WORKERS", "2"))
+
+# Trabajos en cola (sin contar los que corren); al superarlo se rechazan nuevos
+REPORTE_TRABAJOS_MAX_PENDIENTES = int(os.getenv("REPORTE_TRABAJOS_MAX_PENDIENTES", "20"))
+
+# Memoria estimada (MB) que pueden ocupar a la vez los trabajos en curso. Un
+# trabajo que no cabe espera a que terminen otros; uno más grande que el total se
+# rechaza. La estimación es personas × días × REPORTE_TRABAJOS_BYTES_POR_DIA.
+REPORTE_TRABAJOS_MEMORIA_MB = float(os.getenv("REPORTE_TRABAJOS_MEMORIA_MB", "512"))
+REPORTE_TRABAJOS_BYTES_POR_DIA = int(os.getenv("REPORTE_TRABAJOS_BYTES_POR_DIA", "2048"))
+
+# Estado y resultado de cada trabajo en disco; se eliminan tras la expiración
+REPORTE_TRABAJOS_DIR = os.getenv("REPORTE_TRABAJOS_DIR", ".cache/reportes_trabajos")
+REPORTE_TRABAJOS_EXPIRA_SEGUNDOS = float(os.getenv("REPORTE_TRABAJOS_EXPIRA_SEGUNDOS", str(24 * 3600)))
+# Cada cuánto se buscan y eliminan los archivos expirados
+REPORTE_TRABAJOS_LIMPIEZA_SEGUNDOS = float(os.getenv("REPORTE_TRABAJOS_LIMPIEZA_SEGUNDOS", "900"))
@@ -1,4 +1,5 @@
-from supabase import create_client, ClientOptions
+from supabase import create_client, ClientOptions, acreate_client, AsyncClientOptions
+import asyncio
 import os
 from dotenv import load_dotenv
 import httpx
@@ -32,3 +33,25 @@ def get_supabase():
         )
     
     return _supabase_client
+
+
+# Cliente asíncrono: las consultas no bloquean el event loop mientras esperan a PostgREST.
+# Los repositorios usan este; el cliente síncrono queda para scripts de consola.
+_supabase_async_client = None
+_supabase_async_lock = asyncio.Lock()
+
+async def get_supabase_async():
+    global _supabase_async_client
+
+    if _supabase_async_client is None:
+        async with _supabase_async_lock:
+            if _supabase_async_client is None:
+                _supabase_async_client = await acreate_client(
+                    SUPABASE_URL,
+                    SUPABASE_KEY,
+                    options=AsyncClientOptions(
+                        postgrest_client_timeout=30  # Timeout en segundos
+                    )
+                )
+
+    return _supabase_async_client
@@ -1,6 +1,7 @@
-from fastapi import APIRouter, WebSocket, WebSocketDisconnect, HTTPException, status, Query
+from fastapi import APIRouter, WebSocket, WebSocketDisconnect, HTTPException, status, Query, Request
 from dto.asistencia_dto.asistencia_dto import RegistrarAsistenciaDTO
 from dto.asistencia_dto.realtime_asistencia_dto import RealtimeAsistenciaDTO
+from dto.asistencia_dto.realtime_lote_asistencia_dto import RealtimeLoteAsistenciaDTO
 from services.asistencias_service import AsistenciaService
 from datetime import date, datetime
 from config.timezone_config import LOCAL_TIMEZONE
@@ -35,8 +36,12 @@ manager = ConnectionManager()
 
 
 @router.get("/personal")
-async def get_personal_status(fecha: Optional[date] = None):
-    return await service.listar_personal_status(fecha)
+async def get_personal_status(fecha: Optional[date] = None, con_registros: bool = True):
+    """
+    Estado del día de todo el personal (resumen diario). Con con_registros=false no
+    se incluyen las marcaciones de cada persona.
+    """
+    return await service.listar_personal_status(fecha, con_registros)
 
 @router.get("/historial")
 async def get_historial(
@@ -74,9 +79,11 @@ async def registrar_asistencia(dto: RegistrarAsistenciaDTO):
 
 
 @router.post("/realtime")
-async def registrar_realtime(dto: RealtimeAsistenciaDTO):
+async def registrar_realtime(dto: RealtimeAsistenciaDTO, request: Request):
     # procesa embedding, busca match y registra la asistencia
-    result = await service.procesar_realtime(dto)
+    # Sin kiosco_id explícito, cada IP cliente se trata como un kiosco distinto
+    kiosco = dto.kiosco_id or (request.client.host if request.client else None)
+    result = await service.procesar_realtime(dto, kiosco)
 
     # Manejo de errores retornados por el servicio
     if not result:
@@ -92,6 +99,41 @@ async def registrar_realtime(dto: RealtimeAsistenciaDTO):
     return result
 
 
+@router.post("/realtime/batch")
+async def registrar_realtime_lote(dto: RealtimeLoteAsistenciaDTO):
+    """
+    Reconoce todos los rostros de un frame del kiosco en un solo request.
+    - embeddings: un embedding por rostro detectado (máximo 20)
+
+    Retorna `resultados` en el mismo orden que `embeddings`; cada elemento tiene el
+    mismo formato que la respuesta de /realtime o `{"error": ...}` si ese rostro no
+    pudo procesarse.
+    """
+    result = await service.procesar_realtime_lote(dto)
+
+    # Errores generales (BD no disponible, galería vacía) se tratan igual que en /realtime
+    if isinstance(result, dict) and result.get("error"):
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=result.get("error"))
+
+    for item in result:
+        if not item.get("error"):
+            await manager.broadcast({"evento": "asistencia_registrada", "data": item})
+
+    return {"resultados": result}
+
+
+@router.get("/realtime/cache")
+async def estado_cache_realtime():
+    """Aciertos, fallos y tamaño de la caché de reconocimientos recientes por kiosco."""
+    return service.estado_cache_realtime()
+
+
+@router.get("/dia/cache")
+async def estado_cache_dia():
+    """Aciertos, fallos y tamaño de la caché de registros del día por persona."""
+    return service.estado_cache_dia()
+
+
 @router.websocket("/ws")
 async def websocket_endpoint(websocket: WebSocket):
     await manager.connect(websocket)
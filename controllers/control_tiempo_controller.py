@@ -3,7 +3,7 @@ from typing import List, Optional
 from uuid import UUID
 from datetime import datetime, date, timedelta
 from pydantic import BaseModel
-from config.supabaseClient import get_supabase
+from repository.control_tiempo_repository import ControlTiempoRepository
 
 router = APIRouter(prefix="/control-tiempo", tags=["Control de Tiempo"])
 
@@ -27,6 +27,17 @@ class ControlTiempoResponse(BaseModel):
     registros: List[RegistroTiempo]
     resumen: ResumenJornada
 
+def _minutos_entre(hora_entrada: Optional[str], hora_salida: Optional[str]) -> int:
+    """Minutos entre la entrada y la salida del día; la BD devuelve la hora como HH:MM:SS."""
+    if not hora_entrada or not hora_salida:
+        return 0
+    try:
+        entrada = datetime.strptime(hora_entrada[:5], "%H:%M")
+        salida = datetime.strptime(hora_salida[:5], "%H:%M")
+        return int((salida - entrada).total_seconds() / 60)
+    except ValueError:
+        return 0
+
 @router.post("/registrar")
 async def registrar_tiempo(data: RegistroTiempoCreate):
     """
@@ -38,20 +49,7 @@ async def registrar_tiempo(data: RegistroTiempoCreate):
         hora_actual = now.strftime("%H:%M")
         fecha_actual = now.strftime("%Y-%m-%d")
         
-        # Verificar si ya existe un registro del mismo tipo hoy
-        existing = get_supabase().table('control_tiempo').select('*').eq(
-            'personal_id', data.personal_id
-        ).eq('fecha', fecha_actual).eq('tipo_registro', data.tipo_registro).execute()
-        
-        if existing.data and len(existing.data) > 0:
-            return {
-                "success": True,
-                "ya_registrado": True,
-                "mensaje": f"{data.tipo_registro} ya fue registrada hoy a las {existing.data[0].get('hora', '')}",
-                "hora": existing.data[0].get('hora', hora_actual)
-            }
-        
-        # Crear nuevo registro
+        # Crear el registro o, si ya existe uno del mismo tipo hoy, obtenerlo (una sola sentencia)
         registro = {
             'personal_id': data.personal_id,
             'tipo_registro': data.tipo_registro,
@@ -60,9 +58,24 @@ async def registrar_tiempo(data: RegistroTiempoCreate):
             'created_at': now.isoformat()
         }
         
-        result = get_supabase().table('control_tiempo').insert(registro).execute()
+        result = await ControlTiempoRepository.registrar(registro)
+        if not result:
+            # Sin fila: otra transacción insertó el mismo registro en el mismo instante
+            # y la sentencia no alcanzó a verlo; se lee el que quedó guardado
+            existentes = await ControlTiempoRepository.obtener_del_dia(data.personal_id, fecha_actual)
+            existente = next((r for r in existentes if r.get('tipo_registro') == data.tipo_registro), None)
+            if existente:
+                result = {**existente, 'ya_registrado': True}
+
+        if result and result.get('ya_registrado'):
+            return {
+                "success": True,
+                "ya_registrado": True,
+                "mensaje": f"{data.tipo_registro} ya fue registrada hoy a las {result.get('hora', '')}",
+                "hora": result.get('hora', hora_actual)
+            }
         
-        if result.data:
+        if result:
             return {
                 "success": True,
                 "ya_registrado": False,
@@ -105,15 +118,13 @@ async def get_registros_personal(personal_id: UUID, fecha: Optional[str] = None)
         
         # Intentar obtener de la tabla control_tiempo
         try:
-            result = get_supabase().table('control_tiempo').select('*').eq(
-                'personal_id', str(personal_id)
-            ).eq('fecha', fecha).order('hora').execute()
+            result = await ControlTiempoRepository.obtener_del_dia(personal_id, fecha)
             
             registros = []
             hora_entrada = None
             hora_salida = None
             
-            for reg in result.data or []:
+            for reg in result:
                 registros.append(RegistroTiempo(
                     tipo=reg.get('tipo_registro', ''),
                     hora=reg.get('hora', ''),
@@ -127,20 +138,8 @@ async def get_registros_personal(personal_id: UUID, fecha: Optional[str] = None)
                     hora_salida = reg.get('hora')
             
             # Calcular horas trabajadas
-            horas_trabajadas = "0h 0m"
-            minutos_trabajados = 0
-            
-            if hora_entrada and hora_salida:
-                try:
-                    entrada = datetime.strptime(hora_entrada, "%H:%M")
-                    salida = datetime.strptime(hora_salida, "%H:%M")
-                    diff = salida - entrada
-                    minutos_trabajados = int(diff.total_seconds() / 60)
-                    horas = minutos_trabajados // 60
-                    mins = minutos_trabajados % 60
-                    horas_trabajadas = f"{horas}h {mins}m"
-                except:
-                    pass
+            minutos_trabajados = _minutos_entre(hora_entrada, hora_salida)
+            horas_trabajadas = f"{minutos_trabajados // 60}h {minutos_trabajados % 60}m"
             
             return ControlTiempoResponse(
                 registros=registros,
@@ -171,59 +170,48 @@ async def get_resumen_semanal(personal_id: UUID):
     try:
         today = datetime.now().date()
         start_of_week = today - timedelta(days=today.weekday())
-        
+        end_of_week = start_of_week + timedelta(days=6)
+
+        # Registros de toda la semana en una sola consulta, agrupados por día
+        try:
+            result = await ControlTiempoRepository.obtener_por_rango(
+                personal_id, start_of_week.strftime("%Y-%m-%d"), end_of_week.strftime("%Y-%m-%d")
+            )
+        except Exception as table_error:
+            print(f"Tabla control_tiempo no existe: {table_error}")
+            result = []
+
+        registros_por_dia = {}
+        for reg in result:
+            registros_por_dia.setdefault(reg.get('fecha'), []).append(reg)
+
         resumen_semanal = []
         total_minutos_semana = 0
-        
+
         for i in range(7):
             day = start_of_week + timedelta(days=i)
             fecha_str = day.strftime("%Y-%m-%d")
-            
-            # Obtener registros del día
-            try:
-                result = get_supabase().table('control_tiempo').select('*').eq(
-                    'personal_id', str(personal_id)
-                ).eq('fecha', fecha_str).execute()
-                
-                hora_entrada = None
-                hora_salida = None
-                
-                for reg in result.data or []:
-                    if reg.get('tipo_registro') == 'ENTRADA' and hora_entrada is None:
-                        hora_entrada = reg.get('hora')
-                    elif reg.get('tipo_registro') == 'SALIDA':
-                        hora_salida = reg.get('hora')
-                
-                minutos_dia = 0
-                if hora_entrada and hora_salida:
-                    try:
-                        entrada = datetime.strptime(hora_entrada, "%H:%M")
-                        salida = datetime.strptime(hora_salida, "%H:%M")
-                        diff = salida - entrada
-                        minutos_dia = int(diff.total_seconds() / 60)
-                    except:
-                        pass
-                
-                total_minutos_semana += minutos_dia
-                
-                resumen_semanal.append({
-                    "fecha": fecha_str,
-                    "dia": day.strftime("%A"),
-                    "hora_entrada": hora_entrada,
-                    "hora_salida": hora_salida,
-                    "minutos_trabajados": minutos_dia,
-                    "horas_trabajadas": f"{minutos_dia // 60}h {minutos_dia % 60}m"
-                })
-                
-            except:
-                resumen_semanal.append({
-                    "fecha": fecha_str,
-                    "dia": day.strftime("%A"),
-                    "hora_entrada": None,
-                    "hora_salida": None,
-                    "minutos_trabajados": 0,
-                    "horas_trabajadas": "0h 0m"
-                })
+
+            hora_entrada = None
+            hora_salida = None
+
+            for reg in registros_por_dia.get(fecha_str, []):
+                if reg.get('tipo_registro') == 'ENTRADA' and hora_entrada is None:
+                    hora_entrada = reg.get('hora')
+                elif reg.get('tipo_registro') == 'SALIDA':
+                    hora_salida = reg.get('hora')
+
+            minutos_dia = _minutos_entre(hora_entrada, hora_salida)
+            total_minutos_semana += minutos_dia
+
+            resumen_semanal.append({
+                "fecha": fecha_str,
+                "dia": day.strftime("%A"),
+                "hora_entrada": hora_entrada,
+                "hora_salida": hora_salida,
+                "minutos_trabajados": minutos_dia,
+                "horas_trabajadas": f"{minutos_dia // 60}h {minutos_dia % 60}m"
+            })
         
         return {
             "resumen_semanal": resumen_semanal,
@@ -1,4 +1,6 @@
-from fastapi import APIRouter, HTTPException
+from fastapi import APIRouter, HTTPException, Query
+from pydantic import BaseModel, Field
+from typing import List, Literal
 from uuid import UUID
 
 from dto.codificacion_facial_dto.endodig_face_request_dto import EncodingFaceCreateDTO
@@ -8,6 +10,16 @@ from services.encoding_face_service import EncodingFaceService
 router = APIRouter(prefix="/encoding-face", tags=["Encoding Face"])
 
 
+class PrecisionGaleriaDTO(BaseModel):
+    precision: Literal["float32", "float16", "int8"]
+    forzar: bool = False
+
+
+class DiagnosticoGaleriaDTO(BaseModel):
+    embedding: List[float] = Field(..., min_length=64, max_length=512)
+    k: int = Field(10, ge=1, le=100)
+
+
 @router.post("/", response_model=EncodingFaceResponseDTO, status_code=201)
 async def crear_codificacion_facial(data: EncodingFaceCreateDTO):
     """
@@ -15,12 +27,16 @@ async def crear_codificacion_facial(data: EncodingFaceCreateDTO):
     
     - **personal_id**: UUID del personal al que pertenece la codificación
     - **embedding**: Array de números flotantes que representa el embedding facial
-      (vector de 128 valores para modelos estándar como face_recognition)
+      (vector de 128 valores para modelos estándar como face_recognition). Debe tener
+      EMBEDDING_DIMENSION valores; se guarda L2-normalizado
     
     **Nota:** El personal debe existir previamente en el sistema. Un personal puede tener
     múltiples codificaciones faciales (útil para diferentes ángulos o condiciones de iluminación).
     """
-    result = await EncodingFaceService.create(data)
+    try:
+        result = await EncodingFaceService.create(data)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
 
     if not result:
         raise HTTPException(status_code=400, detail="No se pudo crear la codificación facial")
@@ -40,6 +56,67 @@ async def listar():
     return result
 
 
+@router.get("/galeria/estado")
+async def estado_galeria():
+    """
+    Estado de la galería de embeddings en memoria de este worker: formato de
+    almacenamiento, filas, memoria residente por dimensión y si usa índice ANN.
+    """
+    return await EncodingFaceService.estado_galeria()
+
+
+@router.post("/galeria/diagnostico")
+async def diagnostico_galeria(data: DiagnosticoGaleriaDTO):
+    """
+    Top-k de la galería para un embedding (uso administrativo), para ajustar
+    `threshold`/`min_margin` sin pasar por /asistencia/realtime.
+
+    Retorna `candidatos` (encoding_id, personal_id, score) de mayor a menor, el
+    `score` y `segundo_score` que evalúa /asistencia/realtime, su `margen` y
+    `mejor_otra_persona`: el mejor score entre los candidatos que pertenecen a otra
+    persona (null si los k son de la misma).
+    """
+    return await EncodingFaceService.diagnostico_galeria(data.embedding, data.k)
+
+
+@router.get("/galeria/vecindario")
+async def vecindario_galeria(limite: int = Query(50, ge=1, le=1000, description="Cantidad de pares")):
+    """
+    Pares de personas registradas cuyas plantillas están más cerca entre sí
+    (mayor score primero). Un par con score cercano al threshold indica personas
+    que el kiosco podría confundir. Recorre toda la galería: costo O(n²).
+    """
+    return await EncodingFaceService.vecindario_galeria(limite)
+
+
+@router.get("/galeria/precision")
+async def evaluar_precision_galeria(
+    precision: Literal["float32", "float16", "int8"] = Query(..., description="Formato a evaluar")
+):
+    """
+    Compara un formato cuantizado contra float32 sobre la galería actual, sin habilitarlo.
+
+    Retorna memoria (bytes), tiempo de escaneo por consulta, error máximo/medio de score,
+    porcentaje de consultas con el mismo top-1 y si el error está dentro de la tolerancia (`apto`).
+    """
+    return await EncodingFaceService.evaluar_precision_galeria(precision)
+
+
+@router.put("/galeria/precision")
+async def cambiar_precision_galeria(data: PrecisionGaleriaDTO):
+    """
+    Habilita un formato de almacenamiento para la galería de este worker.
+
+    Primero ejecuta la misma evaluación que GET /galeria/precision; si el error supera
+    la tolerancia retorna 409 con el reporte, salvo que se envíe `forzar: true`.
+    Para todos los workers use la variable de entorno GALERIA_PRECISION.
+    """
+    reporte = await EncodingFaceService.cambiar_precision_galeria(data.precision, data.forzar)
+    if not reporte["habilitado"]:
+        raise HTTPException(status_code=409, detail=reporte)
+    return reporte
+
+
 @router.get("/{id}", response_model=EncodingFaceResponseDTO)
 async def obtener_por_id(id: UUID):
     """
@@ -1,4 +1,6 @@
-from fastapi import APIRouter, HTTPException, BackgroundTasks, Request
+from fastapi import APIRouter, HTTPException, BackgroundTasks, Request, Query
+from fastapi.responses import Response, RedirectResponse
+from typing import Optional
 from fastapi.exceptions import RequestValidationError
 import logging
 
@@ -10,6 +12,8 @@ from dto.personal_dto.personal_update_dto import PersonalUpdateDTO
 from dto.personal_dto.personal_response_dto import PersonalResponseDTO
 from dto.personal_dto.personal_with_encoding_dto import PersonalWithEncodingCreateDTO, PersonalWithEncodingResponseDTO
 from services.personal_service import PersonalService
+from services.foto_perfil_service import FotoPerfilService, url_foto, etag_foto
+from config.fotos_config import FOTO_MINIATURA_TAMANOS, FOTO_CACHE_SEGUNDOS
 
 from pydantic import BaseModel, EmailStr, Field
 
@@ -73,7 +77,7 @@ async def crear_personal(data: PersonalCreateDTO):
         filtered = {
             k: result[k] for k in (
                 "id", "dni", "nombre", "apellido_paterno", "apellido_materno",
-                "email", "es_administrador", "codificacion_facial", "foto_base64"
+                "email", "es_administrador", "foto_url", "foto_hash"
             ) if k in result
         }
         return filtered
@@ -162,7 +166,7 @@ async def listar_personal():
     Retorna un array con los datos de cada personal, excluyendo información sensible
     como contraseñas. Cada elemento incluye:
     - id, dni, nombre, apellido_paterno, apellido_materno
-    - email, es_administrador, codificacion_facial
+    - email, es_administrador, foto_url, foto_hash (la imagen se descarga desde foto_url)
     """
     result = await PersonalService.list_all()
 
@@ -170,7 +174,7 @@ async def listar_personal():
     cleaned = [
         {k: row[k] for k in (
             "id", "dni", "nombre", "apellido_paterno", "apellido_materno",
-            "email", "es_administrador", "codificacion_facial", "foto_base64"
+            "email", "es_administrador", "foto_url", "foto_hash"
         ) if k in row}
         for row in result
     ]
@@ -178,6 +182,19 @@ async def listar_personal():
     return cleaned
 
 
+# -------------------------------------------------
+#   MÉTRICAS DE CACHÉ
+# -------------------------------------------------
+# Debe declararse antes de /{personal_id} para que "cache" no se tome como id
+@router.get("/cache")
+async def estado_cache_personal():
+    """
+    Métricas de las cachés de este worker: lecturas de personal por id (TTL/LRU)
+    y fotos de perfil decodificadas. Incluye aciertos, fallos y tasa de aciertos.
+    """
+    return PersonalService.estado_caches()
+
+
 # -------------------------------------------------
 #   OBTENER POR ID
 # -------------------------------------------------
@@ -299,6 +316,7 @@ async def reset_password(token: str, data: ResetPasswordDTO):
 async def obtener_foto_perfil(personal_id: UUID):
     """
     Obtiene la foto de perfil de un personal en formato Base64.
+    Para mostrarla es preferible foto_url (imagen binaria cacheable).
     """
     result = await PersonalService.get_foto(personal_id)
     if not result:
@@ -319,3 +337,47 @@ async def actualizar_foto_perfil(personal_id: UUID, data: FotoUpdateDTO):
         raise HTTPException(status_code=400, detail="No se pudo actualizar la foto")
     return {"message": "Foto de perfil actualizada correctamente", "data": result}
 
+
+
+@router.get("/{personal_id}/foto/{foto_hash}")
+async def descargar_foto_perfil(
+    personal_id: UUID,
+    foto_hash: str,
+    request: Request,
+    tamano: Optional[int] = Query(None, description=f"Miniatura: lado máximo en px ({', '.join(map(str, FOTO_MINIATURA_TAMANOS))})"),
+):
+    """
+    Descarga la foto de perfil como imagen. Es la URL que devuelven los listados y el
+    login en foto_url: incluye el hash del contenido, por lo que se cachea por
+    tiempo indefinido y se revalida con If-None-Match (304 sin consultar la BD).
+
+    - **tamano**: opcional, genera una miniatura en el servidor
+    """
+    if tamano is not None and tamano not in FOTO_MINIATURA_TAMANOS:
+        raise HTTPException(
+            status_code=400,
+            detail=f"tamano debe ser uno de {FOTO_MINIATURA_TAMANOS}"
+        )
+
+    etag = etag_foto(foto_hash, tamano)
+    headers = {
+        "ETag": etag,
+        "Cache-Control": f"public, max-age={FOTO_CACHE_SEGUNDOS}, immutable",
+    }
+    if_none_match = request.headers.get("if-none-match", "")
+    if etag in [e.strip().removeprefix("W/") for e in if_none_match.split(",")] or if_none_match.strip() == "*":
+        return Response(status_code=304, headers=headers)
+
+    try:
+        foto = await FotoPerfilService.obtener(personal_id, foto_hash, tamano)
+    except ValueError as e:
+        raise HTTPException(status_code=422, detail=str(e))
+    if not foto:
+        raise HTTPException(status_code=404, detail="Foto de perfil no encontrada")
+
+    if foto.hash != foto_hash:
+        # La foto cambió: redirigir a la URL vigente (la redirección no se cachea)
+        url = url_foto(personal_id, foto.hash) + (f"?tamano={tamano}" if tamano else "")
+        return RedirectResponse(url, status_code=307, headers={"Cache-Control": "no-cache"})
+
+    return Response(content=foto.contenido, media_type=foto.media_type, headers=headers)
@@ -1,9 +1,15 @@
-from fastapi import APIRouter, Query, HTTPException
+import os
+
+from fastapi import APIRouter, Query, HTTPException, status
+from fastapi.responses import FileResponse
 from typing import List, Optional
 from uuid import UUID
+from datetime import date
 
 from services.reporte_service import ReporteService
+from services.reporte_trabajos import get_cola_reportes, ColaLlena, COMPLETADO
 from dto.reporte_dto.reporte_mensual_item_dto import ReporteMensualItemDTO
+from dto.reporte_dto.reporte_trabajo_dto import ReporteTrabajoCreateDTO
 
 router = APIRouter(
     prefix="/reportes",
@@ -21,3 +27,73 @@ async def get_reporte_mensual(
         return reporte
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
+
+
+@router.get("/cache")
+async def get_estado_cache():
+    """Métricas de la caché de reportes mensuales de este proceso."""
+    return ReporteService.estado_cache()
+
+
+# Periodos de varios meses (p. ej. trimestral o anual)
+MAX_DIAS_PERIODO = 366
+
+@router.get("/periodo", response_model=List[ReporteMensualItemDTO])
+async def get_reporte_periodo(
+    fecha_inicio: date = Query(..., description="Primer día del periodo"),
+    fecha_fin: date = Query(..., description="Último día del periodo (inclusive)"),
+    personal_id: Optional[UUID] = Query(None, description="ID del personal para filtrar (opcional)")
+):
+    if fecha_fin < fecha_inicio:
+        raise HTTPException(status_code=400, detail="fecha_fin debe ser igual o posterior a fecha_inicio")
+    if (fecha_fin - fecha_inicio).days + 1 > MAX_DIAS_PERIODO:
+        raise HTTPException(status_code=400, detail=f"El periodo no puede superar {MAX_DIAS_PERIODO} días")
+    try:
+        return await ReporteService.generar_reporte_periodo(fecha_inicio, fecha_fin, personal_id)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+# Reportes en segundo plano: no mantienen abierto el request mientras se calculan
+@router.post("/trabajos", status_code=status.HTTP_202_ACCEPTED)
+async def crear_trabajo(dto: ReporteTrabajoCreateDTO):
+    """
+    Encola un reporte (mes y anio, o fecha_inicio y fecha_fin) y retorna su id.
+    El estado se consulta en GET /reportes/trabajos/{id} y el resultado se descarga
+    de GET /reportes/trabajos/{id}/resultado.
+    """
+    if dto.fecha_inicio and (dto.fecha_fin - dto.fecha_inicio).days + 1 > MAX_DIAS_PERIODO:
+        raise HTTPException(status_code=400, detail=f"El periodo no puede superar {MAX_DIAS_PERIODO} días")
+    try:
+        return await get_cola_reportes().encolar(dto.model_dump(mode="json"))
+    except ColaLlena as e:
+        raise HTTPException(status_code=503, detail=str(e))
+
+
+@router.get("/trabajos/estado")
+async def get_estado_trabajos():
+    """Workers, cola y memoria en uso de los reportes en segundo plano de este proceso."""
+    return get_cola_reportes().estadisticas()
+
+
+@router.get("/trabajos/{trabajo_id}")
+async def get_trabajo(trabajo_id: str):
+    trabajo = await get_cola_reportes().obtener(trabajo_id)
+    if not trabajo:
+        raise HTTPException(status_code=404, detail="Trabajo no encontrado o expirado")
+    return trabajo
+
+
+@router.get("/trabajos/{trabajo_id}/resultado", response_model=List[ReporteMensualItemDTO])
+async def get_resultado_trabajo(trabajo_id: str):
+    cola = get_cola_reportes()
+    trabajo = await cola.obtener(trabajo_id)
+    if not trabajo:
+        raise HTTPException(status_code=404, detail="Trabajo no encontrado o expirado")
+    if trabajo["estado"] != COMPLETADO:
+        raise HTTPException(status_code=409, detail=f"El reporte aún no está listo (estado: {trabajo['estado']})")
+    ruta = cola.ruta_resultado(trabajo_id)
+    if not os.path.exists(ruta):
+        raise HTTPException(status_code=404, detail="Trabajo no encontrado o expirado")
+    # Ya serializado en disco: se envía tal cual, sin volver a validar cada fila
+    return FileResponse(ruta, media_type="application/json", filename=f"reporte_{trabajo_id}.json")
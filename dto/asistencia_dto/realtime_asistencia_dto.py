@@ -25,6 +25,7 @@ class RealtimeAsistenciaDTO(BaseModel):
     tipo_registro: Optional[str] = None
     imagen_base64: Optional[str] = None
     solo_validar: bool = False
+    kiosco_id: Optional[str] = None  # Identifica el kiosco para la caché de frames repetidos
     threshold: Optional[float] = 0.78  # Umbral de similitud configurable
     min_margin: Optional[float] = 0.08  # Margen mínimo entre matches
 
@@ -0,0 +1,38 @@
+
+"""
+DTO para reconocer varios rostros de un mismo frame del kiosco en un solo request
+"""
+from pydantic import BaseModel, field_validator, ConfigDict
+from typing import Optional, List
+from datetime import datetime
+
+class RealtimeLoteAsistenciaDTO(BaseModel):
+
+    model_config = ConfigDict(
+        json_schema_extra={
+            "example": {
+                "embeddings": [[0.01, -0.02, 0.003], [0.04, 0.01, -0.007]],
+                "marca_tiempo": "2025-12-04T12:34:56.789Z",
+                "solo_validar": False
+            }
+        }
+    )
+
+    embeddings: List[List[float]]
+    marca_tiempo: Optional[datetime] = None
+    solo_validar: bool = False
+    threshold: Optional[float] = 0.78  # Umbral de similitud configurable
+    min_margin: Optional[float] = 0.08  # Margen mínimo entre matches
+
+    @field_validator("embeddings")
+    def check_embeddings(cls, v):
+        if not v:
+            raise ValueError("embeddings must contain at least one embedding")
+        if len(v) > 20:
+            raise ValueError("embeddings must have at most 20 faces")
+        for emb in v:
+            if len(emb) < 64:
+                raise ValueError("each embedding must have at least 64 values")
+            if len(emb) > 512:
+                raise ValueError("each embedding must have at most 512 values")
+        return [[float(x) for x in emb] for emb in v]
@@ -12,7 +12,9 @@ class PersonalResponseDTO(BaseModel):
     apellido_materno: str
     email: EmailStr
     es_administrador: bool
-    foto_base64: str | None = None
+    # La imagen se descarga aparte desde foto_url (con caché por hash)
+    foto_url: str | None = None
+    foto_hash: str | None = None
 
     class Config:
         from_attributes = True
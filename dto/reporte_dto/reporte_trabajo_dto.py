@@ -0,0 +1,44 @@
+"""
+DTO para pedir un reporte en segundo plano: un mes (mes y anio) o un periodo
+(fecha_inicio y fecha_fin), opcionalmente de una sola persona.
+"""
+from pydantic import BaseModel, ConfigDict, model_validator
+from typing import Optional
+from uuid import UUID
+from datetime import date
+
+class ReporteTrabajoCreateDTO(BaseModel):
+
+    model_config = ConfigDict(
+        json_schema_extra={
+            "example": {
+                "fecha_inicio": "2025-01-01",
+                "fecha_fin": "2025-12-31",
+                "personal_id": None
+            }
+        }
+    )
+
+    mes: Optional[int] = None
+    anio: Optional[int] = None
+    fecha_inicio: Optional[date] = None
+    fecha_fin: Optional[date] = None
+    personal_id: Optional[UUID] = None
+
+    @model_validator(mode="after")
+    def check_periodo(self):
+        mensual = self.mes is not None or self.anio is not None
+        periodo = self.fecha_inicio is not None or self.fecha_fin is not None
+        if mensual == periodo:
+            raise ValueError("indique mes y anio, o fecha_inicio y fecha_fin")
+        if mensual:
+            if self.mes is None or self.anio is None:
+                raise ValueError("mes y anio son obligatorios juntos")
+            if not 1 <= self.mes <= 12 or self.anio < 2000:
+                raise ValueError("mes debe estar entre 1 y 12 y anio ser 2000 o posterior")
+        else:
+            if self.fecha_inicio is None or self.fecha_fin is None:
+                raise ValueError("fecha_inicio y fecha_fin son obligatorias juntas")
+            if self.fecha_fin < self.fecha_inicio:
+                raise ValueError("fecha_fin debe ser igual o posterior a fecha_inicio")
+        return self
@@ -1,6 +1,7 @@
 from dotenv import load_dotenv
 load_dotenv()  # Cargar variables de entorno desde .env
 
+from contextlib import asynccontextmanager
 from fastapi import FastAPI, Request
 from fastapi.exceptions import RequestValidationError
 from fastapi.responses import JSONResponse
@@ -11,6 +12,9 @@ from fastapi.middleware.cors import CORSMiddleware
 from docs.api_info import API_TITLE, API_DESCRIPTION, API_VERSION, API_CONTACT
 from controllers.horario_controller import router as HorariosRouter
 from controllers.reportes_controller import router as ReportesRouter
+from services.face_gallery import get_face_gallery
+from services.reporte_trabajos import get_cola_reportes
+from config.postgresClient import cerrar_pool
 import logging
 
 # Configurar logging
@@ -21,12 +25,38 @@ logger = logging.getLogger(__name__)
 logging.getLogger("httpx").setLevel(logging.WARNING)
 
 
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Precargar la galería facial (desde el snapshot en disco si existe) para que
+    # el primer reconocimiento no pague la descarga de todos los embeddings
+    gallery = get_face_gallery()
+    try:
+        await gallery.asegurar_cargada()
+    except Exception as e:
+        logger.warning(f"No se pudo precargar la galería facial: {e}")
+
+    # Workers de reportes en segundo plano y limpieza de los resultados expirados
+    get_cola_reportes().iniciar()
+
+    yield
+
+    if gallery.snapshot_desactualizado:
+        await gallery.guardar_snapshot()
+
+    # Reportes en segundo plano sin terminar: quedan en ERROR (interrumpidos)
+    await get_cola_reportes().cerrar()
+
+    # Solo hay pool si DB_BACKEND=postgres
+    await cerrar_pool()
+
+
 app = FastAPI(
     # refencia a la documentacion de la api
     title=API_TITLE,
     description=API_DESCRIPTION,
     version=API_VERSION,
-    contact=API_CONTACT
+    contact=API_CONTACT,
+    lifespan=lifespan
 )
 
 
@@ -0,0 +1,13 @@
+-- Migración: hash del contenido de la foto de perfil
+-- Los listados y el login devuelven solo la URL /personal/{id}/foto/{foto_hash};
+-- la imagen se sirve aparte con ETag y caché de larga duración.
+
+ALTER TABLE fotos_perfil
+  ADD COLUMN IF NOT EXISTS foto_hash VARCHAR(16);
+
+-- Fotos existentes: mismo cálculo que utils/fotos.py (sha256 del texto base64, 16 hex)
+UPDATE fotos_perfil
+SET foto_hash = substr(encode(sha256(convert_to(foto_base64, 'UTF8')), 'hex'), 1, 16)
+WHERE foto_hash IS NULL AND foto_base64 IS NOT NULL;
+
+COMMENT ON COLUMN fotos_perfil.foto_hash IS 'Primeros 16 hex del sha256 de foto_base64; forma parte de la URL de la foto';
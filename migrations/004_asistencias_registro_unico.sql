@@ -0,0 +1,91 @@
+-- Migración: un solo registro por persona, día y tipo en asistencias
+-- El servicio inserta y, si ya existía, recibe el registro existente en la misma
+-- sentencia (sin SELECT previo). Dos kioscos que ven a la misma persona a la vez
+-- ya no pueden duplicar la marcación.
+
+-- Duplicados existentes: se conserva la primera marcación de cada (persona, día, tipo)
+DELETE FROM asistencias a
+USING asistencias b
+WHERE a.personal_id = b.personal_id
+  AND a.fecha = b.fecha
+  AND a.tipo_registro = b.tipo_registro
+  AND (a.marca_tiempo, a.id) > (b.marca_tiempo, b.id);
+
+ALTER TABLE asistencias
+  ADD CONSTRAINT unique_asistencia_por_dia UNIQUE (personal_id, fecha, tipo_registro);
+
+-- El índice de la restricción cubre las consultas por persona (y por persona y día)
+DROP INDEX IF EXISTS idx_asistencias_personal;
+
+-- Inserta las asistencias que no existen y retorna, para cada una pedida, la fila
+-- insertada (ya_registrado = false) o la que ya estaba (ya_registrado = true).
+-- Ambos backends la llaman (Supabase por RPC): una sola sentencia por marcación.
+CREATE OR REPLACE FUNCTION registrar_asistencias(registros JSON)
+RETURNS TABLE (
+    id UUID,
+    personal_id UUID,
+    fecha DATE,
+    marca_tiempo TIMESTAMP WITH TIME ZONE,
+    tipo_registro VARCHAR,
+    estado VARCHAR,
+    motivo TEXT,
+    ya_registrado BOOLEAN
+)
+LANGUAGE plpgsql
+AS $$
+#variable_conflict use_column
+BEGIN
+    RETURN QUERY
+    WITH pedidos AS (
+        SELECT * FROM json_populate_recordset(NULL::asistencias, registros)
+    ), insertados AS (
+        INSERT INTO asistencias (personal_id, fecha, marca_tiempo, tipo_registro, estado, motivo)
+        SELECT p.personal_id, p.fecha, p.marca_tiempo, p.tipo_registro, p.estado, p.motivo FROM pedidos p
+        ON CONFLICT (personal_id, fecha, tipo_registro) DO NOTHING
+        RETURNING asistencias.id, asistencias.personal_id, asistencias.fecha, asistencias.marca_tiempo,
+                  asistencias.tipo_registro, asistencias.estado, asistencias.motivo
+    )
+    SELECT i.*, FALSE FROM insertados i
+    UNION ALL
+    SELECT a.id, a.personal_id, a.fecha, a.marca_tiempo, a.tipo_registro, a.estado, a.motivo, TRUE
+    FROM asistencias a
+    JOIN pedidos p USING (personal_id, fecha, tipo_registro)
+    WHERE NOT EXISTS (
+        SELECT 1 FROM insertados i
+        WHERE i.personal_id = p.personal_id AND i.fecha = p.fecha AND i.tipo_registro = p.tipo_registro
+    );
+END;
+$$;
+
+-- Lo mismo para control_tiempo, que ya tiene unique_registro_por_dia
+CREATE OR REPLACE FUNCTION registrar_control_tiempo(registro JSON)
+RETURNS TABLE (
+    id UUID,
+    personal_id UUID,
+    tipo_registro VARCHAR,
+    fecha DATE,
+    hora TIME,
+    ya_registrado BOOLEAN
+)
+LANGUAGE plpgsql
+AS $$
+#variable_conflict use_column
+BEGIN
+    RETURN QUERY
+    WITH pedido AS (
+        SELECT * FROM json_populate_record(NULL::control_tiempo, registro)
+    ), insertado AS (
+        INSERT INTO control_tiempo (personal_id, tipo_registro, fecha, hora, created_at)
+        SELECT p.personal_id, p.tipo_registro, p.fecha, p.hora, COALESCE(p.created_at, NOW()) FROM pedido p
+        ON CONFLICT (personal_id, fecha, tipo_registro) DO NOTHING
+        RETURNING control_tiempo.id, control_tiempo.personal_id, control_tiempo.tipo_registro,
+                  control_tiempo.fecha, control_tiempo.hora
+    )
+    SELECT i.*, FALSE FROM insertado i
+    UNION ALL
+    SELECT c.id, c.personal_id, c.tipo_registro, c.fecha, c.hora, TRUE
+    FROM control_tiempo c
+    JOIN pedido p USING (personal_id, fecha, tipo_registro)
+    WHERE NOT EXISTS (SELECT 1 FROM insertado);
+END;
+$$;
@@ -0,0 +1,9 @@
+-- Migración: índices para las solicitudes aprobadas de un rango de fechas
+-- El reporte mensual trae en una sola consulta por tabla las solicitudes aprobadas
+-- que se superponen con el mes (find_aprobadas_por_rango), de todo el personal.
+
+CREATE INDEX IF NOT EXISTS idx_ausencias_estado_rango
+ON solicitudes_ausencias (estado_solicitud, fecha_inicio, fecha_fin);
+
+CREATE INDEX IF NOT EXISTS idx_sobretiempo_estado_fecha
+ON solicitudes_sobretiempo (estado_solicitud, fecha_trabajo);
@@ -0,0 +1,143 @@
+-- Migración: resumen diario de asistencia por persona
+-- Una fila por (personal_id, fecha) con lo que el estado del día y los reportes
+-- calculaban en cada request a partir de las marcaciones: primera y última marca,
+-- minutos de mañana y de tarde, y tardanzas/salidas anticipadas por turno.
+-- Un trigger sobre asistencias la recalcula en cada escritura (solo las marcas de
+-- esa persona y ese día); al final de la migración se construye el historial y
+-- rellenar_resumen_diario queda para repararla por rangos.
+
+CREATE TABLE IF NOT EXISTS asistencia_resumen_diario (
+    personal_id UUID NOT NULL REFERENCES personal(id) ON DELETE CASCADE,
+    fecha DATE NOT NULL,
+    primera_marca TIMESTAMP WITH TIME ZONE NOT NULL,
+    ultima_marca TIMESTAMP WITH TIME ZONE NOT NULL,
+    marcaciones SMALLINT NOT NULL,
+    -- ENTRADA_M a SALIDA_M y ENTRADA_T a SALIDA_T (0 si falta alguna de las dos)
+    minutos_manana NUMERIC NOT NULL DEFAULT 0,
+    minutos_tarde NUMERIC NOT NULL DEFAULT 0,
+    tardanza_m BOOLEAN NOT NULL DEFAULT FALSE,
+    tardanza_t BOOLEAN NOT NULL DEFAULT FALSE,
+    salida_anticipada_m BOOLEAN NOT NULL DEFAULT FALSE,
+    salida_anticipada_t BOOLEAN NOT NULL DEFAULT FALSE,
+    actualizado_en TIMESTAMP WITH TIME ZONE DEFAULT NOW() NOT NULL,
+    PRIMARY KEY (personal_id, fecha)
+);
+
+-- Estado del día y reportes de todo el personal: por fecha o rango de fechas
+CREATE INDEX IF NOT EXISTS idx_resumen_diario_fecha ON asistencia_resumen_diario (fecha);
+
+-- Cálculo del resumen a partir de las marcaciones (una fila por persona y día con marcas)
+CREATE OR REPLACE VIEW asistencia_resumen_calculado AS
+SELECT
+    personal_id,
+    fecha,
+    MIN(marca_tiempo) AS primera_marca,
+    MAX(marca_tiempo) AS ultima_marca,
+    COUNT(*)::SMALLINT AS marcaciones,
+    COALESCE(EXTRACT(EPOCH FROM
+        MIN(marca_tiempo) FILTER (WHERE tipo_registro = 'SALIDA_M')
+        - MIN(marca_tiempo) FILTER (WHERE tipo_registro = 'ENTRADA_M')
+    ) / 60, 0) AS minutos_manana,
+    COALESCE(EXTRACT(EPOCH FROM
+        MIN(marca_tiempo) FILTER (WHERE tipo_registro = 'SALIDA_T')
+        - MIN(marca_tiempo) FILTER (WHERE tipo_registro = 'ENTRADA_T')
+    ) / 60, 0) AS minutos_tarde,
+    BOOL_OR(tipo_registro = 'ENTRADA_M' AND estado = 'TARDE') AS tardanza_m,
+    BOOL_OR(tipo_registro = 'ENTRADA_T' AND estado = 'TARDE') AS tardanza_t,
+    BOOL_OR(tipo_registro = 'SALIDA_M' AND estado = 'SALIDA_ANTICIPADA') AS salida_anticipada_m,
+    BOOL_OR(tipo_registro = 'SALIDA_T' AND estado = 'SALIDA_ANTICIPADA') AS salida_anticipada_t
+FROM asistencias
+GROUP BY personal_id, fecha;
+
+-- Recalcula el resumen de una persona en un día (lo elimina si ya no tiene marcas)
+CREATE OR REPLACE FUNCTION recalcular_resumen_diario(p_personal_id UUID, p_fecha DATE)
+RETURNS VOID
+LANGUAGE plpgsql
+AS $$
+BEGIN
+    INSERT INTO asistencia_resumen_diario (
+        personal_id, fecha, primera_marca, ultima_marca, marcaciones, minutos_manana, minutos_tarde,
+        tardanza_m, tardanza_t, salida_anticipada_m, salida_anticipada_t, actualizado_en
+    )
+    SELECT c.*, NOW() FROM asistencia_resumen_calculado c
+    WHERE c.personal_id = p_personal_id AND c.fecha = p_fecha
+    ON CONFLICT (personal_id, fecha) DO UPDATE SET
+        primera_marca = EXCLUDED.primera_marca,
+        ultima_marca = EXCLUDED.ultima_marca,
+        marcaciones = EXCLUDED.marcaciones,
+        minutos_manana = EXCLUDED.minutos_manana,
+        minutos_tarde = EXCLUDED.minutos_tarde,
+        tardanza_m = EXCLUDED.tardanza_m,
+        tardanza_t = EXCLUDED.tardanza_t,
+        salida_anticipada_m = EXCLUDED.salida_anticipada_m,
+        salida_anticipada_t = EXCLUDED.salida_anticipada_t,
+        actualizado_en = EXCLUDED.actualizado_en;
+
+    IF NOT FOUND THEN
+        DELETE FROM asistencia_resumen_diario WHERE personal_id = p_personal_id AND fecha = p_fecha;
+    END IF;
+END;
+$$;
+
+CREATE OR REPLACE FUNCTION asistencias_actualizar_resumen()
+RETURNS TRIGGER
+LANGUAGE plpgsql
+AS $$
+BEGIN
+    IF TG_OP IN ('UPDATE', 'DELETE') THEN
+        PERFORM recalcular_resumen_diario(OLD.personal_id, OLD.fecha);
+    END IF;
+    IF TG_OP IN ('INSERT', 'UPDATE')
+       AND (TG_OP = 'INSERT' OR (OLD.personal_id, OLD.fecha) IS DISTINCT FROM (NEW.personal_id, NEW.fecha)) THEN
+        PERFORM recalcular_resumen_diario(NEW.personal_id, NEW.fecha);
+    END IF;
+    RETURN NULL;
+END;
+$$;
+
+DROP TRIGGER IF EXISTS trg_asistencias_resumen_diario ON asistencias;
+CREATE TRIGGER trg_asistencias_resumen_diario
+AFTER INSERT OR UPDATE OR DELETE ON asistencias
+FOR EACH ROW EXECUTE FUNCTION asistencias_actualizar_resumen();
+
+-- Reconstruye el resumen de un rango de fechas desde las marcaciones (historial o
+-- reparación). Retorna la cantidad de filas escritas.
+CREATE OR REPLACE FUNCTION rellenar_resumen_diario(desde DATE, hasta DATE)
+RETURNS INTEGER
+LANGUAGE plpgsql
+AS $$
+DECLARE
+    escritas INTEGER;
+BEGIN
+    DELETE FROM asistencia_resumen_diario r
+    WHERE r.fecha BETWEEN desde AND hasta
+      AND NOT EXISTS (
+          SELECT 1 FROM asistencias a WHERE a.personal_id = r.personal_id AND a.fecha = r.fecha
+      );
+
+    INSERT INTO asistencia_resumen_diario (
+        personal_id, fecha, primera_marca, ultima_marca, marcaciones, minutos_manana, minutos_tarde,
+        tardanza_m, tardanza_t, salida_anticipada_m, salida_anticipada_t, actualizado_en
+    )
+    SELECT c.*, NOW() FROM asistencia_resumen_calculado c
+    WHERE c.fecha BETWEEN desde AND hasta
+    ON CONFLICT (personal_id, fecha) DO UPDATE SET
+        primera_marca = EXCLUDED.primera_marca,
+        ultima_marca = EXCLUDED.ultima_marca,
+        marcaciones = EXCLUDED.marcaciones,
+        minutos_manana = EXCLUDED.minutos_manana,
+        minutos_tarde = EXCLUDED.minutos_tarde,
+        tardanza_m = EXCLUDED.tardanza_m,
+        tardanza_t = EXCLUDED.tardanza_t,
+        salida_anticipada_m = EXCLUDED.salida_anticipada_m,
+        salida_anticipada_t = EXCLUDED.salida_anticipada_t,
+        actualizado_en = EXCLUDED.actualizado_en;
+
+    GET DIAGNOSTICS escritas = ROW_COUNT;
+    RETURN escritas;
+END;
+$$;
+
+-- Historial: sin esto las fechas anteriores a la migración se verían sin marcas
+-- (todos AUSENTE y cada día laborable como falta en los reportes)
+SELECT rellenar_resumen_diario(MIN(fecha), MAX(fecha)) FROM asistencias;
@@ -0,0 +1,160 @@
+-- Migración: versión de los datos de cada mes para la caché de reportes
+-- El reporte mensual calculado se guarda en caché (services/reporte_cache.py) junto
+-- con la versión de su mes. Los triggers incrementan la versión de cada mes que
+-- toca una asistencia, una solicitud de ausencia o de sobretiempo, y la clave
+-- 'personal' cuando cambian los datos del personal que muestra el reporte. Leer la
+-- versión es una consulta por clave primaria: si no cambió, el reporte en caché
+-- sigue siendo válido aunque la escritura la haya hecho otro worker o un script.
+-- rellenar_resumen_diario (migrations/006) reescribe el resumen que lee el reporte,
+-- así que también incrementa la versión de los meses que reconstruye.
+
+CREATE TABLE IF NOT EXISTS reporte_version (
+    clave VARCHAR(20) PRIMARY KEY,          -- 'YYYY-MM' o 'personal'
+    version BIGINT NOT NULL DEFAULT 1,
+    actualizado_en TIMESTAMP WITH TIME ZONE DEFAULT NOW() NOT NULL
+);
+
+CREATE OR REPLACE FUNCTION reporte_version_incrementar(claves TEXT[])
+RETURNS VOID
+LANGUAGE sql
+AS $$
+    INSERT INTO reporte_version (clave)
+    SELECT DISTINCT c FROM unnest(claves) c
+    ON CONFLICT (clave) DO UPDATE SET
+        version = reporte_version.version + 1,
+        actualizado_en = NOW();
+$$;
+
+-- Meses ('YYYY-MM') que cubre un rango de fechas
+CREATE OR REPLACE FUNCTION reporte_meses(desde DATE, hasta DATE)
+RETURNS TEXT[]
+LANGUAGE sql
+IMMUTABLE
+AS $$
+    SELECT COALESCE(array_agg(to_char(m, 'YYYY-MM')), '{}')
+    FROM generate_series(date_trunc('month', desde), date_trunc('month', COALESCE(hasta, desde)), INTERVAL '1 month') m;
+$$;
+
+CREATE OR REPLACE FUNCTION reporte_version_asistencias()
+RETURNS TRIGGER
+LANGUAGE plpgsql
+AS $$
+DECLARE
+    claves TEXT[] := '{}';
+BEGIN
+    IF TG_OP IN ('UPDATE', 'DELETE') THEN
+        claves := claves || reporte_meses(OLD.fecha, OLD.fecha);
+    END IF;
+    IF TG_OP IN ('INSERT', 'UPDATE') THEN
+        claves := claves || reporte_meses(NEW.fecha, NEW.fecha);
+    END IF;
+    PERFORM reporte_version_incrementar(claves);
+    RETURN NULL;
+END;
+$$;
+
+CREATE OR REPLACE FUNCTION reporte_version_ausencias()
+RETURNS TRIGGER
+LANGUAGE plpgsql
+AS $$
+DECLARE
+    claves TEXT[] := '{}';
+BEGIN
+    IF TG_OP IN ('UPDATE', 'DELETE') THEN
+        claves := claves || reporte_meses(OLD.fecha_inicio, OLD.fecha_fin);
+    END IF;
+    IF TG_OP IN ('INSERT', 'UPDATE') THEN
+        claves := claves || reporte_meses(NEW.fecha_inicio, NEW.fecha_fin);
+    END IF;
+    PERFORM reporte_version_incrementar(claves);
+    RETURN NULL;
+END;
+$$;
+
+CREATE OR REPLACE FUNCTION reporte_version_sobretiempo()
+RETURNS TRIGGER
+LANGUAGE plpgsql
+AS $$
+DECLARE
+    claves TEXT[] := '{}';
+BEGIN
+    IF TG_OP IN ('UPDATE', 'DELETE') THEN
+        claves := claves || reporte_meses(OLD.fecha_trabajo, OLD.fecha_trabajo);
+    END IF;
+    IF TG_OP IN ('INSERT', 'UPDATE') THEN
+        claves := claves || reporte_meses(NEW.fecha_trabajo, NEW.fecha_trabajo);
+    END IF;
+    PERFORM reporte_version_incrementar(claves);
+    RETURN NULL;
+END;
+$$;
+
+CREATE OR REPLACE FUNCTION reporte_version_personal()
+RETURNS TRIGGER
+LANGUAGE plpgsql
+AS $$
+BEGIN
+    PERFORM reporte_version_incrementar(ARRAY['personal']);
+    RETURN NULL;
+END;
+$$;
+
+DROP TRIGGER IF EXISTS trg_asistencias_reporte_version ON asistencias;
+CREATE TRIGGER trg_asistencias_reporte_version
+AFTER INSERT OR UPDATE OR DELETE ON asistencias
+FOR EACH ROW EXECUTE FUNCTION reporte_version_asistencias();
+
+DROP TRIGGER IF EXISTS trg_ausencias_reporte_version ON solicitudes_ausencias;
+CREATE TRIGGER trg_ausencias_reporte_version
+AFTER INSERT OR UPDATE OR DELETE ON solicitudes_ausencias
+FOR EACH ROW EXECUTE FUNCTION reporte_version_ausencias();
+
+DROP TRIGGER IF EXISTS trg_sobretiempo_reporte_version ON solicitudes_sobretiempo;
+CREATE TRIGGER trg_sobretiempo_reporte_version
+AFTER INSERT OR UPDATE OR DELETE ON solicitudes_sobretiempo
+FOR EACH ROW EXECUTE FUNCTION reporte_version_sobretiempo();
+
+-- Solo las columnas que muestra el reporte (no contraseñas, tokens ni fotos)
+DROP TRIGGER IF EXISTS trg_personal_reporte_version ON personal;
+CREATE TRIGGER trg_personal_reporte_version
+AFTER INSERT OR DELETE OR UPDATE OF dni, nombre, apellido_paterno, apellido_materno ON personal
+FOR EACH ROW EXECUTE FUNCTION reporte_version_personal();
+
+-- Igual que en migrations/006, más el incremento de versión de los meses del rango
+CREATE OR REPLACE FUNCTION rellenar_resumen_diario(desde DATE, hasta DATE)
+RETURNS INTEGER
+LANGUAGE plpgsql
+AS $$
+DECLARE
+    escritas INTEGER;
+BEGIN
+    DELETE FROM asistencia_resumen_diario r
+    WHERE r.fecha BETWEEN desde AND hasta
+      AND NOT EXISTS (
+          SELECT 1 FROM asistencias a WHERE a.personal_id = r.personal_id AND a.fecha = r.fecha
+      );
+
+    INSERT INTO asistencia_resumen_diario (
+        personal_id, fecha, primera_marca, ultima_marca, marcaciones, minutos_manana, minutos_tarde,
+        tardanza_m, tardanza_t, salida_anticipada_m, salida_anticipada_t, actualizado_en
+    )
+    SELECT c.*, NOW() FROM asistencia_resumen_calculado c
+    WHERE c.fecha BETWEEN desde AND hasta
+    ON CONFLICT (personal_id, fecha) DO UPDATE SET
+        primera_marca = EXCLUDED.primera_marca,
+        ultima_marca = EXCLUDED.ultima_marca,
+        marcaciones = EXCLUDED.marcaciones,
+        minutos_manana = EXCLUDED.minutos_manana,
+        minutos_tarde = EXCLUDED.minutos_tarde,
+        tardanza_m = EXCLUDED.tardanza_m,
+        tardanza_t = EXCLUDED.tardanza_t,
+        salida_anticipada_m = EXCLUDED.salida_anticipada_m,
+        salida_anticipada_t = EXCLUDED.salida_anticipada_t,
+        actualizado_en = EXCLUDED.actualizado_en;
+
+    GET DIAGNOSTICS escritas = ROW_COUNT;
+    -- El reporte lee este resumen: los reportes en caché del rango dejan de valer
+    PERFORM reporte_version_incrementar(reporte_meses(desde, hasta));
+    RETURN escritas;
+END;
+$$;
@@ -0,0 +1,81 @@
+"""
+Migración única: normaliza (L2) los embeddings ya guardados en codificacion_facial.
+
+Desde que EncodingFaceService.create guarda los vectores normalizados, el
+reconocimiento es un producto punto; este script lleva las filas anteriores al
+mismo formato. Las filas cuya dimensión no coincide con EMBEDDING_DIMENSION no se
+pueden comparar correctamente y solo se listan (o se eliminan con --eliminar-invalidos
+para que la persona vuelva a registrar su rostro).
+
+Uso:
+    python normalizar_embeddings.py                 # solo reporta (no modifica nada)
+    python normalizar_embeddings.py --aplicar       # actualiza las filas no normalizadas
+    python normalizar_embeddings.py --aplicar --eliminar-invalidos
+"""
+import argparse
+import asyncio
+import math
+
+from config.reconocimiento_config import EMBEDDING_DIMENSION
+from repository.encoding_face_repository import EncodingFaceRepository
+
+TOLERANCIA = 1e-6
+
+
+async def main(aplicar: bool, eliminar_invalidos: bool, lote: int):
+    ids = await EncodingFaceRepository.find_ids()
+    print(f"Codificaciones en la BD: {len(ids)} (dimensión esperada: {EMBEDDING_DIMENSION})")
+
+    normalizadas = 0
+    actualizar = []
+    invalidas = []
+
+    # Por lotes para no traer todos los embeddings a la vez
+    for i in range(0, len(ids), lote):
+        for row in await EncodingFaceRepository.find_by_ids(ids[i:i + lote]):
+            emb = row.get("embedding") or []
+            norma = math.sqrt(sum(float(x) * float(x) for x in emb))
+            if len(emb) != EMBEDDING_DIMENSION or norma == 0 or not math.isfinite(norma):
+                invalidas.append(row)
+            elif abs(norma - 1.0) <= TOLERANCIA:
+                normalizadas += 1
+            else:
+                actualizar.append({
+                    "id": row["id"],
+                    "personal_id": row["personal_id"],
+                    "embedding": [float(x) / norma for x in emb],
+                })
+
+    print(f"Ya normalizadas: {normalizadas}")
+    print(f"Por normalizar: {len(actualizar)}")
+    print(f"Inválidas (dimensión distinta o norma nula): {len(invalidas)}")
+    for row in invalidas:
+        print(f"  - id={row['id']} personal_id={row['personal_id']} dimensión={len(row.get('embedding') or [])}")
+
+    if not aplicar:
+        print("\nModo reporte: use --aplicar para escribir los cambios.")
+        return
+
+    if actualizar:
+        for j in range(0, len(actualizar), lote):
+            await EncodingFaceRepository.update_embeddings(actualizar[j:j + lote])
+        print(f"✓ {len(actualizar)} codificaciones normalizadas")
+
+    if invalidas and eliminar_invalidos:
+        for row in invalidas:
+            await EncodingFaceRepository.delete(row["id"])
+        print(f"✓ {len(invalidas)} codificaciones inválidas eliminadas")
+
+    # La similitud coseno no cambia al normalizar, así que las galerías en memoria
+    # y los snapshots siguen siendo válidos; las filas eliminadas se quitan en la
+    # próxima reconciliación de cada worker.
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Normaliza los embeddings guardados en codificacion_facial")
+    parser.add_argument("--aplicar", action="store_true", help="Escribe los cambios (por defecto solo reporta)")
+    parser.add_argument("--eliminar-invalidos", action="store_true", help="Elimina las filas con dimensión inválida")
+    parser.add_argument("--lote", type=int, default=500, help="Filas por consulta/actualización")
+    args = parser.parse_args()
+
+    asyncio.run(main(args.aplicar, args.eliminar_invalidos, args.lote))
@@ -0,0 +1,50 @@
+"""
+Reconstruye asistencia_resumen_diario (migrations/006) desde las marcaciones.
+
+La migración ya construye el historial y desde entonces el trigger de asistencias
+mantiene el resumen en cada escritura; este script lo repara para un rango (p. ej.
+tras cargar marcaciones con los triggers deshabilitados). Procesa mes por mes para
+que cada sentencia sea corta y se puede volver a ejecutar sobre el mismo rango sin
+duplicar nada.
+
+Uso:
+    python rellenar_resumen_diario.py --desde 2024-01-01
+    python rellenar_resumen_diario.py --desde 2025-03-01 --hasta 2025-03-31
+"""
+import argparse
+import asyncio
+import calendar
+from datetime import date, datetime, timedelta
+
+from config.timezone_config import LOCAL_TIMEZONE
+from repository.asistencia_resumen_repository import AsistenciaResumenRepository
+
+
+def meses(desde: date, hasta: date):
+    """Tramos (inicio, fin) de a lo más un mes calendario que cubren [desde, hasta]."""
+    inicio = desde
+    while inicio <= hasta:
+        fin = min(date(inicio.year, inicio.month, calendar.monthrange(inicio.year, inicio.month)[1]), hasta)
+        yield inicio, fin
+        inicio = fin + timedelta(days=1)
+
+
+async def main(desde: date, hasta: date):
+    total = 0
+    for inicio, fin in meses(desde, hasta):
+        escritas = await AsistenciaResumenRepository.rellenar(inicio, fin)
+        total += escritas
+        print(f"{inicio} a {fin}: {escritas} días-persona")
+    print(f"✓ {total} filas de resumen escritas ({desde} a {hasta})")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Rellena asistencia_resumen_diario desde las marcaciones")
+    parser.add_argument("--desde", type=date.fromisoformat, required=True, help="Primera fecha (YYYY-MM-DD)")
+    parser.add_argument("--hasta", type=date.fromisoformat, default=None, help="Última fecha (por defecto hoy)")
+    args = parser.parse_args()
+
+    hasta = args.hasta or datetime.now(LOCAL_TIMEZONE).date()
+    if args.desde > hasta:
+        parser.error("--desde debe ser anterior o igual a --hasta")
+    asyncio.run(main(args.desde, hasta))
@@ -1,13 +1,20 @@
 from datetime import date
 
-from config.supabaseClient import get_supabase
+from config.supabaseClient import get_supabase_async
+from config.postgresClient import DB_BACKEND
 
 class AsistenciaRepository:
 
+    # Proyecciones explícitas: cada consulta trae solo lo que usa quien la llama
+    COLUMNAS = "id, personal_id, fecha, marca_tiempo, tipo_registro, estado, motivo"
+    # Historial y estado del día: nombre para mostrar y dni
+    CON_PERSONAL = f"{COLUMNAS}, personal(nombre, apellido_paterno, apellido_materno, dni)"
+
     @staticmethod
     async def obtener_registros_del_dia(personal_id: str, fecha: date):
-        result = get_supabase().table("asistencias") \
-            .select("*") \
+        supabase = await get_supabase_async()
+        result = await supabase.table("asistencias") \
+            .select(AsistenciaRepository.COLUMNAS) \
             .eq("personal_id", str(personal_id)) \
             .eq("fecha", fecha.isoformat()) \
             .execute()
@@ -15,15 +22,44 @@ class AsistenciaRepository:
         return result.data if result.data else []
 
     @staticmethod
-    async def registrar_asistencia(data: dict):
-        result = get_supabase().table("asistencias") \
-            .insert(data) \
+    async def obtener_registros_del_dia_lote(personal_ids: list[str], fecha: date):
+        """Registros del día de varias personas en una sola consulta."""
+        if not personal_ids:
+            return []
+        supabase = await get_supabase_async()
+        result = await supabase.table("asistencias") \
+            .select(AsistenciaRepository.COLUMNAS) \
+            .in_("personal_id", [str(p) for p in personal_ids]) \
+            .eq("fecha", fecha.isoformat()) \
             .execute()
-        return result.data[0] if result.data else None
+
+        return result.data if result.data else []
+
+    @staticmethod
+    async def registrar_asistencia(data: dict):
+        """
+        Inserta la asistencia o, si ya hay una del mismo tipo ese día, retorna la
+        existente. La fila trae `ya_registrado` para distinguir ambos casos.
+        """
+        result = await AsistenciaRepository.registrar_asistencias([data])
+        return result[0] if result else None
+
+    @staticmethod
+    async def registrar_asistencias(data: list[dict]):
+        """
+        Igual que registrar_asistencia para varias asistencias, en un solo request
+        (función registrar_asistencias de migrations/004).
+        """
+        if not data:
+            return []
+        supabase = await get_supabase_async()
+        result = await supabase.rpc("registrar_asistencias", {"registros": data}).execute()
+        return result.data if result.data else []
 
     @staticmethod
     async def obtener_historial(fecha: date = None, personal_id: str = None):
-        query = get_supabase().table("asistencias").select("*, personal(*)")
+        supabase = await get_supabase_async()
+        query = supabase.table("asistencias").select(AsistenciaRepository.CON_PERSONAL)
         
         if fecha:
             query = query.eq("fecha", fecha.isoformat())
@@ -32,19 +68,25 @@ class AsistenciaRepository:
             query = query.eq("personal_id", personal_id)
             
         # Ordenar por fecha y hora descendente
-        result = query.order("marca_tiempo", desc=True).execute()
+        result = await query.order("marca_tiempo", desc=True).execute()
         return result.data if result.data else []
 
     @staticmethod
-    async def obtener_registros_por_rango(fecha_inicio: date, fecha_fin: date, personal_id: str = None):
-        query = get_supabase().table("asistencias").select("*, personal(*)") \
+    async def obtener_registros_por_rango(fecha_inicio: date, fecha_fin: date, personal_id: str = None, con_personal: bool = True):
+        """
+        Asistencias del rango, de la más reciente a la más antigua. Con con_personal=False
+        no se embebe el personal (p. ej. el reporte, que ya lo tiene por separado).
+        """
+        supabase = await get_supabase_async()
+        columnas = AsistenciaRepository.CON_PERSONAL if con_personal else AsistenciaRepository.COLUMNAS
+        query = supabase.table("asistencias").select(columnas) \
             .gte("fecha", fecha_inicio.isoformat()) \
             .lte("fecha", fecha_fin.isoformat())
 
         if personal_id:
             query = query.eq("personal_id", personal_id)
 
-        result = query.order("marca_tiempo", desc=True).execute()
+        result = await query.order("marca_tiempo", desc=True).execute()
         return result.data if result.data else []
 
     @staticmethod
@@ -52,8 +94,9 @@ class AsistenciaRepository:
         """
         Obtiene las asistencias más recientes con información del personal
         """
-        result = get_supabase().table("asistencias") \
-            .select("*, personal(*)") \
+        supabase = await get_supabase_async()
+        result = await supabase.table("asistencias") \
+            .select(AsistenciaRepository.CON_PERSONAL) \
             .order("marca_tiempo", desc=True) \
             .limit(limite) \
             .execute()
@@ -61,8 +104,14 @@ class AsistenciaRepository:
         return result.data if result.data else []
     @staticmethod
     async def delete_by_personal_id(personal_id: str):
-        result = get_supabase().table("asistencias") \
+        supabase = await get_supabase_async()
+        result = await supabase.table("asistencias") \
             .delete() \
             .eq("personal_id", str(personal_id)) \
             .execute()
         return result.data
+
+
+# Con DB_BACKEND=postgres se usa la implementación con conexión directa (misma interfaz)
+if DB_BACKEND == "postgres":
+    from repository.postgres.asistencia_repository import AsistenciaRepository  # noqa: F811
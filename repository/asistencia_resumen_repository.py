@@ -0,0 +1,55 @@
+from datetime import date
+
+from config.supabaseClient import get_supabase_async
+from config.postgresClient import DB_BACKEND
+
+
+class AsistenciaResumenRepository:
+    """
+    Resumen diario por persona (tabla asistencia_resumen_diario de migrations/006).
+    Solo se lee: el trigger de asistencias lo mantiene y rellenar() lo reconstruye.
+    """
+    table = "asistencia_resumen_diario"
+    COLUMNAS = (
+        "personal_id, fecha, primera_marca, ultima_marca, marcaciones, minutos_manana, minutos_tarde, "
+        "tardanza_m, tardanza_t, salida_anticipada_m, salida_anticipada_t"
+    )
+
+    @staticmethod
+    async def obtener_del_dia(fecha: date):
+        """Resumen de todo el personal que marcó en `fecha`."""
+        supabase = await get_supabase_async()
+        result = await supabase.table(AsistenciaResumenRepository.table) \
+            .select(AsistenciaResumenRepository.COLUMNAS) \
+            .eq("fecha", fecha.isoformat()) \
+            .execute()
+        return result.data if result.data else []
+
+    @staticmethod
+    async def obtener_por_rango(fecha_inicio: date, fecha_fin: date, personal_id: str = None):
+        """Una fila por persona y día con marcas en el rango, ordenadas por fecha."""
+        supabase = await get_supabase_async()
+        query = supabase.table(AsistenciaResumenRepository.table) \
+            .select(AsistenciaResumenRepository.COLUMNAS) \
+            .gte("fecha", fecha_inicio.isoformat()) \
+            .lte("fecha", fecha_fin.isoformat())
+
+        if personal_id:
+            query = query.eq("personal_id", str(personal_id))
+
+        result = await query.order("fecha").execute()
+        return result.data if result.data else []
+
+    @staticmethod
+    async def rellenar(desde: date, hasta: date) -> int:
+        """Reconstruye el resumen del rango desde las marcaciones; retorna las filas escritas."""
+        supabase = await get_supabase_async()
+        result = await supabase.rpc(
+            "rellenar_resumen_diario", {"desde": desde.isoformat(), "hasta": hasta.isoformat()}
+        ).execute()
+        return int(result.data or 0)
+
+
+# Con DB_BACKEND=postgres se usa la implementación con conexión directa (misma interfaz)
+if DB_BACKEND == "postgres":
+    from repository.postgres.asistencia_resumen_repository import AsistenciaResumenRepository  # noqa: F811
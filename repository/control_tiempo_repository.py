@@ -0,0 +1,48 @@
+from config.supabaseClient import get_supabase_async
+from config.postgresClient import DB_BACKEND
+
+
+class ControlTiempoRepository:
+    table = "control_tiempo"
+    COLUMNAS = "id, personal_id, tipo_registro, fecha, hora"
+
+    @staticmethod
+    async def registrar(data: dict):
+        """
+        Inserta el registro o, si ya hay uno del mismo tipo ese día, retorna el
+        existente; la fila trae `ya_registrado` (función registrar_control_tiempo
+        de migrations/004).
+        """
+        supabase = await get_supabase_async()
+        result = await supabase.rpc("registrar_control_tiempo", {"registro": data}).execute()
+        return result.data[0] if result.data else None
+
+    @staticmethod
+    async def obtener_del_dia(personal_id: str, fecha: str):
+        supabase = await get_supabase_async()
+        result = await supabase.table(ControlTiempoRepository.table) \
+            .select(ControlTiempoRepository.COLUMNAS) \
+            .eq("personal_id", str(personal_id)) \
+            .eq("fecha", fecha) \
+            .order("hora") \
+            .execute()
+        return result.data if result.data else []
+
+    @staticmethod
+    async def obtener_por_rango(personal_id: str, fecha_inicio: str, fecha_fin: str):
+        """Registros de la persona entre dos fechas (inclusive) en una sola consulta."""
+        supabase = await get_supabase_async()
+        result = await supabase.table(ControlTiempoRepository.table) \
+            .select(ControlTiempoRepository.COLUMNAS) \
+            .eq("personal_id", str(personal_id)) \
+            .gte("fecha", fecha_inicio) \
+            .lte("fecha", fecha_fin) \
+            .order("fecha") \
+            .order("hora") \
+            .execute()
+        return result.data if result.data else []
+
+
+# Con DB_BACKEND=postgres se usa la implementación con conexión directa (misma interfaz)
+if DB_BACKEND == "postgres":
+    from repository.postgres.control_tiempo_repository import ControlTiempoRepository  # noqa: F811
@@ -1,4 +1,5 @@
-from config.supabaseClient import get_supabase
+from config.supabaseClient import get_supabase_async
+from config.postgresClient import DB_BACKEND
 from uuid import UUID
 from typing import Any, Union
 
@@ -7,35 +8,80 @@ class EncodingFaceRepository:
 
     @staticmethod
     async def create(data: dict[str, Any]):
-        supabase = get_supabase()
-        result = supabase.table(EncodingFaceRepository.table).insert(data).execute()
+        supabase = await get_supabase_async()
+        result = await supabase.table(EncodingFaceRepository.table).insert(data).execute()
         return result.data[0] if result.data else None
 
     @staticmethod
     async def find_by_id(id: UUID):
-        supabase = get_supabase()
-        result = supabase.table(EncodingFaceRepository.table).select("*").eq("id", str(id)).execute()
+        supabase = await get_supabase_async()
+        result = await supabase.table(EncodingFaceRepository.table).select("*").eq("id", str(id)).execute()
         return result.data[0] if result.data else None
 
     @staticmethod
     async def find_by_personal_id(personal_id: UUID):
-        supabase = get_supabase()
-        result = supabase.table(EncodingFaceRepository.table).select("*").eq("personal_id", str(personal_id)).execute()
+        supabase = await get_supabase_async()
+        result = await supabase.table(EncodingFaceRepository.table).select("*").eq("personal_id", str(personal_id)).execute()
         return result.data
 
     @staticmethod
     async def find_all():
-        supabase = get_supabase()
-        result = supabase.table(EncodingFaceRepository.table).select("*").execute()
+        supabase = await get_supabase_async()
+        result = await supabase.table(EncodingFaceRepository.table).select("*").execute()
         return result.data
 
+    @staticmethod
+    async def find_ids(page_size: int = 1000):
+        """Solo los ids (sin embeddings), para reconciliar la galería en memoria."""
+        supabase = await get_supabase_async()
+        ids = []
+        # Paginado: PostgREST limita la cantidad de filas por respuesta
+        while True:
+            result = await supabase.table(EncodingFaceRepository.table).select("id") \
+                .order("id") \
+                .range(len(ids), len(ids) + page_size - 1) \
+                .execute()
+            page = result.data or []
+            ids.extend(r["id"] for r in page)
+            if len(page) < page_size:
+                return ids
+
+    @staticmethod
+    async def find_by_ids(ids: list[str], chunk_size: int = 200):
+        supabase = await get_supabase_async()
+        data = []
+        ids = [str(i) for i in ids]
+        # Por lotes para no exceder el largo máximo de la URL
+        for i in range(0, len(ids), chunk_size):
+            result = await supabase.table(EncodingFaceRepository.table).select("*").in_("id", ids[i:i + chunk_size]).execute()
+            data.extend(result.data or [])
+        return data
+
+    @staticmethod
+    async def update_embeddings(rows: list[dict], chunk_size: int = 500):
+        """
+        Actualiza embeddings en bloque con upsert por id. Cada fila debe traer
+        id, personal_id y embedding.
+        """
+        supabase = await get_supabase_async()
+        data = []
+        for i in range(0, len(rows), chunk_size):
+            result = await supabase.table(EncodingFaceRepository.table).upsert(rows[i:i + chunk_size]).execute()
+            data.extend(result.data or [])
+        return data
+
     @staticmethod
     async def delete(id: UUID):
-        supabase = get_supabase()
-        result = supabase.table(EncodingFaceRepository.table).delete().eq("id", str(id)).execute()
+        supabase = await get_supabase_async()
+        result = await supabase.table(EncodingFaceRepository.table).delete().eq("id", str(id)).execute()
         return result.data
     @staticmethod
     async def delete_by_personal_id(personal_id: UUID):
-        supabase = get_supabase()
-        result = supabase.table(EncodingFaceRepository.table).delete().eq("personal_id", str(personal_id)).execute()
+        supabase = await get_supabase_async()
+        result = await supabase.table(EncodingFaceRepository.table).delete().eq("personal_id", str(personal_id)).execute()
         return result.data
+
+
+# Con DB_BACKEND=postgres se usa la implementación con conexión directa (misma interfaz)
+if DB_BACKEND == "postgres":
+    from repository.postgres.encoding_face_repository import EncodingFaceRepository  # noqa: F811
@@ -1,36 +1,46 @@
-from config.supabaseClient import get_supabase
+from config.supabaseClient import get_supabase_async
+from config.postgresClient import DB_BACKEND
 from uuid import UUID
 from typing import Optional
 
+from utils.fotos import hash_foto
+
 class FotoPerfilRepository:
     table = "fotos_perfil"
 
     @staticmethod
     async def create_or_update(personal_id: UUID, foto_base64: str):
-        supabase = get_supabase()
+        supabase = await get_supabase_async()
         # Verificar si ya existe
-        existing = supabase.table(FotoPerfilRepository.table).select("id").eq("personal_id", str(personal_id)).execute()
+        existing = await supabase.table(FotoPerfilRepository.table).select("id").eq("personal_id", str(personal_id)).execute()
         
         data = {
             "personal_id": str(personal_id),
-            "foto_base64": foto_base64
+            "foto_base64": foto_base64,
+            # Parte de la URL de la foto: cambia con el contenido
+            "foto_hash": hash_foto(foto_base64),
         }
         
         if existing.data:
-            result = supabase.table(FotoPerfilRepository.table).update(data).eq("personal_id", str(personal_id)).execute()
+            result = await supabase.table(FotoPerfilRepository.table).update(data).eq("personal_id", str(personal_id)).execute()
         else:
-            result = supabase.table(FotoPerfilRepository.table).insert(data).execute()
+            result = await supabase.table(FotoPerfilRepository.table).insert(data).execute()
             
         return result.data[0] if result.data else None
 
     @staticmethod
     async def find_by_personal_id(personal_id: UUID):
-        supabase = get_supabase()
-        result = supabase.table(FotoPerfilRepository.table).select("*").eq("personal_id", str(personal_id)).execute()
+        supabase = await get_supabase_async()
+        result = await supabase.table(FotoPerfilRepository.table).select("*").eq("personal_id", str(personal_id)).execute()
         return result.data[0] if result.data else None
 
     @staticmethod
     async def delete_by_personal_id(personal_id: UUID):
-        supabase = get_supabase()
-        result = supabase.table(FotoPerfilRepository.table).delete().eq("personal_id", str(personal_id)).execute()
+        supabase = await get_supabase_async()
+        result = await supabase.table(FotoPerfilRepository.table).delete().eq("personal_id", str(personal_id)).execute()
         return result.data
+
+
+# Con DB_BACKEND=postgres se usa la implementación con conexión directa (misma interfaz)
+if DB_BACKEND == "postgres":
+    from repository.postgres.foto_perfil_repository import FotoPerfilRepository  # noqa: F811
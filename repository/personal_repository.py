@@ -1,4 +1,5 @@
-from config.supabaseClient import get_supabase
+from config.supabaseClient import get_supabase_async
+from config.postgresClient import DB_BACKEND
 from uuid import UUID
 from dto.personal_dto.personal_request_dto import PersonalCreateDTO
 from dto.personal_dto.personal_update_dto import PersonalUpdateDTO
@@ -8,30 +9,57 @@ class PersonalRepository:
 
     table = "personal"
 
+    # Columnas públicas (las de PersonalResponseDTO). Se omiten password_hash, los
+    # tokens de recuperación y la columna heredada codificacion_facial.
+    COLUMNAS = "id, dni, nombre, apellido_paterno, apellido_materno, email, es_administrador"
+    # Solo el hash de la foto: la imagen se sirve en /personal/{id}/foto/{hash}
+    CON_FOTO = f"{COLUMNAS}, fotos_perfil(foto_hash)"
+    # Login y recuperación de contraseña
+    CON_CREDENCIALES = f"{CON_FOTO}, password_hash"
+
+    @staticmethod
+    def _columnas(con_foto: bool) -> str:
+        return PersonalRepository.CON_FOTO if con_foto else PersonalRepository.COLUMNAS
+
     @staticmethod
     async def create(data: Union[PersonalCreateDTO, dict[str, Any]]):
-        supabase = get_supabase()
+        supabase = await get_supabase_async()
         # `data` puede ser DTO o dict; usar tal cual si ya es dict
         payload = data if isinstance(data, dict) else data.model_dump()
-        result = supabase.table(PersonalRepository.table).insert(payload).execute()
+        result = await supabase.table(PersonalRepository.table).insert(payload).execute()
         return result.data[0] if result.data else None
 
     @staticmethod
-    async def find_all():
-        supabase = get_supabase()
-        result = supabase.table(PersonalRepository.table).select("*, fotos_perfil(foto_base64)").execute()
+    async def find_all(con_foto: bool = False):
+        supabase = await get_supabase_async()
+        result = await supabase.table(PersonalRepository.table).select(PersonalRepository._columnas(con_foto)).execute()
         return result.data
 
     @staticmethod
-    async def find_by_id(personal_id: UUID):
-        supabase = get_supabase()
-        result = supabase.table(PersonalRepository.table).select("*, fotos_perfil(foto_base64)").eq("id", str(personal_id)).execute()
+    async def contar() -> int:
+        """Cantidad de personal, sin traer las filas."""
+        supabase = await get_supabase_async()
+        result = await supabase.table(PersonalRepository.table).select("id", count="exact").limit(1).execute()
+        return result.count or 0
+
+    @staticmethod
+    async def find_by_id(personal_id: UUID, con_foto: bool = False):
+        supabase = await get_supabase_async()
+        result = await supabase.table(PersonalRepository.table).select(PersonalRepository._columnas(con_foto)).eq("id", str(personal_id)).execute()
         return result.data[0] if result.data else None
 
+    @staticmethod
+    async def find_by_ids(personal_ids: list[UUID]):
+        if not personal_ids:
+            return []
+        supabase = await get_supabase_async()
+        result = await supabase.table(PersonalRepository.table).select(PersonalRepository.COLUMNAS).in_("id", [str(i) for i in personal_ids]).execute()
+        return result.data if result.data else []
+
     @staticmethod
     async def delete(personal_id: UUID):
-        supabase = get_supabase()
-        result = supabase.table(PersonalRepository.table).delete().eq("id", str(personal_id)).execute()
+        supabase = await get_supabase_async()
+        result = await supabase.table(PersonalRepository.table).delete().eq("id", str(personal_id)).execute()
         return result.data
 
     @staticmethod
@@ -39,9 +67,9 @@ class PersonalRepository:
         """
         Actualiza un registro de personal por id.
         """
-        supabase = get_supabase()
+        supabase = await get_supabase_async()
         payload = data if isinstance(data, dict) else data.model_dump(exclude_none=True)
-        result = (
+        result = await (
             supabase
             .table(PersonalRepository.table)
             .update(payload)
@@ -52,24 +80,29 @@ class PersonalRepository:
 
     @staticmethod
     async def find_by_email(email: str):
-        supabase = get_supabase()
-        result = supabase.table(PersonalRepository.table).select("*, fotos_perfil(foto_base64)").eq("email", email).execute()
+        supabase = await get_supabase_async()
+        result = await supabase.table(PersonalRepository.table).select(PersonalRepository.CON_CREDENCIALES).eq("email", email).execute()
         return result.data[0] if result.data else None
 
     @staticmethod
     async def update_password(personal_id: UUID, password_hash: str):
-        supabase = get_supabase()
-        result = supabase.table(PersonalRepository.table).update({"password_hash": password_hash, "password_reset_token": None, "password_reset_expires_at": None}).eq("id", str(personal_id)).execute()
+        supabase = await get_supabase_async()
+        result = await supabase.table(PersonalRepository.table).update({"password_hash": password_hash, "password_reset_token": None, "password_reset_expires_at": None}).eq("id", str(personal_id)).execute()
         return result.data[0] if result.data else None
 
     @staticmethod
     async def set_password_reset_token(personal_id: UUID, token: str, expires_at):
-        supabase = get_supabase()
-        result = supabase.table(PersonalRepository.table).update({"password_reset_token": token, "password_reset_expires_at": expires_at.isoformat()}).eq("id", str(personal_id)).execute()
+        supabase = await get_supabase_async()
+        result = await supabase.table(PersonalRepository.table).update({"password_reset_token": token, "password_reset_expires_at": expires_at.isoformat()}).eq("id", str(personal_id)).execute()
         return result.data[0] if result.data else None
 
     @staticmethod
     async def find_by_reset_token(token: str):
-        supabase = get_supabase()
-        result = supabase.table(PersonalRepository.table).select("*").eq("password_reset_token", token).execute()
+        supabase = await get_supabase_async()
+        result = await supabase.table(PersonalRepository.table).select("id, password_reset_expires_at").eq("password_reset_token", token).execute()
         return result.data[0] if result.data else None
+
+
+# Con DB_BACKEND=postgres se usa la implementación con conexión directa (misma interfaz)
+if DB_BACKEND == "postgres":
+    from repository.postgres.personal_repository import PersonalRepository  # noqa: F811
@@ -0,0 +1,94 @@
+from datetime import date
+
+from repository.postgres.consultas import consultar, eliminar
+
+# Mismas proyecciones que el backend de Supabase
+_COLUMNAS = "id, personal_id, fecha, marca_tiempo, tipo_registro, estado, motivo"
+_COLUMNAS_PERSONAL = "id, nombre, apellido_paterno, apellido_materno, dni"
+
+
+async def _con_personal(registros: list[dict]) -> list[dict]:
+    """
+    Equivalente a select("..., personal(nombre, ...)"): agrega a cada asistencia los
+    datos de su personal. Se lee cada persona una sola vez en lugar de serializarla
+    a JSON en cada fila del JOIN.
+    """
+    ids = list({r["personal_id"] for r in registros})
+    personal = {
+        p["id"]: p for p in await consultar(f"SELECT {_COLUMNAS_PERSONAL} FROM personal WHERE id = ANY($1::uuid[])", ids)
+    } if ids else {}
+    for r in registros:
+        p = personal.get(r["personal_id"])
+        r["personal"] = {k: v for k, v in p.items() if k != "id"} if p else None
+    return registros
+
+
+class AsistenciaRepository:
+
+    @staticmethod
+    async def obtener_registros_del_dia(personal_id: str, fecha: date):
+        return await consultar(
+            f"SELECT {_COLUMNAS} FROM asistencias WHERE personal_id = $1 AND fecha = $2",
+            str(personal_id), fecha,
+        )
+
+    @staticmethod
+    async def obtener_registros_del_dia_lote(personal_ids: list[str], fecha: date):
+        """Registros del día de varias personas en una sola consulta."""
+        if not personal_ids:
+            return []
+        return await consultar(
+            f"SELECT {_COLUMNAS} FROM asistencias WHERE personal_id = ANY($1::uuid[]) AND fecha = $2",
+            [str(p) for p in personal_ids], fecha,
+        )
+
+    @staticmethod
+    async def registrar_asistencia(data: dict):
+        """Inserta la asistencia o retorna la existente del mismo tipo y día (con `ya_registrado`)."""
+        result = await AsistenciaRepository.registrar_asistencias([data])
+        return result[0] if result else None
+
+    @staticmethod
+    async def registrar_asistencias(data: list[dict]):
+        """Igual que registrar_asistencia para varias asistencias, en una sola sentencia."""
+        if not data:
+            return []
+        return await consultar("SELECT * FROM registrar_asistencias($1::json)", data)
+
+    @staticmethod
+    async def obtener_historial(fecha: date = None, personal_id: str = None):
+        condiciones, args = [], []
+        if fecha:
+            args.append(fecha)
+            condiciones.append(f"a.fecha = ${len(args)}")
+        if personal_id:
+            args.append(str(personal_id))
+            condiciones.append(f"a.personal_id = ${len(args)}")
+
+        where = f"WHERE {' AND '.join(condiciones)}" if condiciones else ""
+        return await _con_personal(
+            await consultar(f"SELECT {_COLUMNAS} FROM asistencias a {where} ORDER BY a.marca_tiempo DESC", *args)
+        )
+
+    @staticmethod
+    async def obtener_registros_por_rango(fecha_inicio: date, fecha_fin: date, personal_id: str = None, con_personal: bool = True):
+        args = [fecha_inicio, fecha_fin]
+        where = "WHERE a.fecha BETWEEN $1 AND $2"
+        if personal_id:
+            args.append(str(personal_id))
+            where += " AND a.personal_id = $3"
+        registros = await consultar(f"SELECT {_COLUMNAS} FROM asistencias a {where} ORDER BY a.marca_tiempo DESC", *args)
+        return await _con_personal(registros) if con_personal else registros
+
+    @staticmethod
+    async def obtener_recientes(limite: int = 5):
+        """
+        Obtiene las asistencias más recientes con información del personal
+        """
+        return await _con_personal(
+            await consultar(f"SELECT {_COLUMNAS} FROM asistencias ORDER BY marca_tiempo DESC LIMIT $1", limite)
+        )
+
+    @staticmethod
+    async def delete_by_personal_id(personal_id: str):
+        return await eliminar("asistencias", "personal_id", personal_id)
@@ -0,0 +1,32 @@
+from datetime import date
+
+from config.postgresClient import get_pool
+from repository.postgres.consultas import consultar
+
+# Misma proyección que el backend de Supabase
+_COLUMNAS = (
+    "personal_id, fecha, primera_marca, ultima_marca, marcaciones, minutos_manana, minutos_tarde, "
+    "tardanza_m, tardanza_t, salida_anticipada_m, salida_anticipada_t"
+)
+
+
+class AsistenciaResumenRepository:
+    table = "asistencia_resumen_diario"
+
+    @staticmethod
+    async def obtener_del_dia(fecha: date):
+        return await consultar(f"SELECT {_COLUMNAS} FROM asistencia_resumen_diario WHERE fecha = $1", fecha)
+
+    @staticmethod
+    async def obtener_por_rango(fecha_inicio: date, fecha_fin: date, personal_id: str = None):
+        args = [fecha_inicio, fecha_fin]
+        where = "WHERE fecha BETWEEN $1 AND $2"
+        if personal_id:
+            args.append(str(personal_id))
+            where += " AND personal_id = $3"
+        return await consultar(f"SELECT {_COLUMNAS} FROM asistencia_resumen_diario {where} ORDER BY fecha", *args)
+
+    @staticmethod
+    async def rellenar(desde: date, hasta: date) -> int:
+        pool = await get_pool()
+        return await pool.fetchval("SELECT rellenar_resumen_diario($1, $2)", desde, hasta)
@@ -0,0 +1,119 @@
+"""
+Utilidades comunes del backend Postgres directo (asyncpg).
+
+Las filas se devuelven como dicts con los mismos tipos que el JSON de PostgREST
+(uuid, fechas y horas como texto, numeric como float) para que los servicios no
+distingan entre backends. asyncpg prepara y cachea cada sentencia por conexión.
+"""
+from datetime import date, datetime, time
+from decimal import Decimal
+from typing import Any, Optional
+from uuid import UUID
+
+from config.postgresClient import get_pool
+
+
+def _valor(v):
+    if isinstance(v, UUID):
+        return str(v)
+    if isinstance(v, (datetime, date, time)):
+        return v.isoformat()
+    if isinstance(v, Decimal):
+        return float(v)
+    if isinstance(v, list):
+        return [_valor(x) for x in v]
+    return v
+
+
+def fila(registro) -> Optional[dict]:
+    if registro is None:
+        return None
+    return {k: _valor(v) for k, v in registro.items()}
+
+
+def filas(registros) -> list[dict]:
+    return [fila(r) for r in registros]
+
+
+def identificador(nombre: str) -> str:
+    return '"' + nombre.replace('"', '""') + '"'
+
+
+async def consultar(sql: str, *args) -> list[dict]:
+    pool = await get_pool()
+    return filas(await pool.fetch(sql, *args))
+
+
+async def consultar_uno(sql: str, *args) -> Optional[dict]:
+    pool = await get_pool()
+    return fila(await pool.fetchrow(sql, *args))
+
+
+def _columnas(data: list[dict]) -> list[str]:
+    columnas = {}
+    for d in data:
+        columnas.update(dict.fromkeys(d))
+    return list(columnas)
+
+
+def _sql_insertar(tabla: str, columnas: list[str]) -> str:
+    # json_populate_recordset convierte cada valor al tipo de su columna (texto ISO a
+    # date/timestamptz, listas a arrays, etc.), como hace PostgREST con el JSON recibido
+    cols = ", ".join(identificador(c) for c in columnas)
+    return (
+        f"INSERT INTO {identificador(tabla)} ({cols}) "
+        f"SELECT {cols} FROM json_populate_recordset(NULL::{identificador(tabla)}, $1::json) "
+        f"RETURNING *"
+    )
+
+
+async def insertar(tabla: str, data: list[dict], conexion=None) -> list[dict]:
+    if not data:
+        return []
+    sql = _sql_insertar(tabla, _columnas(data))
+    if conexion is not None:
+        return filas(await conexion.fetch(sql, data))
+    return await consultar(sql, data)
+
+
+async def upsert(tabla: str, data: list[dict], conflicto: str = "id") -> list[dict]:
+    """INSERT ... ON CONFLICT (conflicto) DO UPDATE, equivalente a .upsert() de PostgREST."""
+    if not data:
+        return []
+    columnas = _columnas(data)
+    actualizar = ", ".join(
+        f"{identificador(c)} = EXCLUDED.{identificador(c)}" for c in columnas if c != conflicto
+    )
+    sql = _sql_insertar(tabla, columnas).replace(
+        " RETURNING *",
+        f" ON CONFLICT ({identificador(conflicto)}) DO "
+        + (f"UPDATE SET {actualizar}" if actualizar else "NOTHING")
+        + " RETURNING *",
+    )
+    return await consultar(sql, data)
+
+
+async def actualizar(tabla: str, data: dict[str, Any], columna: str, valor, conexion=None) -> list[dict]:
+    """UPDATE ... WHERE columna = valor RETURNING *, con la misma conversión de tipos que insertar."""
+    t, c = identificador(tabla), identificador(columna)
+    if data:
+        asignaciones = ", ".join(f"{identificador(k)} = r.{identificador(k)}" for k in data)
+        sql = (
+            f"UPDATE {t} SET {asignaciones} "
+            f"FROM json_populate_record(NULL::{t}, $1::json) r "
+            f"WHERE {t}.{c} = $2 RETURNING {t}.*"
+        )
+        args = (data, str(valor))
+    else:
+        sql = f"SELECT * FROM {t} WHERE {c} = $1"
+        args = (str(valor),)
+    if conexion is not None:
+        return filas(await conexion.fetch(sql, *args))
+    return await consultar(sql, *args)
+
+
+async def eliminar(tabla: str, columna: str, valor) -> list[dict]:
+    return await consultar(
+        f"DELETE FROM {identificador(tabla)} WHERE {identificador(columna)} = $1 RETURNING *",
+        str(valor),
+    )
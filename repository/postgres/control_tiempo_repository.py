@@ -0,0 +1,29 @@
+from datetime import date
+
+from repository.postgres.consultas import consultar, consultar_uno
+
+_COLUMNAS = "id, personal_id, tipo_registro, fecha, hora"
+
+
+class ControlTiempoRepository:
+    table = "control_tiempo"
+
+    @staticmethod
+    async def registrar(data: dict):
+        """Inserta el registro o retorna el existente del mismo tipo y día (con `ya_registrado`)."""
+        return await consultar_uno("SELECT * FROM registrar_control_tiempo($1::json)", data)
+
+    @staticmethod
+    async def obtener_del_dia(personal_id: str, fecha: str):
+        return await consultar(
+            f"SELECT {_COLUMNAS} FROM control_tiempo WHERE personal_id = $1 AND fecha = $2 ORDER BY hora",
+            str(personal_id), date.fromisoformat(fecha),
+        )
+
+    @staticmethod
+    async def obtener_por_rango(personal_id: str, fecha_inicio: str, fecha_fin: str):
+        return await consultar(
+            f"SELECT {_COLUMNAS} FROM control_tiempo "
+            "WHERE personal_id = $1 AND fecha BETWEEN $2 AND $3 ORDER BY fecha, hora",
+            str(personal_id), date.fromisoformat(fecha_inicio), date.fromisoformat(fecha_fin),
+        )
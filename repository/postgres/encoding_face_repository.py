@@ -0,0 +1,59 @@
+from uuid import UUID
+from typing import Any
+
+from repository.postgres.consultas import consultar, consultar_uno, insertar, upsert, eliminar
+
+class EncodingFaceRepository:
+    table = "codificacion_facial"
+
+    @staticmethod
+    async def create(data: dict[str, Any]):
+        result = await insertar(EncodingFaceRepository.table, [data])
+        return result[0] if result else None
+
+    @staticmethod
+    async def find_by_id(id: UUID):
+        return await consultar_uno("SELECT * FROM codificacion_facial WHERE id = $1", str(id))
+
+    @staticmethod
+    async def find_by_personal_id(personal_id: UUID):
+        return await consultar("SELECT * FROM codificacion_facial WHERE personal_id = $1", str(personal_id))
+
+    @staticmethod
+    async def find_all():
+        return await consultar("SELECT * FROM codificacion_facial")
+
+    @staticmethod
+    async def find_ids(page_size: int = 1000):
+        """Solo los ids (sin embeddings), para reconciliar la galería en memoria."""
+        # Sin el límite de filas de PostgREST no hace falta paginar; page_size se
+        # conserva por compatibilidad con el backend de Supabase
+        result = await consultar("SELECT id FROM codificacion_facial ORDER BY id")
+        return [r["id"] for r in result]
+
+    @staticmethod
+    async def find_by_ids(ids: list[str], chunk_size: int = 200):
+        if not ids:
+            return []
+        return await consultar(
+            "SELECT * FROM codificacion_facial WHERE id = ANY($1::uuid[])", [str(i) for i in ids]
+        )
+
+    @staticmethod
+    async def update_embeddings(rows: list[dict], chunk_size: int = 500):
+        """
+        Actualiza embeddings en bloque con upsert por id. Cada fila debe traer
+        id, personal_id y embedding.
+        """
+        data = []
+        for i in range(0, len(rows), chunk_size):
+            data.extend(await upsert(EncodingFaceRepository.table, rows[i:i + chunk_size]))
+        return data
+
+    @staticmethod
+    async def delete(id: UUID):
+        return await eliminar(EncodingFaceRepository.table, "id", id)
+
+    @staticmethod
+    async def delete_by_personal_id(personal_id: UUID):
+        return await eliminar(EncodingFaceRepository.table, "personal_id", personal_id)
@@ -0,0 +1,39 @@
+from uuid import UUID
+
+from config.postgresClient import get_pool
+from repository.postgres.consultas import consultar_uno, insertar, actualizar, eliminar
+from utils.fotos import hash_foto
+
+class FotoPerfilRepository:
+    table = "fotos_perfil"
+
+    @staticmethod
+    async def create_or_update(personal_id: UUID, foto_base64: str):
+        data = {
+            "personal_id": str(personal_id),
+            "foto_base64": foto_base64,
+            # Parte de la URL de la foto: cambia con el contenido
+            "foto_hash": hash_foto(foto_base64),
+        }
+
+        pool = await get_pool()
+        async with pool.acquire() as conexion:
+            async with conexion.transaction():
+                # Verificar si ya existe
+                existing = await conexion.fetchval(
+                    "SELECT id FROM fotos_perfil WHERE personal_id = $1", str(personal_id)
+                )
+                if existing:
+                    result = await actualizar(FotoPerfilRepository.table, data, "personal_id", personal_id, conexion)
+                else:
+                    result = await insertar(FotoPerfilRepository.table, [data], conexion)
+
+        return result[0] if result else None
+
+    @staticmethod
+    async def find_by_personal_id(personal_id: UUID):
+        return await consultar_uno("SELECT * FROM fotos_perfil WHERE personal_id = $1", str(personal_id))
+
+    @staticmethod
+    async def delete_by_personal_id(personal_id: UUID):
+        return await eliminar(FotoPerfilRepository.table, "personal_id", personal_id)
@@ -0,0 +1,80 @@
+from uuid import UUID
+from typing import Union, Any
+
+from dto.personal_dto.personal_request_dto import PersonalCreateDTO
+from dto.personal_dto.personal_update_dto import PersonalUpdateDTO
+from config.postgresClient import get_pool
+from repository.postgres.consultas import consultar, consultar_uno, insertar, actualizar, eliminar
+
+# Mismas proyecciones que el backend de Supabase
+_COLUMNAS = "p.id, p.dni, p.nombre, p.apellido_paterno, p.apellido_materno, p.email, p.es_administrador"
+_FOTOS = """
+    COALESCE(
+        (SELECT json_agg(json_build_object('foto_hash', f.foto_hash))
+         FROM fotos_perfil f WHERE f.personal_id = p.id),
+        '[]'::json
+    ) AS fotos_perfil
+"""
+_SELECT = f"SELECT {_COLUMNAS} FROM personal p"
+_CON_FOTO = f"SELECT {_COLUMNAS}, {_FOTOS} FROM personal p"
+_CON_CREDENCIALES = f"SELECT {_COLUMNAS}, {_FOTOS}, p.password_hash FROM personal p"
+
+class PersonalRepository:
+
+    table = "personal"
+
+    @staticmethod
+    async def create(data: Union[PersonalCreateDTO, dict[str, Any]]):
+        payload = data if isinstance(data, dict) else data.model_dump()
+        result = await insertar(PersonalRepository.table, [payload])
+        return result[0] if result else None
+
+    @staticmethod
+    async def find_all(con_foto: bool = False):
+        return await consultar(_CON_FOTO if con_foto else _SELECT)
+
+    @staticmethod
+    async def contar() -> int:
+        pool = await get_pool()
+        return await pool.fetchval("SELECT count(*) FROM personal")
+
+    @staticmethod
+    async def find_by_id(personal_id: UUID, con_foto: bool = False):
+        return await consultar_uno(f"{_CON_FOTO if con_foto else _SELECT} WHERE p.id = $1", str(personal_id))
+
+    @staticmethod
+    async def find_by_ids(personal_ids: list[UUID]):
+        if not personal_ids:
+            return []
+        return await consultar(f"{_SELECT} WHERE p.id = ANY($1::uuid[])", [str(i) for i in personal_ids])
+
+    @staticmethod
+    async def delete(personal_id: UUID):
+        return await eliminar(PersonalRepository.table, "id", personal_id)
+
+    @staticmethod
+    async def update(personal_id: UUID, data: Union[PersonalUpdateDTO, dict[str, Any]]):
+        """
+        Actualiza un registro de personal por id.
+        """
+        payload = data if isinstance(data, dict) else data.model_dump(exclude_none=True)
+        result = await actualizar(PersonalRepository.table, payload, "id", personal_id)
+        return result[0] if result else None
+
+    @staticmethod
+    async def find_by_email(email: str):
+        return await consultar_uno(f"{_CON_CREDENCIALES} WHERE p.email = $1", email)
+
+    @staticmethod
+    async def update_password(personal_id: UUID, password_hash: str):
+        result = await actualizar(PersonalRepository.table, {"password_hash": password_hash, "password_reset_token": None, "password_reset_expires_at": None}, "id", personal_id)
+        return result[0] if result else None
+
+    @staticmethod
+    async def set_password_reset_token(personal_id: UUID, token: str, expires_at):
+        result = await actualizar(PersonalRepository.table, {"password_reset_token": token, "password_reset_expires_at": expires_at.isoformat()}, "id", personal_id)
+        return result[0] if result else None
+
+    @staticmethod
+    async def find_by_reset_token(token: str):
+        return await consultar_uno("SELECT id, password_reset_expires_at FROM personal WHERE password_reset_token = $1", token)
@@ -0,0 +1,13 @@
+from repository.postgres.consultas import consultar
+
+
+class ReporteVersionRepository:
+    table = "reporte_version"
+
+    @staticmethod
+    async def obtener(claves: list[str]) -> dict[str, int]:
+        versiones = {
+            r["clave"]: r["version"]
+            for r in await consultar("SELECT clave, version FROM reporte_version WHERE clave = ANY($1::text[])", claves)
+        }
+        return {clave: versiones.get(clave, 0) for clave in claves}
@@ -0,0 +1,44 @@
+from datetime import date
+from uuid import UUID
+
+from repository.postgres.consultas import consultar, insertar, actualizar, eliminar
+
+_COLUMNAS_RANGO = "id, personal_id, tipo_ausencia, fecha_inicio, fecha_fin, hora_inicio, hora_fin"
+
+
+class SolicitudesAusenciasRepository:
+
+    table = "solicitudes_ausencias"
+
+    @staticmethod
+    async def create(data: dict):
+        result = await insertar(SolicitudesAusenciasRepository.table, [data])
+        return result[0] if result else None
+
+    @staticmethod
+    async def find_by_personal(personal_id: UUID):
+        return await consultar("SELECT * FROM solicitudes_ausencias WHERE personal_id = $1", str(personal_id))
+
+    @staticmethod
+    async def find_aprobadas_por_rango(fecha_inicio: date, fecha_fin: date, personal_id: UUID = None):
+        """Ausencias aprobadas que se superponen con el rango, de todo el personal o de una persona."""
+        sql = (
+            f"SELECT {_COLUMNAS_RANGO} FROM solicitudes_ausencias "
+            "WHERE estado_solicitud = 'APROBADA' AND fecha_inicio <= $2 AND fecha_fin >= $1"
+        )
+        if personal_id:
+            return await consultar(sql + " AND personal_id = $3", fecha_inicio, fecha_fin, str(personal_id))
+        return await consultar(sql, fecha_inicio, fecha_fin)
+
+    @staticmethod
+    async def find_all():
+        return await consultar("SELECT * FROM solicitudes_ausencias")
+
+    @staticmethod
+    async def update_estado(id: UUID, estado: str):
+        result = await actualizar(SolicitudesAusenciasRepository.table, {"estado_solicitud": estado}, "id", id)
+        return result[0] if result else None
+
+    @staticmethod
+    async def delete_by_personal(personal_id: UUID):
+        return await eliminar(SolicitudesAusenciasRepository.table, "personal_id", personal_id)
@@ -0,0 +1,39 @@
+from datetime import date
+from uuid import UUID
+
+from repository.postgres.consultas import consultar, insertar, eliminar
+
+_COLUMNAS_RANGO = "id, personal_id, fecha_trabajo, horas_solicitadas"
+
+
+class SolicitudesSobretiempoRepository:
+
+    table = "solicitudes_sobretiempo"
+
+    @staticmethod
+    async def create(data: dict):
+        result = await insertar(SolicitudesSobretiempoRepository.table, [data])
+        return result[0] if result else None
+
+    @staticmethod
+    async def find_by_personal(personal_id: UUID):
+        return await consultar("SELECT * FROM solicitudes_sobretiempo WHERE personal_id = $1", str(personal_id))
+
+    @staticmethod
+    async def find_aprobadas_por_rango(fecha_inicio: date, fecha_fin: date, personal_id: UUID = None):
+        """Sobretiempo aprobado con fecha de trabajo en el rango, de todo el personal o de una persona."""
+        sql = (
+            f"SELECT {_COLUMNAS_RANGO} FROM solicitudes_sobretiempo "
+            "WHERE estado_solicitud = 'APROBADA' AND fecha_trabajo BETWEEN $1 AND $2"
+        )
+        if personal_id:
+            return await consultar(sql + " AND personal_id = $3", fecha_inicio, fecha_fin, str(personal_id))
+        return await consultar(sql, fecha_inicio, fecha_fin)
+
+    @staticmethod
+    async def find_all():
+        return await consultar("SELECT * FROM solicitudes_sobretiempo")
+
+    @staticmethod
+    async def delete_by_personal(personal_id: UUID):
+        return await eliminar(SolicitudesSobretiempoRepository.table, "personal_id", personal_id)
@@ -0,0 +1,26 @@
+from config.supabaseClient import get_supabase_async
+from config.postgresClient import DB_BACKEND
+
+
+class ReporteVersionRepository:
+    """
+    Versiones de los datos de cada mes ('YYYY-MM') y del personal ('personal'),
+    incrementadas por los triggers de migrations/007. Una clave sin fila no ha
+    cambiado desde la migración (versión 0).
+    """
+    table = "reporte_version"
+
+    @staticmethod
+    async def obtener(claves: list[str]) -> dict[str, int]:
+        supabase = await get_supabase_async()
+        result = await supabase.table(ReporteVersionRepository.table) \
+            .select("clave, version") \
+            .in_("clave", claves) \
+            .execute()
+        versiones = {r["clave"]: int(r["version"]) for r in (result.data or [])}
+        return {clave: versiones.get(clave, 0) for clave in claves}
+
+
+# Con DB_BACKEND=postgres se usa la implementación con conexión directa (misma interfaz)
+if DB_BACKEND == "postgres":
+    from repository.postgres.reporte_version_repository import ReporteVersionRepository  # noqa: F811
@@ -1,34 +1,57 @@
-from config.supabaseClient import get_supabase
+from config.supabaseClient import get_supabase_async
+from config.postgresClient import DB_BACKEND
+from datetime import date
 from uuid import UUID
 
 class SolicitudesAusenciasRepository:
 
     table = "solicitudes_ausencias"
+    # Lo que usa el reporte mensual
+    COLUMNAS_RANGO = "id, personal_id, tipo_ausencia, fecha_inicio, fecha_fin, hora_inicio, hora_fin"
 
     @staticmethod
     async def create(data: dict):
-        supabase = get_supabase()
-        result = supabase.table(SolicitudesAusenciasRepository.table).insert(data).execute()
+        supabase = await get_supabase_async()
+        result = await supabase.table(SolicitudesAusenciasRepository.table).insert(data).execute()
         return result.data[0] if result.data else None
 
     @staticmethod
     async def find_by_personal(personal_id: UUID):
-        supabase = get_supabase()
-        result = supabase.table(SolicitudesAusenciasRepository.table).select("*").eq("personal_id", str(personal_id)).execute()
+        supabase = await get_supabase_async()
+        result = await supabase.table(SolicitudesAusenciasRepository.table).select("*").eq("personal_id", str(personal_id)).execute()
+        return result.data if result.data else []
+
+    @staticmethod
+    async def find_aprobadas_por_rango(fecha_inicio: date, fecha_fin: date, personal_id: UUID = None):
+        """Ausencias aprobadas que se superponen con el rango, de todo el personal o de una persona."""
+        supabase = await get_supabase_async()
+        query = supabase.table(SolicitudesAusenciasRepository.table) \
+            .select(SolicitudesAusenciasRepository.COLUMNAS_RANGO) \
+            .eq("estado_solicitud", "APROBADA") \
+            .lte("fecha_inicio", fecha_fin.isoformat()) \
+            .gte("fecha_fin", fecha_inicio.isoformat())
+        if personal_id:
+            query = query.eq("personal_id", str(personal_id))
+        result = await query.execute()
         return result.data if result.data else []
 
     @staticmethod
     async def find_all():
-        supabase = get_supabase()
-        result = supabase.table(SolicitudesAusenciasRepository.table).select("*").execute()
+        supabase = await get_supabase_async()
+        result = await supabase.table(SolicitudesAusenciasRepository.table).select("*").execute()
         return result.data
     @staticmethod
     async def update_estado(id: UUID, estado: str):
-        supabase = get_supabase()
-        result = supabase.table(SolicitudesAusenciasRepository.table).update({"estado_solicitud": estado}).eq("id", str(id)).execute()
+        supabase = await get_supabase_async()
+        result = await supabase.table(SolicitudesAusenciasRepository.table).update({"estado_solicitud": estado}).eq("id", str(id)).execute()
         return result.data[0] if result.data else None
     @staticmethod
     async def delete_by_personal(personal_id: UUID):
-        supabase = get_supabase()
-        result = supabase.table(SolicitudesAusenciasRepository.table).delete().eq("personal_id", str(personal_id)).execute()
+        supabase = await get_supabase_async()
+        result = await supabase.table(SolicitudesAusenciasRepository.table).delete().eq("personal_id", str(personal_id)).execute()
         return result.data
+
+
+# Con DB_BACKEND=postgres se usa la implementación con conexión directa (misma interfaz)
+if DB_BACKEND == "postgres":
+    from repository.postgres.solicitudes_ausencias_repository import SolicitudesAusenciasRepository  # noqa: F811
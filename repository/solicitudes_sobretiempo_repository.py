@@ -1,30 +1,53 @@
-from config.supabaseClient import get_supabase
+from config.supabaseClient import get_supabase_async
+from config.postgresClient import DB_BACKEND
+from datetime import date
 from uuid import UUID
 
 class SolicitudesSobretiempoRepository:
 
     table = "solicitudes_sobretiempo"
+    # Lo que usa el reporte mensual
+    COLUMNAS_RANGO = "id, personal_id, fecha_trabajo, horas_solicitadas"
 
     @staticmethod
     async def create(data: dict):
-        supabase = get_supabase()
-        result = supabase.table(SolicitudesSobretiempoRepository.table).insert(data).execute()
+        supabase = await get_supabase_async()
+        result = await supabase.table(SolicitudesSobretiempoRepository.table).insert(data).execute()
         return result.data[0] if result.data else None
 
     @staticmethod
     async def find_by_personal(personal_id: UUID):
-        supabase = get_supabase()
-        result = supabase.table(SolicitudesSobretiempoRepository.table).select("*").eq("personal_id", str(personal_id)).execute()
+        supabase = await get_supabase_async()
+        result = await supabase.table(SolicitudesSobretiempoRepository.table).select("*").eq("personal_id", str(personal_id)).execute()
+        return result.data if result.data else []
+
+    @staticmethod
+    async def find_aprobadas_por_rango(fecha_inicio: date, fecha_fin: date, personal_id: UUID = None):
+        """Sobretiempo aprobado con fecha de trabajo en el rango, de todo el personal o de una persona."""
+        supabase = await get_supabase_async()
+        query = supabase.table(SolicitudesSobretiempoRepository.table) \
+            .select(SolicitudesSobretiempoRepository.COLUMNAS_RANGO) \
+            .eq("estado_solicitud", "APROBADA") \
+            .gte("fecha_trabajo", fecha_inicio.isoformat()) \
+            .lte("fecha_trabajo", fecha_fin.isoformat())
+        if personal_id:
+            query = query.eq("personal_id", str(personal_id))
+        result = await query.execute()
         return result.data if result.data else []
 
     @staticmethod
     async def find_all():
-        supabase = get_supabase()
-        result = supabase.table(SolicitudesSobretiempoRepository.table).select("*").execute()
+        supabase = await get_supabase_async()
+        result = await supabase.table(SolicitudesSobretiempoRepository.table).select("*").execute()
         return result.data
 
     @staticmethod
     async def delete_by_personal(personal_id: UUID):
-        supabase = get_supabase()
-        result = supabase.table(SolicitudesSobretiempoRepository.table).delete().eq("personal_id", str(personal_id)).execute()
+        supabase = await get_supabase_async()
+        result = await supabase.table(SolicitudesSobretiempoRepository.table).delete().eq("personal_id", str(personal_id)).execute()
         return result.data
+
+
+# Con DB_BACKEND=postgres se usa la implementación con conexión directa (misma interfaz)
+if DB_BACKEND == "postgres":
+    from repository.postgres.solicitudes_sobretiempo_repository import SolicitudesSobretiempoRepository  # noqa: F811
@@ -0,0 +1,159 @@
+"""
+Estado del día por persona: los registros de asistencia que ya marcó hoy.
+
+Decidir ENTRADA/SALIDA y detectar un registro duplicado solo necesita saber qué
+tipos de registro tiene la persona en el día. La primera consulta del día carga
+sus registros desde la BD; después cada inserción exitosa de este proceso los
+agrega aquí, así que las siguientes marcaciones y previews no consultan la BD.
+
+Solo se guarda el día actual (LOCAL_TIMEZONE): al cambiar de día se vacía entera.
+Las entradas vencen a los ASISTENCIA_DIA_CACHE_SEGUNDOS (marcaciones hechas por
+otros workers) y se desalojan por LRU al superar ASISTENCIA_DIA_CACHE_MAX.
+"""
+import time
+from collections import OrderedDict
+from datetime import date, datetime
+
+from config.cache_config import ASISTENCIA_DIA_CACHE_SEGUNDOS, ASISTENCIA_DIA_CACHE_MAX
+from config.timezone_config import LOCAL_TIMEZONE
+from repository.asistencia_repository import AsistenciaRepository
+
+
+class CacheAsistenciaDia:
+
+    def __init__(self, ttl: float = ASISTENCIA_DIA_CACHE_SEGUNDOS, max_entradas: int = ASISTENCIA_DIA_CACHE_MAX):
+        self.ttl = ttl
+        self.max_entradas = max_entradas
+        self._dia: date | None = None
+        # personal_id -> (expira, registros del día), de la menos a la más reciente
+        self._entradas: OrderedDict[str, tuple] = OrderedDict()
+        # Aumenta con cada escritura: una carga que se cruzó con una inserción no se guarda
+        self._version = 0
+        self.aciertos = 0
+        self.fallos = 0
+        self.desalojos = 0
+        self.cambios_de_dia = 0
+
+    @property
+    def habilitada(self) -> bool:
+        return self.ttl > 0 and self.max_entradas > 0
+
+    def _vigente(self, fecha: date) -> bool:
+        """True si `fecha` es hoy; al cambiar de día descarta todo lo anterior."""
+        hoy = datetime.now(LOCAL_TIMEZONE).date()
+        if self._dia != hoy:
+            if self._dia is not None:
+                self.cambios_de_dia += 1
+            self._entradas.clear()
+            self._dia = hoy
+        return self.habilitada and fecha == hoy
+
+    def _buscar(self, personal_id: str):
+        entrada = self._entradas.get(personal_id)
+        if entrada is None:
+            return None
+        expira, registros = entrada
+        if expira <= time.monotonic():
+            del self._entradas[personal_id]
+            return None
+        self._entradas.move_to_end(personal_id)
+        return registros
+
+    def _guardar(self, personal_id: str, registros: list):
+        self._entradas[personal_id] = (time.monotonic() + self.ttl, registros)
+        self._entradas.move_to_end(personal_id)
+        while len(self._entradas) > self.max_entradas:
+            self._entradas.popitem(last=False)
+            self.desalojos += 1
+
+    async def obtener(self, personal_id, fecha: date) -> list:
+        """Igual que AsistenciaRepository.obtener_registros_del_dia, desde la caché si `fecha` es hoy."""
+        if not self._vigente(fecha):
+            return await AsistenciaRepository.obtener_registros_del_dia(str(personal_id), fecha)
+
+        personal_id = str(personal_id)
+        registros = self._buscar(personal_id)
+        if registros is not None:
+            self.aciertos += 1
+            return list(registros)
+
+        self.fallos += 1
+        version = self._version
+        registros = await AsistenciaRepository.obtener_registros_del_dia(personal_id, fecha)
+        if version == self._version and self._dia == fecha:
+            self._guardar(personal_id, list(registros))
+        return registros
+
+    async def obtener_lote(self, personal_ids: list, fecha: date) -> dict[str, list]:
+        """Registros del día por persona; las que no están en caché se cargan en una sola consulta."""
+        resultado: dict[str, list] = {str(pid): [] for pid in personal_ids}
+        if not self._vigente(fecha):
+            for r in await AsistenciaRepository.obtener_registros_del_dia_lote(list(resultado), fecha):
+                resultado.setdefault(str(r["personal_id"]), []).append(r)
+            return resultado
+
+        faltantes = []
+        for pid in resultado:
+            registros = self._buscar(pid)
+            if registros is None:
+                faltantes.append(pid)
+            else:
+                resultado[pid] = list(registros)
+        self.aciertos += len(resultado) - len(faltantes)
+        self.fallos += len(faltantes)
+        if not faltantes:
+            return resultado
+
+        version = self._version
+        for r in await AsistenciaRepository.obtener_registros_del_dia_lote(faltantes, fecha):
+            resultado[str(r["personal_id"])].append(r)
+        if version == self._version and self._dia == fecha:
+            for pid in faltantes:
+                self._guardar(pid, list(resultado[pid]))
+        return resultado
+
+    def agregar(self, registro: dict):
+        """Suma un registro recién insertado al estado del día de su persona."""
+        self._version += 1
+        if not self.habilitada or str(registro.get("fecha")) != str(self._dia):
+            return
+        personal_id = str(registro["personal_id"])
+        registros = self._buscar(personal_id)
+        # Sin entrada cargada no se crea una: la próxima lectura trae el día completo de la BD
+        if registros is not None:
+            registros.append(registro)
+
+    def invalidar(self, personal_id):
+        self._version += 1
+        self._entradas.pop(str(personal_id), None)
+
+    def limpiar(self):
+        self._version += 1
+        self._entradas.clear()
+
+    def estadisticas(self) -> dict:
+        consultas = self.aciertos + self.fallos
+        return {
+            "habilitada": self.habilitada,
+            "dia": self._dia.isoformat() if self._dia else None,
+            "ttl_segundos": self.ttl,
+            "max_entradas": self.max_entradas,
+            "entradas": len(self._entradas),
+            "aciertos": self.aciertos,
+            "fallos": self.fallos,
+            "desalojos": self.desalojos,
+            "cambios_de_dia": self.cambios_de_dia,
+            "tasa_aciertos": self.aciertos / consultas if consultas else 0.0,
+        }
+
+
+# Instancia única por proceso
+_cache_asistencia_dia = None
+
+def get_cache_asistencia_dia() -> CacheAsistenciaDia:
+    global _cache_asistencia_dia
+
+    if _cache_asistencia_dia is None:
+        _cache_asistencia_dia = CacheAsistenciaDia()
+
+    return _cache_asistencia_dia
@@ -1,11 +1,16 @@
+import asyncio
 from datetime import datetime, date, time
 from config.config_horarios import HORARIOS
 from config.timezone_config import LOCAL_TIMEZONE
 from repository.asistencia_repository import AsistenciaRepository
+from repository.asistencia_resumen_repository import AsistenciaResumenRepository
 from repository.personal_repository import PersonalRepository
-from repository.encoding_face_repository import EncodingFaceRepository
-import math
+from services.face_gallery import get_face_gallery
+from services.reconocimiento_cache import get_cache_reconocimiento
+from services.personal_cache import get_cache_personal
+from services.asistencia_dia_cache import get_cache_asistencia_dia
 from dto.asistencia_dto.realtime_asistencia_dto import RealtimeAsistenciaDTO
+from dto.asistencia_dto.realtime_lote_asistencia_dto import RealtimeLoteAsistenciaDTO
 from uuid import UUID
 
 
@@ -44,8 +49,10 @@ class AsistenciaService:
         Determina si el registro es Entrada o Salida, Mañana o Tarde,
         basándose en los registros existentes del día.
         """
-        registros = await AsistenciaRepository.obtener_registros_del_dia(personal_id, fecha)
-        
+        registros = await get_cache_asistencia_dia().obtener(personal_id, fecha)
+        return self._tipo_segun_registros(registros, hora_actual)
+
+    def _tipo_segun_registros(self, registros: list, hora_actual: time):
         # Limite entre turno mañana y tarde
         inicio_turno_tarde = HORARIOS["ENTRADA_T"].get("inicio_marcacion", time(14, 0))
         
@@ -67,7 +74,7 @@ class AsistenciaService:
         # Si NO viene validado (manual), asumimos que lo valida el frontend o middleware de auth
         # (Idealmente, validar permisos de admin aquí si es manual)
 
-        personal = await PersonalRepository.find_by_id(dto.personal_id)
+        personal = await get_cache_personal().obtener(dto.personal_id)
 
         if not personal:
             return {"error": "Usuario no encontrado"}
@@ -86,35 +93,24 @@ class AsistenciaService:
         hoy = ahora.date()
         hora_actual = ahora.time()
 
+        # Registros de hoy: deciden el tipo automático y detectan duplicados
+        registros = await get_cache_asistencia_dia().obtener(dto.personal_id, hoy)
+
         # Si el DTO trae tipo_registro forzado (manual), usarlo. Si no, automatico.
         if hasattr(dto, 'tipo_registro') and dto.tipo_registro:
              tipo_registro = dto.tipo_registro
         else:
-             tipo_registro = await self.determinar_tipo_registro(str(dto.personal_id), hoy, hora_actual)
+             tipo_registro = self._tipo_segun_registros(registros, hora_actual)
 
         # Si viene estado manual, usarlo? No, calcularlo siempre es mejor para consistencia, 
         # salvo que sea una corrección administrativa.
         # Por ahora calculamos estado basado en hora.
         estado = self.evaluar_estado(tipo_registro, hora_actual)
 
-        # Revisar si ya existe registro del mismo tipo hoy
-        registros = await AsistenciaRepository.obtener_registros_del_dia(
-            dto.personal_id, hoy
-        )
-
+        # Revisar si ya existe registro del mismo tipo hoy (según los registros en memoria)
         for r in registros:
             if r["tipo_registro"] == tipo_registro:
-                usuario_nombre = personal.get("nombre_completo") or " ".join(filter(None, [personal.get("nombre"), personal.get("apellido_paterno"), personal.get("apellido_materno")]))
-                hora_registro = r["marca_tiempo"].split("T")[1].split(".")[0][:5] if "T" in str(r["marca_tiempo"]) else "N/A"
-                
-                return {
-                    "ya_registrado": True,
-                    "mensaje": f"✓ Ya registrado ({tipo_registro})",
-                    "detalle": f"Marcado a las {hora_registro}",
-                    "usuario": usuario_nombre,
-                    "tipo": tipo_registro,
-                    "turno": "Turno Mañana" if "_M" in tipo_registro else "Turno Tarde"
-                }
+                return self._respuesta_ya_registrado(personal, tipo_registro, r)
 
         # Registrar en la tabla con timestamp explícito en zona horaria local
         data = {
@@ -126,8 +122,51 @@ class AsistenciaService:
             "motivo": dto.motivo if hasattr(dto, "motivo") else None
         }
 
-        await AsistenciaRepository.registrar_asistencia(data)
+        # Inserta o retorna el existente en una sola sentencia (unique por persona, día y tipo):
+        # cubre a otro kiosco o worker que registró a la misma persona entretanto
+        registro = await AsistenciaRepository.registrar_asistencia(data)
+        if registro is None:
+            registro = (await self._registros_existentes([data], hoy)).get(data["personal_id"])
+        if registro is None or registro.get("ya_registrado"):
+            get_cache_asistencia_dia().invalidar(dto.personal_id)
+            return self._respuesta_ya_registrado(personal, tipo_registro, registro or data)
+
+        get_cache_asistencia_dia().agregar(registro)
+        # Las respuestas en caché de esta persona (preview, ya registrado) quedan obsoletas
+        get_cache_reconocimiento().invalidar_personal(dto.personal_id)
+
+        return self._respuesta_registro(personal, tipo_registro, estado, hora_actual)
+
+    async def _registros_existentes(self, pedidos: list[dict], fecha: date) -> dict:
+        """
+        Registros que ya existían para `pedidos` cuya fila no volvió del insert: los
+        insertó otra transacción en el mismo instante y la sentencia no alcanzó a verlos.
+        """
+        dia = get_cache_asistencia_dia()
+        for data in pedidos:
+            dia.invalidar(data["personal_id"])
+        registros = await dia.obtener_lote([data["personal_id"] for data in pedidos], fecha)
+        existentes = {}
+        for data in pedidos:
+            existente = next((r for r in registros.get(data["personal_id"], []) if r["tipo_registro"] == data["tipo_registro"]), None)
+            if existente:
+                existentes[data["personal_id"]] = {**existente, "ya_registrado": True}
+        return existentes
+
+    def _respuesta_ya_registrado(self, personal: dict, tipo_registro: str, registro: dict):
+        usuario_nombre = personal.get("nombre_completo") or " ".join(filter(None, [personal.get("nombre"), personal.get("apellido_paterno"), personal.get("apellido_materno")]))
+        hora_registro = registro["marca_tiempo"].split("T")[1].split(".")[0][:5] if "T" in str(registro["marca_tiempo"]) else "N/A"
 
+        return {
+            "ya_registrado": True,
+            "mensaje": f"✓ Ya registrado ({tipo_registro})",
+            "detalle": f"Marcado a las {hora_registro}",
+            "usuario": usuario_nombre,
+            "tipo": tipo_registro,
+            "turno": "Turno Mañana" if "_M" in tipo_registro else "Turno Tarde"
+        }
+
+    def _respuesta_registro(self, personal: dict, tipo_registro: str, estado: str, hora_actual: time):
         usuario_nombre = personal.get("nombre_completo") or " ".join(filter(None, [personal.get("nombre"), personal.get("apellido_paterno"), personal.get("apellido_materno")]))
         hora_registro = hora_actual.strftime("%H:%M")
         
@@ -146,81 +185,58 @@ class AsistenciaService:
             "hora": hora_registro,
         }
 
-    async def listar_personal_status(self, fecha: date = None):
+    async def listar_personal_status(self, fecha: date = None, con_registros: bool = True):
         if not fecha:
             fecha = datetime.now(LOCAL_TIMEZONE).date()
 
-        # 1. Obtener todo el personal
-        all_personal = await PersonalRepository.find_all()
+        # 1. Personal y resumen del día (asistencia_resumen_diario, una fila por persona
+        # que marcó); las marcaciones solo si se pide el detalle
+        consultas = [PersonalRepository.find_all(), AsistenciaResumenRepository.obtener_del_dia(fecha)]
+        if con_registros:
+            consultas.append(AsistenciaRepository.obtener_historial(fecha=fecha))
+        all_personal, resumenes, *historial = await asyncio.gather(*consultas)
 
-        # 2. Obtener asistencias del día
-        asistencias = await AsistenciaRepository.obtener_historial(fecha=fecha)
+        resumen_map = {r["personal_id"]: r for r in resumenes}
 
-        # 3. Mapear asistencias por personal_id
+        # 2. Mapear asistencias por personal_id (ya vienen ordenadas desc por query)
         asistencias_map = {}
-        for a in asistencias:
-            pid = a["personal_id"]
-            if pid not in asistencias_map:
-                asistencias_map[pid] = []
-            asistencias_map[pid].append(a)
+        for a in (historial[0] if historial else []):
+            asistencias_map.setdefault(a["personal_id"], []).append(a)
 
-        # 4. Construir resultado
+        # 3. Construir resultado
         resultado = []
         for p in all_personal:
             pid = p["id"]
-            regs = asistencias_map.get(pid, [])
-            
-            # Calcular estado del día (Presente si tiene al menos un registro)
-            estado_dia = "PRESENTE" if regs else "AUSENTE"
-            
-            # Ultima marcación
-            ultima_marca = None
-            if regs:
-                # Ya vienen ordenados desc por query
-                ultima_marca = regs[0]["marca_tiempo"]
-                
-            # Calcular horas trabajadas (Aprox)
-            # Logica simple: Pares de Entrada/Salida
+            resumen = resumen_map.get(pid)
+
+            # Presente si tiene al menos un registro
+            estado_dia = "PRESENTE" if resumen else "AUSENTE"
+            ultima_marca = resumen["ultima_marca"] if resumen else None
+
+            # Horas trabajadas: pares Entrada/Salida de cada turno (sin negativos)
             horas_trabajadas = 0.0
-            # Ordenar ascendente para calculo
-            regs_sorted = sorted(regs, key=lambda x: x["marca_tiempo"])
-            
-            entrada_m = next((r for r in regs_sorted if r["tipo_registro"] == "ENTRADA_M"), None)
-            salida_m = next((r for r in regs_sorted if r["tipo_registro"] == "SALIDA_M"), None)
-            entrada_t = next((r for r in regs_sorted if r["tipo_registro"] == "ENTRADA_T"), None)
-            salida_t = next((r for r in regs_sorted if r["tipo_registro"] == "SALIDA_T"), None)
-
-            def diff_hours(start_str, end_str):
-                # Supabase timestamp layout: 2023-10-10T08:00:00+00:00
-                if not start_str or not end_str: return 0.0
-                try:
-                    fmt = "%Y-%m-%dT%H:%M:%S"
-                    # A veces trae timezone, a veces no, simplificar
-                    t1 = datetime.fromisoformat(start_str.replace('Z', '+00:00'))
-                    t2 = datetime.fromisoformat(end_str.replace('Z', '+00:00'))
-                    diff = (t2 - t1).total_seconds() / 3600.0
-                    return diff if diff > 0 else 0.0
-                except:
-                    return 0.0
-
-            if entrada_m and salida_m:
-                horas_trabajadas += diff_hours(entrada_m["marca_tiempo"], salida_m["marca_tiempo"])
-            if entrada_t and salida_t:
-                horas_trabajadas += diff_hours(entrada_t["marca_tiempo"], salida_t["marca_tiempo"])
+            tardanza = False
+            if resumen:
+                minutos = max(float(resumen["minutos_manana"]), 0.0) + max(float(resumen["minutos_tarde"]), 0.0)
+                horas_trabajadas = minutos / 60.0
+                tardanza = bool(resumen["tardanza_m"] or resumen["tardanza_t"])
 
             # Formatear nombre
             nombre_completo = f"{p['nombre']} {p['apellido_paterno']}"
-            
-            resultado.append({
+
+            item = {
                 "id": pid,
                 "dni": p["dni"],
                 "nombre_completo": nombre_completo,
                 "estado_dia": estado_dia,
                 "ultima_marcacion": ultima_marca,
                 "horas_trabajadas": round(horas_trabajadas, 2),
-                "registros": regs # Detalle si se quiere
-            })
-            
+                "tardanza": tardanza,
+            }
+            if con_registros:
+                item["registros"] = asistencias_map.get(pid, [])  # Detalle si se quiere
+            resultado.append(item)
+
         return resultado
 
     async def obtener_historial_completo(self, fecha_inicio: date, fecha_fin: date, personal_id: str = None):
@@ -248,20 +264,15 @@ class AsistenciaService:
         return datos
 
     async def obtener_estadisticas_dia(self, fecha: date):
-        # Reutilizamos logica de status
-        status_list = await self.listar_personal_status(fecha)
+        # Reutilizamos logica de status (solo el resumen del día, sin las marcaciones)
+        status_list = await self.listar_personal_status(fecha, con_registros=False)
         
         total = len(status_list)
         presentes = sum(1 for s in status_list if s["estado_dia"] == "PRESENTE")
         ausentes = total - presentes
         
-        # Tardanzas: contar cuantos registros tienen estado "TARDE" hoy
-        # Podriamos iterar los registros dentro de status_list
-        tardanzas = 0
-        for s in status_list:
-            regs = s["registros"]
-            if any(r["estado"] == "TARDE" for r in regs):
-                tardanzas += 1
+        # Tardanzas: personas con alguna marcación "TARDE" en el día
+        tardanzas = sum(1 for s in status_list if s["tardanza"])
 
         return {
             "total_personal": total,
@@ -340,7 +351,7 @@ class AsistenciaService:
 
 
     # ----------------- Nuevo: procesar embeddings en tiempo real ------------------
-    async def procesar_realtime(self, dto: RealtimeAsistenciaDTO):
+    async def procesar_realtime(self, dto: RealtimeAsistenciaDTO, kiosco: str = None):
         # Configuración de validación de identidad
         # Usar valores del frontend si vienen, sino usar valores por defecto
         THRESHOLD = getattr(dto, 'threshold', None) or 0.75
@@ -350,65 +361,28 @@ class AsistenciaService:
         if not dto.embedding or len(dto.embedding) < 64:
             return {"error": "❌ Error al procesar tu rostro. Por favor, intenta de nuevo."}
 
-        # Traer todas las codificaciones faciales con manejo de errores de conexión
-        try:
-            records = await EncodingFaceRepository.find_all()
-        except Exception as e:
-            # Manejar errores de conexión a la base de datos
-            error_msg = str(e).lower()
-            if "timeout" in error_msg or "connect" in error_msg:
-                return {"error": "⚠ No se puede conectar al sistema. Por favor, intenta de nuevo."}
-            return {"error": "⚠ Error del sistema. Contacta al administrador."}
-        
-        if not records:
-            return {"error": "❌ No hay usuarios registrados en el sistema."}
+        gallery = get_face_gallery()
+        error = await self._cargar_galeria(gallery)
+        if error:
+            return error
 
-        # Encontrar los 2 mejores matches para validar unicidad
-        best = None
-        best_score = -1.0
-        second_best_score = -1.0
-        
-        for r in records:
-            # r se espera que tenga 'embedding' como lista
-            emb = r.get("embedding")
-            if not emb:
-                continue
-            score = self._cosine_similarity(dto.embedding, emb)
-            if score > best_score:
-                # El mejor actual pasa a ser el segundo mejor
-                second_best_score = best_score
-                best_score = score
-                best = r
-            elif score > second_best_score:
-                # Actualizar segundo mejor si es mayor
-                second_best_score = score
+        # Frames consecutivos del mismo rostro en el mismo kiosco reutilizan la respuesta anterior
+        cache = get_cache_reconocimiento()
+        clave_cache = (kiosco, bool(getattr(dto, "solo_validar", False)), THRESHOLD, MIN_MARGIN)
+        previo = cache.buscar(clave_cache, dto.embedding, gallery.version)
+        if previo is not None:
+            return previo
 
-        # Log para auditoría (solo para consola del servidor)
-        print(f"[ASISTENCIA] Score: {best_score:.4f}, Segundo: {second_best_score:.4f}, Threshold: {THRESHOLD}")
+        # Encontrar los 2 mejores matches para validar unicidad (un solo producto matriz-vector)
+        match = gallery.buscar(dto.embedding)
+        error = self._validar_match(match, THRESHOLD, MIN_MARGIN)
+        if error:
+            return error
 
-        # Validar threshold mínimo de similitud
-        if best_score < THRESHOLD:
-            print(f"[ASISTENCIA] RECHAZADO - Score {best_score:.4f} < Threshold {THRESHOLD}")
-            return {"error": "❌ No se pudo identificar tu rostro. Asegúrate de estar bien iluminado e intenta de nuevo."}
-
-        # Validar margen de confianza (evitar matches ambiguos)
-        margin = best_score - second_best_score
-        
-        # Ajustar margen dinámicamente: Si el score es muy alto, el margen puede ser menor
-        ajuste_margen = MIN_MARGIN
-        if best_score > 0.92:
-            ajuste_margen = MIN_MARGIN * 0.5  # Si es > 92%, reducir exigencia de margen a la mitad
-        
-        if second_best_score > 0 and margin < ajuste_margen:
-            print(f"[ASISTENCIA] RECHAZADO - Margen {margin:.4f} < Ajustado {ajuste_margen:.4f} (Mínimo original {MIN_MARGIN})")
-            return {"error": "⚠ No se pudo verificar tu identidad con certeza (Match ambiguo). Por favor, intenta de nuevo."}
-        
-        print(f"[ASISTENCIA] APROBADO - Score {best_score:.4f}, Margen {margin:.4f}")
-
-        personal_id = best.get("personal_id")
+        personal_id = match.personal_id
 
         # verificar que el personal exista en la tabla personal
-        personal = await PersonalRepository.find_by_id(personal_id)
+        personal = await get_cache_personal().obtener(personal_id)
         if not personal:
             return {"error": "❌ Usuario no encontrado en el sistema."}
 
@@ -425,46 +399,14 @@ class AsistenciaService:
         # Si solo se requiere validar identidad (para mostrar modal de confirmación)
         if getattr(dto, "solo_validar", False):
             # Determinar qué turno y estado le correspondería
-            ahora = datetime.now(LOCAL_TIMEZONE)
-            if dto.marca_tiempo:
-                if dto.marca_tiempo.tzinfo:
-                    ahora = dto.marca_tiempo.astimezone(LOCAL_TIMEZONE)
-                else:
-                    ahora = dto.marca_tiempo.replace(tzinfo=LOCAL_TIMEZONE)
-            
-            tipo_registro = await self.determinar_tipo_registro(str(personal_id), ahora.date(), ahora.time())
-            estado = self.evaluar_estado(tipo_registro, ahora.time())
-            turno_texto = "Turno Mañana" if "_M" in tipo_registro else "Turno Tarde"
+            ahora = self._ahora_local(dto.marca_tiempo)
             
             # Verificar si ya existe registro hoy
-            hoy = ahora.date()
-            registros = await AsistenciaRepository.obtener_registros_del_dia(
-                str(personal_id), hoy
-            )
-            
-            ya_registrado = False
-            mensaje_ya_registrado = None
-            hora_ya_registrada = None
-            
-            for r in registros:
-                if r["tipo_registro"] == tipo_registro:
-                    ya_registrado = True
-                    hora_ya_registrada = r["marca_tiempo"].split("T")[1].split(".")[0][:5] if "T" in str(r["marca_tiempo"]) else "N/A"
-                    mensaje_ya_registrado = f"✓ Ya registrado ({tipo_registro}) a las {hora_ya_registrada}"
-                    break
-            
-            return {
-                "reconocido": True,
-                "personal_id": personal_id,
-                "usuario": personal.get("nombre_completo") or f"{personal.get('nombre')} {personal.get('apellido_paterno')}",
-                "turno": turno_texto,
-                "tipo_registro": tipo_registro,
-                "estado": estado,
-                "hora": ahora.strftime("%H:%M:%S"),
-                "preview": True,
-                "ya_registrado": ya_registrado,
-                "mensaje": mensaje_ya_registrado if ya_registrado else None
-            }
+            registros = await get_cache_asistencia_dia().obtener(personal_id, ahora.date())
+            tipo_registro = self._tipo_segun_registros(registros, ahora.time())
+            resultado = self._respuesta_preview(personal_id, personal, tipo_registro, ahora, registros)
+            cache.guardar(clave_cache, dto.embedding, gallery.version, personal_id, resultado)
+            return resultado
 
         # Reutilizar el método registrar_asistencia que ya incluye:
         # - Validación de reconocimiento
@@ -480,23 +422,193 @@ class AsistenciaService:
         usuario_nombre = personal.get("nombre_completo") or " ".join(filter(None, [personal.get("nombre"), personal.get("apellido_paterno")]))
 
         # Devolver la información completa sin exponer datos técnicos
-        return {
+        resultado = {
             **asistencia_result,  # Incluye mensaje, detalle, usuario, turno, estado, hora
             "reconocido": True,
         }
+        cache.guardar(clave_cache, dto.embedding, gallery.version, personal_id, resultado)
+        return resultado
+
+    async def procesar_realtime_lote(self, dto: RealtimeLoteAsistenciaDTO):
+        """
+        Igual que procesar_realtime pero para todos los rostros de un frame: un solo
+        producto matriz-matriz contra la galería, una consulta para los `personal`
+        reconocidos, una para sus registros del día y un único insert.
+        """
+        THRESHOLD = dto.threshold or 0.75
+        MIN_MARGIN = dto.min_margin or 0.06
+
+        gallery = get_face_gallery()
+        error = await self._cargar_galeria(gallery)
+        if error:
+            return error
+
+        matches = gallery.buscar_lote(dto.embeddings)
+
+        resultados: list = [None] * len(matches)
+        aprobados: dict[int, str] = {}
+        for i, match in enumerate(matches):
+            error = self._validar_match(match, THRESHOLD, MIN_MARGIN)
+            if error:
+                resultados[i] = error
+                continue
+            # Una persona no puede aparecer dos veces en el mismo frame: se queda el mejor score
+            previo = next((j for j, pid in aprobados.items() if pid == match.personal_id), None)
+            if previo is not None:
+                ambiguo = {"error": "⚠ No se pudo verificar tu identidad con certeza (Match ambiguo). Por favor, intenta de nuevo."}
+                if matches[previo].score >= match.score:
+                    resultados[i] = ambiguo
+                    continue
+                resultados[previo] = ambiguo
+                del aprobados[previo]
+            aprobados[i] = match.personal_id
+
+        if not aprobados:
+            return resultados
+
+        ahora = self._ahora_local(dto.marca_tiempo)
+        hoy = ahora.date()
+        hora_actual = ahora.time()
+
+        personal_ids = list(aprobados.values())
+        personales = {str(p["id"]): p for p in await PersonalRepository.find_by_ids(personal_ids)}
+        dia = get_cache_asistencia_dia()
+        registros_dia = await dia.obtener_lote(personal_ids, hoy)
+
+        nuevos = []
+        posiciones: dict[str, int] = {}
+        for i, personal_id in aprobados.items():
+            personal = personales.get(str(personal_id))
+            if not personal:
+                resultados[i] = {"error": "❌ Usuario no encontrado en el sistema."}
+                continue
+
+            registros = registros_dia[str(personal_id)]
+            tipo_registro = self._tipo_segun_registros(registros, hora_actual)
+
+            if dto.solo_validar:
+                resultados[i] = self._respuesta_preview(personal_id, personal, tipo_registro, ahora, registros)
+                continue
+
+            existente = next((r for r in registros if r["tipo_registro"] == tipo_registro), None)
+            if existente:
+                resultados[i] = {**self._respuesta_ya_registrado(personal, tipo_registro, existente), "reconocido": True}
+                continue
+
+            estado = self.evaluar_estado(tipo_registro, hora_actual)
+            nuevos.append({
+                "personal_id": str(personal_id),
+                "fecha": hoy.isoformat(),
+                "marca_tiempo": ahora.isoformat(),  # Timestamp con zona horaria local
+                "tipo_registro": tipo_registro,
+                "estado": estado,
+                "motivo": None
+            })
+            posiciones[str(personal_id)] = i
+
+        # Un solo insert-o-existente para todo el frame
+        guardados = {r["personal_id"]: r for r in await AsistenciaRepository.registrar_asistencias(nuevos)}
+        faltantes = [data for data in nuevos if data["personal_id"] not in guardados]
+        if faltantes:
+            guardados.update(await self._registros_existentes(faltantes, hoy))
+
+        cache = get_cache_reconocimiento()
+        for data in nuevos:
+            i = posiciones[data["personal_id"]]
+            personal = personales[data["personal_id"]]
+            registro = guardados.get(data["personal_id"])
+            if registro is None or registro.get("ya_registrado"):
+                dia.invalidar(data["personal_id"])
+                resultados[i] = {**self._respuesta_ya_registrado(personal, data["tipo_registro"], registro or data), "reconocido": True}
+                continue
+            dia.agregar(registro)
+            cache.invalidar_personal(data["personal_id"])
+            resultados[i] = {
+                **self._respuesta_registro(personal, data["tipo_registro"], data["estado"], hora_actual),
+                "reconocido": True,
+            }
+
+        return resultados
+
+    def estado_cache_realtime(self):
+        return get_cache_reconocimiento().estadisticas()
+
+    def estado_cache_dia(self):
+        return get_cache_asistencia_dia().estadisticas()
 
-    def _cosine_similarity(self, a, b):
-        # proteger longitudes diferentes
-        n = min(len(a), len(b))
-        dot = 0.0
-        na = 0.0
-        nb = 0.0
-        for i in range(n):
-            x = float(a[i])
-            y = float(b[i])
-            dot += x * y
-            na += x * x
-            nb += y * y
-        if na == 0 or nb == 0:
-            return 0.0
-        return dot / (math.sqrt(na) * math.sqrt(nb))
+    async def _cargar_galeria(self, gallery):
+        """Asegura la galería en memoria; retorna un dict de error si no se puede usar."""
+        try:
+            await gallery.asegurar_cargada()
+        except Exception as e:
+            # Manejar errores de conexión a la base de datos
+            error_msg = str(e).lower()
+            if "timeout" in error_msg or "connect" in error_msg:
+                return {"error": "⚠ No se puede conectar al sistema. Por favor, intenta de nuevo."}
+            return {"error": "⚠ Error del sistema. Contacta al administrador."}
+
+        if not gallery.total:
+            return {"error": "❌ No hay usuarios registrados en el sistema."}
+        return None
+
+    def _validar_match(self, match, THRESHOLD: float, MIN_MARGIN: float):
+        """Aplica threshold y margen al match; retorna un dict de error si se rechaza."""
+        best_score = match.score
+        second_best_score = match.segundo_score
+
+        # Log para auditoría (solo para consola del servidor)
+        print(f"[ASISTENCIA] Score: {best_score:.4f}, Segundo: {second_best_score:.4f}, Threshold: {THRESHOLD}")
+
+        # Validar threshold mínimo de similitud
+        if best_score < THRESHOLD:
+            print(f"[ASISTENCIA] RECHAZADO - Score {best_score:.4f} < Threshold {THRESHOLD}")
+            return {"error": "❌ No se pudo identificar tu rostro. Asegúrate de estar bien iluminado e intenta de nuevo."}
+
+        # Validar margen de confianza (evitar matches ambiguos)
+        margin = best_score - second_best_score
+        
+        # Ajustar margen dinámicamente: Si el score es muy alto, el margen puede ser menor
+        ajuste_margen = MIN_MARGIN
+        if best_score > 0.92:
+            ajuste_margen = MIN_MARGIN * 0.5  # Si es > 92%, reducir exigencia de margen a la mitad
+        
+        if second_best_score > 0 and margin < ajuste_margen:
+            print(f"[ASISTENCIA] RECHAZADO - Margen {margin:.4f} < Ajustado {ajuste_margen:.4f} (Mínimo original {MIN_MARGIN})")
+            return {"error": "⚠ No se pudo verificar tu identidad con certeza (Match ambiguo). Por favor, intenta de nuevo."}
+        
+        print(f"[ASISTENCIA] APROBADO - Score {best_score:.4f}, Margen {margin:.4f}")
+        return None
+
+    def _ahora_local(self, marca_tiempo: datetime = None) -> datetime:
+        if not marca_tiempo:
+            return datetime.now(LOCAL_TIMEZONE)
+        if marca_tiempo.tzinfo:
+            return marca_tiempo.astimezone(LOCAL_TIMEZONE)
+        return marca_tiempo.replace(tzinfo=LOCAL_TIMEZONE)
+
+    def _respuesta_preview(self, personal_id, personal: dict, tipo_registro: str, ahora: datetime, registros: list):
+        estado = self.evaluar_estado(tipo_registro, ahora.time())
+        turno_texto = "Turno Mañana" if "_M" in tipo_registro else "Turno Tarde"
+
+        ya_registrado = False
+        mensaje_ya_registrado = None
+        
+        for r in registros:
+            if r["tipo_registro"] == tipo_registro:
+                ya_registrado = True
+                hora_ya_registrada = r["marca_tiempo"].split("T")[1].split(".")[0][:5] if "T" in str(r["marca_tiempo"]) else "N/A"
+                mensaje_ya_registrado = f"✓ Ya registrado ({tipo_registro}) a las {hora_ya_registrada}"
+                break
+        
+        return {
+            "reconocido": True,
+            "personal_id": personal_id,
+            "usuario": personal.get("nombre_completo") or f"{personal.get('nombre')} {personal.get('apellido_paterno')}",
+            "turno": turno_texto,
+            "tipo_registro": tipo_registro,
+            "estado": estado,
+            "hora": ahora.strftime("%H:%M:%S"),
+            "preview": True,
+            "ya_registrado": ya_registrado,
+            "mensaje": mensaje_ya_registrado if ya_registrado else None
+        }
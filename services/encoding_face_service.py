@@ -1,14 +1,38 @@
+import asyncio
+import math
 from uuid import UUID
+from config.reconocimiento_config import EMBEDDING_DIMENSION
 from repository.encoding_face_repository import EncodingFaceRepository
 from dto.codificacion_facial_dto.endodig_face_request_dto import EncodingFaceCreateDTO
+from services.face_gallery import get_face_gallery
 
 class EncodingFaceService:
 
+    @staticmethod
+    def normalizar_embedding(embedding: list[float]) -> list[float]:
+        """
+        Valida la dimensión contra EMBEDDING_DIMENSION y retorna el vector L2-normalizado,
+        para que el reconocimiento sea un producto punto sin recalcular normas.
+        Lanza ValueError si la dimensión no coincide o el vector es nulo.
+        """
+        if len(embedding) != EMBEDDING_DIMENSION:
+            raise ValueError(
+                f"El embedding debe tener {EMBEDDING_DIMENSION} valores (recibidos: {len(embedding)})"
+            )
+        norma = math.sqrt(sum(float(x) * float(x) for x in embedding))
+        if norma == 0 or not math.isfinite(norma):
+            raise ValueError("El embedding no es válido (norma nula o no finita)")
+        return [float(x) / norma for x in embedding]
+
     @staticmethod
     async def create(data: EncodingFaceCreateDTO):
         # mode='json' convierte UUID a string automáticamente
         payload = data.model_dump(mode='json')
-        return await EncodingFaceRepository.create(payload)
+        payload["embedding"] = EncodingFaceService.normalizar_embedding(data.embedding)
+        result = await EncodingFaceRepository.create(payload)
+        if result:
+            get_face_gallery().agregar([result])
+        return result
 
     @staticmethod
     async def list_all():
@@ -27,4 +51,62 @@ class EncodingFaceService:
 
     @staticmethod
     async def delete(id: UUID):
-        return await EncodingFaceRepository.delete(id)
+        result = await EncodingFaceRepository.delete(id)
+        get_face_gallery().eliminar(id)
+        return result
+
+    @staticmethod
+    async def estado_galeria():
+        gallery = get_face_gallery()
+        await gallery.asegurar_cargada()
+        return gallery.estadisticas()
+
+    @staticmethod
+    async def diagnostico_galeria(embedding: list[float], k: int = 10):
+        """
+        Top-k de la galería para un embedding, con los mismos scores que usa
+        /asistencia/realtime: el segundo score (la métrica del margen) y el mejor
+        score de una persona distinta a la del primer candidato.
+        """
+        gallery = get_face_gallery()
+        await gallery.asegurar_cargada()
+        # Una sola pasada: los dos primeros candidatos dan el score y el segundo score
+        # de buscar() (-1.0 si no existen)
+        candidatos = gallery.top_k(embedding, max(k, 2))
+        score = candidatos[0]["score"] if candidatos else -1.0
+        segundo_score = candidatos[1]["score"] if len(candidatos) > 1 else -1.0
+        personal_id = candidatos[0]["personal_id"] if candidatos else None
+
+        otra_persona = next((c["score"] for c in candidatos if c["personal_id"] != personal_id), None)
+        return {
+            "candidatos": candidatos[:k],
+            "score": score,
+            "segundo_score": segundo_score,
+            "margen": score - segundo_score,
+            "mejor_otra_persona": otra_persona,
+        }
+
+    @staticmethod
+    async def vecindario_galeria(limite: int = 50):
+        gallery = get_face_gallery()
+        await gallery.asegurar_cargada()
+        return await asyncio.to_thread(gallery.vecindario, limite)
+
+    @staticmethod
+    async def evaluar_precision_galeria(precision: str):
+        return await get_face_gallery().evaluar_precision(precision)
+
+    @staticmethod
+    async def cambiar_precision_galeria(precision: str, forzar: bool = False):
+        """
+        Evalúa el formato contra float32 y solo lo habilita si el error de score
+        está dentro de la tolerancia (o si se fuerza). Retorna el reporte.
+        """
+        gallery = get_face_gallery()
+        reporte = await gallery.evaluar_precision(precision)
+        if reporte["apto"] or forzar:
+            gallery.cambiar_precision(precision)
+            reporte["habilitado"] = True
+        else:
+            reporte["habilitado"] = False
+        return reporte
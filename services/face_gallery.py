@@ -0,0 +1,863 @@
+"""
+Galería de embeddings faciales residente en memoria.
+
+Todas las filas de `codificacion_facial` se cargan una sola vez en matrices float32
+contiguas con filas L2-normalizadas (desde el alta ya se guardan normalizadas; la
+normalización al cargar cubre filas anteriores a la migración). Así, la similitud coseno contra toda la galería
+es un único producto matriz-vector en lugar de un bucle Python por registro.
+
+La galería es versionada: las altas y bajas hechas en este proceso se aplican como
+deltas por fila (append y tombstone + compactación) sin recargar la tabla completa,
+y periódicamente se reconcilia con la BD comparando solo los ids.
+
+En galerías grandes cada bloque puede usar un índice IVF (ver face_index_ivf) que
+limita qué filas se puntúan; los candidatos se re-rankean con el score exacto, por
+lo que THRESHOLD/MIN_MARGIN se aplican sobre los mismos valores que en fuerza bruta.
+
+Si GALERIA_SNAPSHOT_PATH está configurado, la galería se persiste en disco y al
+arrancar se mapea con mmap (ver face_gallery_snapshot); desde la BD solo se trae
+la diferencia respecto del snapshot.
+
+Con GALERIA_COMPARTIDA la galería vive en memoria compartida (ver face_gallery_shared):
+cada cambio se aplica de inmediato en el worker que lo hizo y una tarea en segundo
+plano lo publica, con el bloqueo exclusivo y sobre la última imagen publicada, como
+una generación nueva que el resto de los workers adopta en su próxima búsqueda. Los
+índices IVF son locales a cada worker y se re-entrenan al cambiar de generación.
+"""
+import asyncio
+import logging
+import time
+from typing import NamedTuple, Optional
+
+import numpy as np
+
+from config.reconocimiento_config import (
+    GALERIA_RECONCILIAR_SEGUNDOS, GALERIA_COMPACTAR_FRACCION,
+    GALERIA_ANN_MODO, GALERIA_ANN_MIN_FILAS, GALERIA_ANN_NPROBE,
+    GALERIA_PRECISION, GALERIA_PRECISION_TOLERANCIA,
+    GALERIA_SNAPSHOT_PATH, GALERIA_SNAPSHOT_SEGUNDOS,
+    GALERIA_COMPARTIDA, GALERIA_COMPARTIDA_NOMBRE, GALERIA_COMPARTIDA_LOCK,
+)
+from repository.encoding_face_repository import EncodingFaceRepository
+from services import face_gallery_snapshot
+from services.face_gallery_shared import GaleriaCompartida
+from services.face_index_ivf import IndiceIVF
+
+logger = logging.getLogger(__name__)
+
+_CAPACIDAD_INICIAL = 64
+_FILAS_POR_LOTE = 8192
+_DTYPES = {"float32": np.float32, "float16": np.float16, "int8": np.int8}
+
+
+class Coincidencia(NamedTuple):
+    encoding_id: Optional[str]
+    personal_id: Optional[str]
+    score: float
+    segundo_score: float
+
+
+def _normalizar_filas(matriz: np.ndarray) -> np.ndarray:
+    normas = np.linalg.norm(matriz, axis=1, keepdims=True)
+    # Filas con norma 0 quedan en cero => similitud 0.0 (igual que el cálculo coseno anterior)
+    np.divide(matriz, normas, out=matriz, where=normas > 0)
+    return matriz
+
+
+def _codificar(vectores: np.ndarray, precision: str):
+    """
+    Convierte filas normalizadas al formato de almacenamiento.
+    int8 usa una escala por fila (max |v| / 127) para aprovechar todo el rango.
+    """
+    if precision == "float16":
+        return vectores.astype(np.float16), None
+    if precision == "int8":
+        maximos = np.abs(vectores).max(axis=1) if vectores.shape[0] else np.zeros(0, dtype=np.float32)
+        escalas = (maximos / 127.0).astype(np.float32)
+        datos = np.round(np.divide(vectores, escalas[:, None], out=np.zeros_like(vectores), where=escalas[:, None] > 0))
+        return datos.astype(np.int8), escalas
+    return vectores.astype(np.float32, copy=False), None
+
+
+class _Bloque:
+    """
+    Embeddings de una misma dimensión. La matriz tiene capacidad extra para que
+    agregar filas sea O(1) amortizado; las filas eliminadas se marcan en `vivos`
+    y se descartan al compactar.
+
+    Con precision float16/int8 las filas se guardan cuantizadas y se convierten a
+    float32 por lotes solo al puntuar.
+    """
+
+    def __init__(self, dim: int, capacidad: int = _CAPACIDAD_INICIAL, precision: str = "float32"):
+        self.precision = precision
+        capacidad = max(capacidad, 1)
+        self.matriz = np.zeros((capacidad, dim), dtype=_DTYPES[precision])
+        self.escalas = np.zeros(capacidad, dtype=np.float32) if precision == "int8" else None
+        self.vivos = np.zeros(capacidad, dtype=bool)
+        self.ids: list = []
+        self.personal_ids: list = []
+        self.n = 0
+        self.muertos = 0
+        self.ivf: Optional[IndiceIVF] = None
+        # Cambia en cada compactación (las posiciones de las filas dejan de ser válidas)
+        self.generacion = 0
+
+    @classmethod
+    def desde_snapshot(cls, snapshot: "face_gallery_snapshot.BloqueSnapshot", precision: str) -> "_Bloque":
+        """Bloque cuyos vectores son una vista mmap del snapshot (sin copiarlos)."""
+        bloque = cls(snapshot.dim, 1, precision)
+        n = len(snapshot.ids)
+        if n:
+            bloque.matriz = snapshot.matriz
+            bloque.escalas = snapshot.escalas
+            bloque.vivos = np.ones(n, dtype=bool)
+        bloque.ids = list(snapshot.ids)
+        bloque.personal_ids = list(snapshot.personal_ids)
+        bloque.n = n
+        return bloque
+
+    def a_snapshot(self) -> "face_gallery_snapshot.BloqueSnapshot":
+        """Solo filas vivas. Se toma en el event loop; la escritura puede ir en otro hilo."""
+        vivos = np.flatnonzero(self.vivos[:self.n])
+        return face_gallery_snapshot.BloqueSnapshot(
+            dim=self.dim,
+            matriz=self.matriz[vivos],
+            escalas=self.escalas[vivos] if self.escalas is not None else None,
+            ids=[self.ids[i] for i in vivos],
+            personal_ids=[self.personal_ids[i] for i in vivos],
+        )
+
+    @property
+    def dim(self) -> int:
+        return self.matriz.shape[1]
+
+    @property
+    def activos(self) -> int:
+        return self.n - self.muertos
+
+    @property
+    def bytes(self) -> int:
+        """Memoria residente de los vectores (sin contar ids ni el índice ANN)."""
+        return self.matriz.nbytes + (self.escalas.nbytes if self.escalas is not None else 0)
+
+    def leer(self, filas=None) -> np.ndarray:
+        """Filas en float32 (todas las usadas si `filas` es None)."""
+        datos = self.matriz[:self.n] if filas is None else self.matriz[filas]
+        if self.precision == "float32":
+            return datos
+        datos = datos.astype(np.float32)
+        if self.escalas is not None:
+            datos *= (self.escalas[:self.n] if filas is None else self.escalas[filas])[:, None]
+        return datos
+
+    def _producto(self, consultas: np.ndarray) -> np.ndarray:
+        """consultas (k x dim) @ filas.T; en formatos cuantizados se convierte por lotes."""
+        if self.precision == "float32":
+            return consultas @ self.matriz[:self.n].T
+        s = np.empty((consultas.shape[0], self.n), dtype=np.float32)
+        for i in range(0, self.n, _FILAS_POR_LOTE):
+            j = min(i + _FILAS_POR_LOTE, self.n)
+            s[:, i:j] = consultas @ self.matriz[i:j].astype(np.float32).T
+            if self.escalas is not None:
+                s[:, i:j] *= self.escalas[i:j]
+        return s
+
+    def _crecer(self, minimo: int):
+        capacidad = max(minimo, self.matriz.shape[0] * 2)
+        matriz = np.zeros((capacidad, self.dim), dtype=self.matriz.dtype)
+        matriz[:self.n] = self.matriz[:self.n]
+        vivos = np.zeros(capacidad, dtype=bool)
+        vivos[:self.n] = self.vivos[:self.n]
+        if self.escalas is not None:
+            escalas = np.zeros(capacidad, dtype=np.float32)
+            escalas[:self.n] = self.escalas[:self.n]
+            self.escalas = escalas
+        self.matriz, self.vivos = matriz, vivos
+
+    def agregar(self, vectores: np.ndarray, ids: list, personal_ids: list) -> int:
+        """Agrega filas ya normalizadas; retorna la posición de la primera."""
+        k = vectores.shape[0]
+        if self.n + k > self.matriz.shape[0]:
+            self._crecer(self.n + k)
+        inicio = self.n
+        datos, escalas = _codificar(vectores, self.precision)
+        self.matriz[inicio:inicio + k] = datos
+        if self.escalas is not None:
+            self.escalas[inicio:inicio + k] = escalas
+        self.vivos[inicio:inicio + k] = True
+        self.ids.extend(ids)
+        self.personal_ids.extend(personal_ids)
+        self.n += k
+        if self.ivf is not None:
+            self.ivf.extender(vectores)
+        return inicio
+
+    def eliminar(self, fila: int):
+        if self.vivos[fila]:
+            self.vivos[fila] = False
+            if self.matriz.flags.writeable:
+                self.matriz[fila] = 0
+            self.muertos += 1
+
+    def requiere_compactar(self) -> bool:
+        return self.muertos > 0 and self.muertos >= self.n * GALERIA_COMPACTAR_FRACCION
+
+    def compactar(self) -> list:
+        """Elimina físicamente los tombstones; retorna los ids en su nueva posición."""
+        mascara = self.vivos[:self.n]
+        matriz = np.ascontiguousarray(self.matriz[:self.n][mascara])
+        escalas = self.escalas[:self.n][mascara] if self.escalas is not None else None
+        self.ids = [i for i, v in zip(self.ids, mascara) if v]
+        self.personal_ids = [p for p, v in zip(self.personal_ids, mascara) if v]
+        self.n = len(self.ids)
+        self.muertos = 0
+        capacidad = max(self.n, _CAPACIDAD_INICIAL)
+        self.matriz = np.zeros((capacidad, self.dim), dtype=matriz.dtype)
+        self.matriz[:self.n] = matriz
+        if escalas is not None:
+            self.escalas = np.zeros(capacidad, dtype=np.float32)
+            self.escalas[:self.n] = escalas
+        self.vivos = np.zeros(capacidad, dtype=bool)
+        self.vivos[:self.n] = True
+        if self.ivf is not None:
+            self.ivf.compactar(mascara)
+        self.generacion += 1
+        return self.ids
+
+    def requiere_indice(self) -> bool:
+        if GALERIA_ANN_MODO == "exacto" or self.activos < GALERIA_ANN_MIN_FILAS:
+            return False
+        # (Re)entrenar si no hay índice o la galería duplicó su tamaño desde el entrenamiento
+        return self.ivf is None or self.n > 2 * self.ivf.entrenado_con
+
+    def scores(self, consulta: np.ndarray) -> np.ndarray:
+        if self.dim == consulta.shape[0]:
+            s = self._producto((consulta / (np.linalg.norm(consulta) or 1.0))[None, :])[0]
+        else:
+            # Dimensiones distintas: se conserva el comportamiento histórico de comparar
+            # solo los primeros min(len(a), len(b)) valores. Las normas originales de la
+            # fila se cancelan, así que basta renormalizar la parte truncada.
+            n = min(self.dim, consulta.shape[0])
+            sub = self.leer()[:, :n]
+            q = consulta[:n]
+            denom = np.linalg.norm(sub, axis=1) * np.linalg.norm(q)
+            dots = sub @ q
+            s = np.divide(dots, denom, out=np.zeros_like(dots), where=denom > 0)
+        if self.muertos:
+            s[~self.vivos[:self.n]] = -np.inf
+        return s
+
+    def _candidatos(self, consulta: np.ndarray, nprobe: int):
+        """Filas a puntuar y sus scores exactos; None si corresponde fuerza bruta."""
+        if self.ivf is None or GALERIA_ANN_MODO == "exacto" or self.dim != consulta.shape[0]:
+            return None
+        q = consulta / (np.linalg.norm(consulta) or 1.0)
+        filas = self.ivf.candidatos(q, nprobe)
+        if self.muertos:
+            filas = filas[self.vivos[filas]]
+        if filas.shape[0] < 2:
+            return None
+        return filas, self.leer(filas) @ q
+
+    def top2(self, consulta: np.ndarray, nprobe: int = GALERIA_ANN_NPROBE):
+        """(fila, mejor score, segundo score) dentro del bloque."""
+        candidatos = self._candidatos(consulta, nprobe)
+        if candidatos is None:
+            filas, s = None, self.scores(consulta)
+        else:
+            filas, s = candidatos
+
+        i = int(np.argmax(s))
+        top = float(s[i])
+        s[i] = -np.inf
+        segundo = float(s.max()) if s.shape[0] > 1 else -np.inf
+        return (int(filas[i]) if filas is not None else i), top, segundo
+
+    def top_k(self, consulta: np.ndarray, k: int, nprobe: int = GALERIA_ANN_NPROBE):
+        """(filas, scores) de los k mejores del bloque, de mayor a menor."""
+        candidatos = self._candidatos(consulta, nprobe)
+        if candidatos is None:
+            filas, s = None, self.scores(consulta)
+        else:
+            filas, s = candidatos
+
+        k = min(k, s.shape[0])
+        mejores = np.argpartition(-s, k - 1)[:k]
+        mejores = mejores[np.argsort(-s[mejores], kind="stable")]
+        mejores = mejores[np.isfinite(s[mejores])]
+        return (filas[mejores] if filas is not None else mejores), s[mejores]
+
+    def top2_lote(self, consultas: np.ndarray, nprobe: int = GALERIA_ANN_NPROBE):
+        """
+        top2 para varias consultas de la misma dimensión. Sin índice ANN se resuelve
+        con un único producto matriz-matriz (k x n).
+        """
+        if self.dim != consultas.shape[1] or (self.ivf is not None and GALERIA_ANN_MODO != "exacto"):
+            resultados = [self.top2(q, nprobe) for q in consultas]
+            return (
+                np.array([r[0] for r in resultados]),
+                np.array([r[1] for r in resultados]),
+                np.array([r[2] for r in resultados]),
+            )
+
+        normas = np.linalg.norm(consultas, axis=1, keepdims=True)
+        s = self._producto(consultas / np.where(normas > 0, normas, 1.0))
+        if self.muertos:
+            s[:, ~self.vivos[:self.n]] = -np.inf
+
+        filas = np.argmax(s, axis=1)
+        k = np.arange(s.shape[0])
+        tops = s[k, filas].copy()
+        s[k, filas] = -np.inf
+        segundos = s.max(axis=1) if s.shape[1] > 1 else np.full(s.shape[0], -np.inf)
+        return filas, tops, segundos
+
+
+class FaceGallery:
+
+    def __init__(self, precision: str = GALERIA_PRECISION, compartida: bool = False):
+        if precision not in _DTYPES:
+            raise ValueError(f"Precisión no soportada: {precision}")
+        self.precision = precision
+        self._bloques: dict[int, _Bloque] = {}
+        # encoding_id -> (dim, fila) y personal_id -> {encoding_id}
+        self._ubicacion: dict[str, tuple[int, int]] = {}
+        self._por_personal: dict[str, set] = {}
+        self.version = 0
+        self._cargada = False
+        self._reconciliada_en: Optional[float] = None
+        self._lock = asyncio.Lock()
+        self.nprobe = GALERIA_ANN_NPROBE
+        self._entrenamiento: Optional[asyncio.Task] = None
+        self.snapshot_path = GALERIA_SNAPSHOT_PATH
+        self._snapshot_leido = False
+        self._snapshot_version: Optional[int] = None
+        self._snapshot_en: Optional[float] = None
+        self._escritura: Optional[asyncio.Task] = None
+        self._compartida = GaleriaCompartida(GALERIA_COMPARTIDA_NOMBRE, GALERIA_COMPARTIDA_LOCK) if compartida else None
+        # Generación de la imagen compartida que refleja esta instancia
+        self._generacion = 0
+        # Cambios aplicados aquí que todavía no se publicaron, y la tarea que los publica
+        self._pendientes: list = []
+        self._publicacion: Optional[asyncio.Task] = None
+
+    @property
+    def total(self) -> int:
+        return sum(b.activos for b in self._bloques.values())
+
+    @property
+    def cargada(self) -> bool:
+        return self._cargada
+
+    def invalidar(self):
+        """Fuerza una recarga completa en la próxima búsqueda."""
+        self._cargada = False
+
+    def cambiar_precision(self, precision: str):
+        """Cambia el formato de almacenamiento; se aplica al recargar desde la BD."""
+        if precision not in _DTYPES:
+            raise ValueError(f"Precisión no soportada: {precision}")
+        if precision != self.precision:
+            self.precision = precision
+            self.invalidar()
+
+    def estadisticas(self) -> dict:
+        return {
+            "precision": self.precision,
+            "version": self.version,
+            "filas": self.total,
+            "bytes": sum(b.bytes for b in self._bloques.values()),
+            "bloques": {
+                dim: {"filas": b.activos, "tombstones": b.muertos, "bytes": b.bytes, "ivf": b.ivf is not None}
+                for dim, b in self._bloques.items()
+            },
+            "compartida": self._compartida is not None,
+            "generacion": self._generacion,
+        }
+
+    async def evaluar_precision(self, precision: str, consultas: int = 200, semilla: int = 0) -> dict:
+        """
+        Compara los scores de `precision` contra float32 sobre la galería actual antes
+        de habilitar ese formato: memoria, velocidad de escaneo y error de score.
+        Las consultas son filas de la propia galería con ruido, para simular rostros reales.
+        """
+        if precision not in _DTYPES:
+            raise ValueError(f"Precisión no soportada: {precision}")
+        await self.asegurar_cargada()
+
+        referencia = self
+        if self.precision != "float32":
+            # La referencia debe ser exacta: se reconstruye en float32 desde la BD
+            referencia = FaceGallery("float32")
+            referencia.construir(await EncodingFaceRepository.find_all() or [])
+
+        reporte = await asyncio.to_thread(_comparar_precision, referencia, precision, consultas, semilla)
+        reporte["apto"] = reporte["error_max"] <= GALERIA_PRECISION_TOLERANCIA
+        reporte["tolerancia"] = GALERIA_PRECISION_TOLERANCIA
+        return reporte
+
+    def _reconciliacion_pendiente(self) -> bool:
+        return (
+            self._reconciliada_en is None
+            or time.monotonic() - self._reconciliada_en >= GALERIA_RECONCILIAR_SEGUNDOS
+        )
+
+    async def asegurar_cargada(self):
+        self._sincronizar()
+        if self._cargada and not self._reconciliacion_pendiente():
+            return
+        async with self._lock:
+            # Otro request pudo haber cargado/reconciliado mientras esperábamos el lock
+            if not self._cargada and self.snapshot_path and not self._snapshot_leido:
+                # Solo en el primer arranque; una invalidación explícita recarga desde la BD
+                self._snapshot_leido = True
+                if self.cargar_snapshot(self.snapshot_path):
+                    await self.reconciliar()
+            if not self._cargada:
+                records = await EncodingFaceRepository.find_all()
+                self.construir(records or [])
+            elif self._reconciliacion_pendiente():
+                await self.reconciliar()
+
+        self._programar_snapshot()
+
+        # Los índices ANN se entrenan en segundo plano; mientras tanto se usa fuerza bruta
+        if self._entrenamiento is None and any(b.requiere_indice() for b in self._bloques.values()):
+            self._entrenamiento = asyncio.create_task(self._entrenar_indices())
+
+    async def _entrenar_indices(self):
+        try:
+            for dim, bloque in list(self._bloques.items()):
+                if not bloque.requiere_indice():
+                    continue
+                n0, generacion = bloque.n, bloque.generacion
+                ivf = await asyncio.to_thread(IndiceIVF.entrenar, bloque.leer(slice(0, n0)))
+                # Si el bloque se compactó o reemplazó durante el entrenamiento, se descarta
+                if self._bloques.get(dim) is not bloque or bloque.generacion != generacion:
+                    continue
+                if bloque.n > n0:
+                    ivf.extender(bloque.leer(slice(n0, bloque.n)))
+                bloque.ivf = ivf
+        finally:
+            self._entrenamiento = None
+
+    def cargar_snapshot(self, path: str) -> bool:
+        try:
+            snapshot = face_gallery_snapshot.leer(path)
+        except Exception as e:
+            logger.warning(f"No se pudo leer el snapshot de la galería ({path}): {e}")
+            return False
+        if snapshot is None or snapshot.precision != self.precision:
+            return False
+
+        self._mutar(lambda: self._cargar_bloques(snapshot), publicar=True)
+        self._snapshot_version = snapshot.version
+        self._snapshot_en = time.monotonic()
+        self._reconciliada_en = None
+        logger.info(f"Galería cargada desde snapshot: {self.total} filas (versión {self.version})")
+        return True
+
+    def _cargar_bloques(self, snapshot: "face_gallery_snapshot.Snapshot"):
+        self._bloques = {}
+        self._ubicacion = {}
+        self._por_personal = {}
+        for b in snapshot.bloques:
+            bloque = self._bloques[b.dim] = _Bloque.desde_snapshot(b, snapshot.precision)
+            for fila, (encoding_id, personal_id) in enumerate(zip(bloque.ids, bloque.personal_ids)):
+                self._ubicacion[encoding_id] = (b.dim, fila)
+                self._por_personal.setdefault(personal_id, set()).add(encoding_id)
+        self.precision = snapshot.precision
+        self.version = snapshot.version
+        self._cargada = True
+
+    def _sincronizar(self, bloqueado: bool = False) -> bool:
+        """Adopta la imagen compartida si otro worker publicó una generación nueva."""
+        if self._compartida is None or self._compartida.generacion() == self._generacion:
+            return False
+        if bloqueado:
+            imagen = self._compartida.leer()
+        elif self._publicacion is not None:
+            # Hay cambios propios sin publicar: se adoptará la imagen al publicarlos
+            return False
+        else:
+            with self._compartida.bloqueo(exclusivo=False, esperar=False) as tomado:
+                # Si otro worker está publicando se sigue con la imagen actual
+                imagen = self._compartida.leer() if tomado else None
+        if imagen is None:
+            return False
+
+        # La precisión publicada prevalece, así un cambio de formato llega a todos los workers
+        generacion, snapshot = imagen
+        self._cargar_bloques(snapshot)
+        self._generacion = generacion
+        # El snapshot en disco lo escribe el worker que publicó el cambio
+        self._snapshot_version = self.version
+        return True
+
+    def _mutar(self, cambio, publicar: bool = False):
+        """
+        Aplica `cambio` a la galería. En modo compartido, dentro del event loop, el
+        cambio se ve de inmediato en este worker y _publicar_pendientes lo publica en
+        segundo plano; fuera del loop (scripts) se aplica con el bloqueo exclusivo
+        sobre la última generación publicada y se publica en el momento.
+        """
+        if self._compartida is None:
+            return cambio()
+        try:
+            asyncio.get_running_loop()
+        except RuntimeError:
+            with self._compartida.bloqueo():
+                self._sincronizar(bloqueado=True)
+                version = self.version
+                resultado = cambio()
+                if publicar or self.version != version:
+                    try:
+                        bloques = [b.a_snapshot() for b in self._bloques.values()]
+                        self._compartida.publicar(self.version, self.precision, bloques)
+                        self._remapear()
+                    except Exception as e:
+                        # Los demás workers verán el cambio en su próxima reconciliación
+                        logger.warning(f"No se pudo publicar la galería en memoria compartida: {e}")
+                return resultado
+
+        version = self.version
+        resultado = cambio()
+        if publicar or self.version != version:
+            self._pendientes.append(cambio)
+            if self._publicacion is None:
+                self._publicacion = asyncio.create_task(self._publicar_pendientes())
+        return resultado
+
+    async def _publicar_pendientes(self):
+        """
+        Publica los cambios pendientes sin detener el event loop: el bloqueo se toma
+        reintentando con asyncio.sleep y la copia a memoria compartida va en otro hilo.
+        Los cambios que llegan mientras tanto se publican en la vuelta siguiente.
+        """
+        try:
+            while self._pendientes:
+                async with self._compartida.bloqueo_exclusivo():
+                    cambios, self._pendientes = self._pendientes, []
+                    if self._compartida.generacion() != self._generacion:
+                        # Otro worker publicó antes: se parte de su imagen y se repiten los cambios
+                        self._sincronizar(bloqueado=True)
+                        for cambio in cambios:
+                            cambio()
+                    bloques = [b.a_snapshot() for b in self._bloques.values()]
+                    try:
+                        generacion = await asyncio.to_thread(
+                            self._compartida.publicar, self.version, self.precision, bloques
+                        )
+                    except Exception as e:
+                        # Los demás workers verán el cambio en su próxima reconciliación
+                        logger.warning(f"No se pudo publicar la galería en memoria compartida: {e}")
+                        continue
+                    if self._pendientes:
+                        # Lo llegado durante la copia se publica sobre esta generación
+                        self._generacion = generacion
+                    else:
+                        self._remapear()
+        finally:
+            self._publicacion = None
+
+    def _remapear(self):
+        """Re-mapea la imagen recién publicada para no conservar una copia privada."""
+        snapshot_version = self._snapshot_version
+        self._sincronizar(bloqueado=True)
+        self._snapshot_version = snapshot_version
+
+    @property
+    def snapshot_desactualizado(self) -> bool:
+        return bool(self.snapshot_path) and self._cargada and self._snapshot_version != self.version
+
+    def _programar_snapshot(self):
+        if not self.snapshot_desactualizado or self._escritura is not None:
+            return
+        if self._snapshot_en is not None and time.monotonic() - self._snapshot_en < GALERIA_SNAPSHOT_SEGUNDOS:
+            return
+        self._escritura = asyncio.create_task(self.guardar_snapshot())
+
+    async def guardar_snapshot(self):
+        """Escribe el snapshot en un hilo aparte; los errores solo se registran."""
+        version = self.version
+        bloques = [b.a_snapshot() for b in self._bloques.values()]
+        try:
+            await asyncio.to_thread(face_gallery_snapshot.escribir, self.snapshot_path, version, self.precision, bloques)
+            self._snapshot_version = version
+        except Exception as e:
+            logger.warning(f"No se pudo escribir el snapshot de la galería ({self.snapshot_path}): {e}")
+        finally:
+            self._snapshot_en = time.monotonic()
+            self._escritura = None
+
+    def construir(self, records: list[dict]):
+        self._mutar(lambda: self._construir(records))
+        self._reconciliada_en = time.monotonic()
+
+    def _construir(self, records: list[dict]):
+        self._bloques = {}
+        self._ubicacion = {}
+        self._por_personal = {}
+        self._agregar_registros(records)
+        self.version += 1
+        self._cargada = True
+
+    async def reconciliar(self):
+        """
+        Compara los ids de la BD con los de memoria y aplica solo la diferencia:
+        descarga los embeddings faltantes y elimina los que ya no existen.
+        """
+        locales = set(self._ubicacion)
+        remotos = set(map(str, await EncodingFaceRepository.find_ids()))
+
+        faltantes = remotos - locales
+        nuevos = await EncodingFaceRepository.find_by_ids(list(faltantes)) if faltantes else []
+
+        def aplicar():
+            self._agregar(nuevos)
+            # Solo se eliminan ids que ya existían antes de consultar, para no descartar
+            # altas aplicadas por este proceso mientras esperábamos la respuesta
+            for encoding_id in locales - remotos:
+                self._eliminar(encoding_id)
+
+        if nuevos or locales - remotos:
+            self._mutar(aplicar)
+        self._reconciliada_en = time.monotonic()
+
+    def _agregar_registros(self, records: list[dict]):
+        por_dim: dict[int, tuple[list, list, list]] = {}
+        for r in records:
+            emb = r.get("embedding")
+            if not emb:
+                continue
+            vectores, ids, personal_ids = por_dim.setdefault(len(emb), ([], [], []))
+            vectores.append(emb)
+            ids.append(str(r.get("id")))
+            personal_ids.append(str(r.get("personal_id")))
+
+        for dim, (vectores, ids, personal_ids) in por_dim.items():
+            matriz = _normalizar_filas(np.asarray(vectores, dtype=np.float32))
+            bloque = self._bloques.get(dim)
+            if bloque is None:
+                bloque = self._bloques[dim] = _Bloque(dim, max(len(ids), _CAPACIDAD_INICIAL), self.precision)
+            inicio = bloque.agregar(matriz, ids, personal_ids)
+            for k, (encoding_id, personal_id) in enumerate(zip(ids, personal_ids)):
+                self._ubicacion[encoding_id] = (dim, inicio + k)
+                self._por_personal.setdefault(personal_id, set()).add(encoding_id)
+
+    def agregar(self, records: list[dict]):
+        """Delta de alta: agrega filas nuevas sin recargar la galería."""
+        if self._cargada:
+            self._mutar(lambda: self._agregar(records))
+
+    def _agregar(self, records: list[dict]):
+        records = [r for r in records if r and str(r.get("id")) not in self._ubicacion]
+        if records:
+            self._agregar_registros(records)
+            self.version += 1
+
+    def eliminar(self, encoding_id):
+        """Delta de baja: marca la fila como eliminada y compacta si hay demasiados tombstones."""
+        self._mutar(lambda: self._eliminar(encoding_id))
+
+    def _eliminar(self, encoding_id):
+        ubicacion = self._ubicacion.pop(str(encoding_id), None)
+        if ubicacion is None:
+            return
+        dim, fila = ubicacion
+        bloque = self._bloques[dim]
+        personal_id = bloque.personal_ids[fila]
+        bloque.eliminar(fila)
+
+        ids_personal = self._por_personal.get(personal_id)
+        if ids_personal is not None:
+            ids_personal.discard(str(encoding_id))
+            if not ids_personal:
+                del self._por_personal[personal_id]
+
+        if bloque.requiere_compactar():
+            for nueva_fila, eid in enumerate(bloque.compactar()):
+                self._ubicacion[eid] = (dim, nueva_fila)
+        self.version += 1
+
+    def eliminar_personal(self, personal_id):
+        def eliminar_todos():
+            for encoding_id in list(self._por_personal.get(str(personal_id), ())):
+                self._eliminar(encoding_id)
+
+        self._mutar(eliminar_todos)
+
+    def buscar(self, embedding: list[float]) -> Coincidencia:
+        """
+        Retorna el mejor match y el score del segundo mejor, con la misma semántica
+        que el recorrido lineal anterior (segundo = -1.0 si solo hay un registro).
+        """
+        return self.buscar_lote([embedding])[0]
+
+    def buscar_lote(self, embeddings: list[list[float]]) -> list[Coincidencia]:
+        """buscar() para varios rostros a la vez (p. ej. todos los de un frame del kiosco)."""
+        consultas = [np.asarray(e, dtype=np.float32) for e in embeddings]
+
+        # Top-2 dentro de cada bloque y luego entre bloques; los ids solo se
+        # consultan para el ganador
+        best = [None] * len(consultas)
+        best_score = np.full(len(consultas), -np.inf)
+        second_score = np.full(len(consultas), -np.inf)
+
+        por_dim: dict[int, list[int]] = {}
+        for k, q in enumerate(consultas):
+            por_dim.setdefault(q.shape[0], []).append(k)
+
+        for indices in por_dim.values():
+            matriz_consultas = np.stack([consultas[k] for k in indices])
+            for bloque in self._bloques.values():
+                if not bloque.activos:
+                    continue
+                filas, tops, segundos = bloque.top2_lote(matriz_consultas, self.nprobe)
+                for j, k in enumerate(indices):
+                    if tops[j] > best_score[k]:
+                        second_score[k] = max(best_score[k], segundos[j])
+                        best_score[k] = tops[j]
+                        best[k] = (bloque, int(filas[j]))
+                    else:
+                        second_score[k] = max(second_score[k], tops[j])
+
+        resultado = []
+        for k, b in enumerate(best):
+            if b is None:
+                resultado.append(Coincidencia(None, None, -1.0, -1.0))
+                continue
+            bloque, i = b
+            segundo = float(second_score[k]) if np.isfinite(second_score[k]) else -1.0
+            resultado.append(Coincidencia(bloque.ids[i], bloque.personal_ids[i], float(best_score[k]), segundo))
+        return resultado
+
+    def top_k(self, embedding: list[float], k: int = 10) -> list[dict]:
+        """
+        Los k candidatos con mayor score en una sola pasada (con el índice IVF si el
+        bloque lo tiene), para diagnosticar rechazos por threshold o margen.
+        """
+        consulta = np.asarray(embedding, dtype=np.float32)
+        candidatos = []
+        for bloque in self._bloques.values():
+            if not bloque.activos:
+                continue
+            filas, scores = bloque.top_k(consulta, k, self.nprobe)
+            candidatos.extend(
+                {"encoding_id": bloque.ids[f], "personal_id": bloque.personal_ids[f], "score": float(sc)}
+                for f, sc in zip(filas.tolist(), scores.tolist())
+            )
+        candidatos.sort(key=lambda c: -c["score"])
+        return candidatos[:k]
+
+    def vecindario(self, limite: int = 50) -> list[dict]:
+        """
+        Pares de personas distintas con las plantillas más parecidas entre sí: para cada
+        plantilla se busca la más cercana de otra persona y por cada par se conserva el
+        score máximo. Se recorre por lotes de filas, sin materializar la matriz n x n;
+        el costo es O(n² · dim), así que conviene ejecutarlo fuera del event loop.
+        """
+        pares: dict[tuple, tuple] = {}
+        for bloque in list(self._bloques.values()):
+            n = bloque.n
+            if bloque.activos < 2:
+                continue
+            filas = bloque.leer(slice(0, n))
+            vivos = bloque.vivos[:n].copy()
+            ids, personal_ids = bloque.ids[:n], bloque.personal_ids[:n]
+            _, codigos = np.unique(np.array(personal_ids), return_inverse=True)
+
+            por_lote = max(1, (1 << 24) // n)
+            for i in range(0, n, por_lote):
+                j = min(i + por_lote, n)
+                s = filas[i:j] @ filas.T
+                s[:, ~vivos] = -np.inf
+                s[codigos[i:j, None] == codigos[None, :]] = -np.inf
+                cercanas = np.argmax(s, axis=1)
+                for fila, cercana in zip(range(i, j), cercanas.tolist()):
+                    score = float(s[fila - i, cercana])
+                    if not vivos[fila] or not np.isfinite(score):
+                        continue
+                    a, b = sorted((fila, cercana), key=lambda f: personal_ids[f])
+                    clave = (personal_ids[a], personal_ids[b])
+                    if clave not in pares or score > pares[clave][0]:
+                        pares[clave] = (score, ids[a], ids[b])
+
+        resultado = [
+            {"personal_id_a": pa, "encoding_id_a": ea, "personal_id_b": pb, "encoding_id_b": eb, "score": score}
+            for (pa, pb), (score, ea, eb) in pares.items()
+        ]
+        resultado.sort(key=lambda p: -p["score"])
+        return resultado[:limite]
+
+
+def _comparar_precision(referencia: FaceGallery, precision: str, consultas: int, semilla: int) -> dict:
+    rng = np.random.default_rng(semilla)
+    filas_total = 0
+    bytes_base = bytes_cand = 0
+    t_base = t_cand = 0.0
+    total_consultas = 0
+    error_max = 0.0
+    suma_errores = 0.0
+    n_scores = 0
+    coincidencias = 0
+
+    for dim, bloque in referencia._bloques.items():
+        if not bloque.activos:
+            continue
+        vivos = np.flatnonzero(bloque.vivos[:bloque.n])
+        filas = np.ascontiguousarray(bloque.leer(vivos))
+        n = filas.shape[0]
+
+        base = _Bloque(dim, n, "float32")
+        base.agregar(filas, [None] * n, [None] * n)
+        candidato = _Bloque(dim, n, precision)
+        candidato.agregar(filas, [None] * n, [None] * n)
+
+        k = min(consultas, n)
+        q = filas[rng.choice(n, size=k, replace=False)] + rng.normal(scale=0.1 / np.sqrt(dim), size=(k, dim))
+        q = _normalizar_filas(q.astype(np.float32))
+
+        # Se mide consulta por consulta, como llegan en /asistencia/realtime
+        inicio = time.perf_counter()
+        s_base = np.vstack([base._producto(q[i:i + 1]) for i in range(k)])
+        t_base += time.perf_counter() - inicio
+        inicio = time.perf_counter()
+        s_cand = np.vstack([candidato._producto(q[i:i + 1]) for i in range(k)])
+        t_cand += time.perf_counter() - inicio
+
+        errores = np.abs(s_base - s_cand)
+        error_max = max(error_max, float(errores.max()))
+        suma_errores += float(errores.sum())
+        n_scores += errores.size
+        coincidencias += int((s_base.argmax(axis=1) == s_cand.argmax(axis=1)).sum())
+        total_consultas += k
+        filas_total += n
+        bytes_base += base.bytes
+        bytes_cand += candidato.bytes
+
+    return {
+        "precision": precision,
+        "filas": filas_total,
+        "consultas": total_consultas,
+        "bytes_float32": bytes_base,
+        "bytes": bytes_cand,
+        "ms_por_consulta_float32": round(t_base * 1000 / total_consultas, 4) if total_consultas else 0.0,
+        "ms_por_consulta": round(t_cand * 1000 / total_consultas, 4) if total_consultas else 0.0,
+        "error_max": error_max,
+        "error_medio": suma_errores / n_scores if n_scores else 0.0,
+        "top1_coincidencia": coincidencias / total_consultas if total_consultas else 1.0,
+    }
+
+
+# Instancia única por proceso
+_face_gallery = None
+
+def get_face_gallery() -> FaceGallery:
+    global _face_gallery
+
+    if _face_gallery is None:
+        _face_gallery = FaceGallery(compartida=GALERIA_COMPARTIDA)
+
+    return _face_gallery
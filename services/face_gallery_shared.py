@@ -0,0 +1,211 @@
+"""
+Imagen de la galería facial en memoria compartida (multiprocessing.shared_memory),
+para que los workers de uvicorn/gunicorn de una misma máquina usen una sola copia.
+
+Se usan dos segmentos:
+    control (nombre fijo, 128 bytes): uint64 generación | nombre del segmento de datos
+    datos (`<nombre>_<generación>`): la galería con el formato de face_gallery_snapshot
+
+Un solo proceso escribe a la vez (flock exclusivo sobre un archivo de bloqueo): arma
+la imagen en un segmento nuevo, apunta el control a él con la generación siguiente y
+elimina el nombre del anterior. Los lectores comparan la generación (8 bytes, sin
+bloqueo) antes de cada búsqueda y, si cambió, mapean el segmento nuevo sin copiarlo.
+Dentro del event loop el bloqueo se pide sin esperar (LOCK_NB): el lector que lo
+encuentra tomado sigue con la imagen que ya tiene y el escritor reintenta con
+asyncio.sleep, así ningún worker detiene su event loop mientras otro publica.
+Quien todavía tenga mapeado el segmento anterior lo sigue leyendo hasta soltarlo; el
+sistema operativo libera la memoria cuando lo cierra el último proceso.
+"""
+import asyncio
+import os
+import sys
+from contextlib import asynccontextmanager, contextmanager
+from multiprocessing import resource_tracker, shared_memory
+from typing import Optional
+
+import numpy as np
+
+from services import face_gallery_snapshot
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+
+_CONTROL_BYTES = 128
+_NOMBRE_OFFSET = 8
+_NOMBRE_MAX = _CONTROL_BYTES - _NOMBRE_OFFSET
+# Espera entre intentos de tomar el bloqueo desde el event loop
+_REINTENTO_SEGUNDOS = 0.005
+
+
+def _abrir(nombre: str, crear: bool = False, tamano: int = 0) -> shared_memory.SharedMemory:
+    if sys.version_info >= (3, 13):
+        return shared_memory.SharedMemory(name=nombre, create=crear, size=tamano, track=False)
+    shm = shared_memory.SharedMemory(name=nombre, create=crear, size=tamano)
+    # Antes de 3.13 el resource_tracker elimina el segmento al terminar el proceso que lo
+    # abrió, aunque los demás workers lo sigan usando
+    try:
+        resource_tracker.unregister(shm._name, "shared_memory")
+    except Exception:
+        pass
+    return shm
+
+
+def _unlink(shm: shared_memory.SharedMemory):
+    if sys.version_info >= (3, 13):
+        shm.unlink()
+    else:
+        # SharedMemory.unlink() también lo quitaría del resource_tracker, donde ya no está
+        import _posixshmem
+        _posixshmem.shm_unlink(shm._name)
+
+
+def _eliminar(nombre: str):
+    try:
+        shm = _abrir(nombre)
+    except FileNotFoundError:
+        return
+    shm.close()
+    _unlink(shm)
+
+
+class GaleriaCompartida:
+
+    def __init__(self, nombre: str, lock_path: str):
+        if fcntl is None:
+            raise RuntimeError("La galería compartida requiere un sistema POSIX (fcntl)")
+        self.nombre = nombre
+        self.lock_path = lock_path
+        self._control: Optional[shared_memory.SharedMemory] = None
+        self._contador: Optional[np.ndarray] = None
+        self._datos: Optional[shared_memory.SharedMemory] = None
+        # Segmentos reemplazados que aún tienen vistas vivas (p. ej. un entrenamiento IVF en curso)
+        self._retirados: list = []
+        self._fd: Optional[int] = None
+
+    def _abrir_control(self, crear: bool = False) -> bool:
+        if self._control is not None:
+            return True
+        try:
+            shm = _abrir(self.nombre)
+        except FileNotFoundError:
+            if not crear:
+                return False
+            try:
+                shm = _abrir(self.nombre, crear=True, tamano=_CONTROL_BYTES)
+            except FileExistsError:
+                shm = _abrir(self.nombre)
+        self._control = shm
+        self._contador = np.ndarray((1,), dtype=np.uint64, buffer=shm.buf)
+        return True
+
+    def generacion(self) -> int:
+        """Generación publicada (0 si todavía no hay imagen)."""
+        if not self._abrir_control():
+            return 0
+        return int(self._contador[0])
+
+    def _nombre_datos(self) -> str:
+        return bytes(self._control.buf[_NOMBRE_OFFSET:_CONTROL_BYTES]).rstrip(b"\0").decode()
+
+    @contextmanager
+    def bloqueo(self, exclusivo: bool = True, esperar: bool = True):
+        """
+        flock sobre el archivo de bloqueo. Con esperar=False no bloquea: entrega False
+        (y no toma nada) si otro proceso lo tiene.
+        """
+        if self._fd is None:
+            os.makedirs(os.path.dirname(os.path.abspath(self.lock_path)), exist_ok=True)
+            self._fd = os.open(self.lock_path, os.O_RDWR | os.O_CREAT, 0o644)
+        modo = fcntl.LOCK_EX if exclusivo else fcntl.LOCK_SH
+        try:
+            fcntl.flock(self._fd, modo if esperar else modo | fcntl.LOCK_NB)
+        except BlockingIOError:
+            yield False
+            return
+        try:
+            yield True
+        finally:
+            fcntl.flock(self._fd, fcntl.LOCK_UN)
+
+    @asynccontextmanager
+    async def bloqueo_exclusivo(self):
+        """Bloqueo exclusivo desde el event loop: reintenta sin bloquearlo hasta obtenerlo."""
+        while True:
+            with self.bloqueo(esperar=False) as tomado:
+                if tomado:
+                    yield
+                    return
+            await asyncio.sleep(_REINTENTO_SEGUNDOS)
+
+    def _retirar(self, shm: Optional[shared_memory.SharedMemory]):
+        if shm is not None:
+            self._retirados.append(shm)
+        pendientes = []
+        for s in self._retirados:
+            try:
+                s.close()
+            except BufferError:
+                pendientes.append(s)
+        self._retirados = pendientes
+
+    def leer(self) -> Optional[tuple]:
+        """
+        Mapea la imagen publicada y retorna (generación, Snapshot), o None si no hay.
+        Debe llamarse con el bloqueo tomado. Los vectores quedan de solo lectura: los
+        comparten todos los workers.
+        """
+        generacion = self.generacion()
+        if not generacion:
+            return None
+        try:
+            datos = _abrir(self._nombre_datos())
+        except FileNotFoundError:
+            return None
+
+        snapshot = face_gallery_snapshot.desde_buffer(np.ndarray((datos.size,), dtype=np.uint8, buffer=datos.buf))
+        if snapshot is None:
+            datos.close()
+            return None
+        for b in snapshot.bloques:
+            b.matriz.flags.writeable = False
+            if b.escalas is not None:
+                b.escalas.flags.writeable = False
+
+        self._retirar(self._datos)
+        self._datos = datos
+        return generacion, snapshot
+
+    def publicar(self, version: int, precision: str, bloques: list) -> int:
+        """
+        Escribe una imagen nueva y la activa. Debe llamarse con el bloqueo exclusivo;
+        copia toda la galería, así que desde el event loop conviene un hilo aparte.
+        """
+        self._abrir_control(crear=True)
+        anterior = self._nombre_datos()
+        generacion = int(self._contador[0]) + 1
+        nombre = f"{self.nombre}_{generacion}"
+
+        plan = face_gallery_snapshot.planificar(version, precision, bloques)
+        try:
+            datos = _abrir(nombre, crear=True, tamano=plan.tamano)
+        except FileExistsError:
+            # Restos de una publicación interrumpida
+            _eliminar(nombre)
+            datos = _abrir(nombre, crear=True, tamano=plan.tamano)
+        try:
+            face_gallery_snapshot.escribir_buffer(np.ndarray((plan.tamano,), dtype=np.uint8, buffer=datos.buf), plan)
+        except Exception:
+            datos.close()
+            _unlink(datos)
+            raise
+        datos.close()
+
+        # Primero el nombre y después la generación: quien vea la generación nueva ya
+        # encuentra el segmento correcto
+        self._control.buf[_NOMBRE_OFFSET:_CONTROL_BYTES] = nombre.encode().ljust(_NOMBRE_MAX, b"\0")
+        self._contador[0] = generacion
+        if anterior and anterior != nombre:
+            _eliminar(anterior)
+        return generacion
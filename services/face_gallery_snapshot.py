@@ -0,0 +1,152 @@
+"""
+Snapshot binario de la galería facial en disco.
+
+Formato (little-endian):
+    b"GALERIA1" | uint64 largo del encabezado | encabezado JSON | secciones de datos
+
+El encabezado lleva la versión de la galería, la precisión y, por cada bloque, la
+dimensión, la cantidad de filas y el offset de cada sección: ids de codificación,
+personal_ids (ambos como cadenas de ancho fijo) y el bloque crudo de vectores (y
+escalas en int8). Las secciones van alineadas a 64 bytes para poder mapearlas con
+np.memmap sin copiarlas: el arranque es casi instantáneo y el sistema operativo
+comparte las páginas entre procesos. El mismo formato se usa para la imagen en
+memoria compartida (ver face_gallery_shared).
+"""
+import json
+import os
+import struct
+from typing import NamedTuple, Optional
+
+import numpy as np
+
+MAGIC = b"GALERIA1"
+FORMATO = 1
+_ALINEACION = 64
+
+
+class BloqueSnapshot(NamedTuple):
+    dim: int
+    matriz: np.ndarray
+    escalas: Optional[np.ndarray]
+    ids: list
+    personal_ids: list
+
+
+class Snapshot(NamedTuple):
+    version: int
+    precision: str
+    bloques: list
+
+
+def _alinear(offset: int) -> int:
+    return (offset + _ALINEACION - 1) // _ALINEACION * _ALINEACION
+
+
+def _cadenas(valores: list) -> np.ndarray:
+    ancho = max((len(v) for v in valores), default=1) or 1
+    return np.array([v.encode() for v in valores], dtype=f"S{ancho}")
+
+
+class Plan(NamedTuple):
+    encabezado: bytes
+    secciones: list
+    tamano: int
+
+
+def planificar(version: int, precision: str, bloques: list) -> Plan:
+    """Encabezado, secciones y tamaño total del snapshot, sin escribir nada."""
+    secciones = []
+    descriptores = []
+    for b in bloques:
+        desc = {"dim": b.dim, "n": len(b.ids)}
+        arrays = {
+            "ids": _cadenas(b.ids),
+            "personal_ids": _cadenas(b.personal_ids),
+            "vectores": np.ascontiguousarray(b.matriz),
+        }
+        if b.escalas is not None:
+            arrays["escalas"] = np.ascontiguousarray(b.escalas, dtype=np.float32)
+        for nombre, arr in arrays.items():
+            desc[nombre] = {"dtype": arr.dtype.str, "shape": list(arr.shape)}
+            secciones.append((desc[nombre], arr))
+        descriptores.append(desc)
+
+    encabezado = {"formato": FORMATO, "version": version, "precision": precision, "bloques": descriptores}
+    # Los offsets dependen del largo del encabezado y viceversa: se reserva espacio fijo
+    offset = _alinear(len(MAGIC) + 8 + len(json.dumps(encabezado)) + 64 * len(secciones) + 1024)
+    inicio_datos = offset
+    for desc, arr in secciones:
+        desc["offset"] = offset
+        offset = _alinear(offset + arr.nbytes)
+
+    texto = json.dumps(encabezado).encode()
+    if len(MAGIC) + 8 + len(texto) > inicio_datos:
+        raise ValueError("Encabezado del snapshot demasiado grande")
+    return Plan(MAGIC + struct.pack("<Q", len(texto)) + texto, secciones, offset)
+
+
+def escribir(path: str, version: int, precision: str, bloques: list):
+    """
+    Escribe el snapshot de forma atómica (archivo temporal + os.replace), así que
+    varios workers pueden escribirlo a la vez sin dejar un archivo corrupto.
+    `bloques` es una lista de BloqueSnapshot con solo filas vivas.
+    """
+    plan = planificar(version, precision, bloques)
+
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    temporal = f"{path}.{os.getpid()}.tmp"
+    with open(temporal, "wb") as f:
+        f.write(plan.encabezado)
+        for desc, arr in plan.secciones:
+            f.seek(desc["offset"])
+            arr.tofile(f)
+        f.truncate(plan.tamano)
+    os.replace(temporal, path)
+
+
+def escribir_buffer(destino: np.ndarray, plan: Plan):
+    """Igual que escribir() pero sobre un buffer uint8 (p. ej. memoria compartida)."""
+    if destino.shape[0] < plan.tamano:
+        raise ValueError("Buffer insuficiente para el snapshot")
+    destino[:len(plan.encabezado)] = np.frombuffer(plan.encabezado, dtype=np.uint8)
+    for desc, arr in plan.secciones:
+        destino[desc["offset"]:desc["offset"] + arr.nbytes] = arr.reshape(-1).view(np.uint8)
+
+
+def leer(path: str) -> Optional[Snapshot]:
+    """
+    Mapea el snapshot en memoria. Las matrices de vectores quedan como vistas
+    copy-on-write del archivo: solo se copian las páginas que se modifiquen.
+    Retorna None si el archivo no existe o no es válido.
+    """
+    if not os.path.exists(path):
+        return None
+    return desde_buffer(np.memmap(path, mode="c"))
+
+
+def desde_buffer(mapa: np.ndarray) -> Optional[Snapshot]:
+    """Interpreta un buffer uint8 con formato de snapshot; los arrays son vistas sin copia."""
+    if mapa.shape[0] < len(MAGIC) + 8 or bytes(mapa[:len(MAGIC)]) != MAGIC:
+        return None
+    (largo,) = struct.unpack("<Q", bytes(mapa[len(MAGIC):len(MAGIC) + 8]))
+    inicio = len(MAGIC) + 8
+    encabezado = json.loads(bytes(mapa[inicio:inicio + largo]))
+
+    if encabezado.get("formato") != FORMATO:
+        return None
+
+    def seccion(desc):
+        dtype = np.dtype(desc["dtype"])
+        nbytes = int(np.prod(desc["shape"])) * dtype.itemsize
+        return mapa[desc["offset"]:desc["offset"] + nbytes].view(dtype).reshape(desc["shape"])
+
+    bloques = []
+    for desc in encabezado["bloques"]:
+        bloques.append(BloqueSnapshot(
+            dim=desc["dim"],
+            matriz=seccion(desc["vectores"]),
+            escalas=seccion(desc["escalas"]) if "escalas" in desc else None,
+            ids=[v.decode() for v in seccion(desc["ids"]).tolist()],
+            personal_ids=[v.decode() for v in seccion(desc["personal_ids"]).tolist()],
+        ))
+    return Snapshot(encabezado["version"], encabezado["precision"], bloques)
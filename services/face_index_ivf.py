@@ -0,0 +1,81 @@
+"""
+Índice IVF (inverted file) para búsqueda aproximada en la galería facial.
+
+Los embeddings normalizados se agrupan con k-means esférico en `nlist` listas.
+Una consulta solo revisa las `nprobe` listas cuyos centroides están más cerca y
+calcula el score exacto de esas filas, así que los scores devueltos son los mismos
+que en fuerza bruta; lo aproximado es únicamente qué filas se revisan.
+"""
+import numpy as np
+
+_ITERACIONES = 10
+_MUESTRA_POR_LISTA = 64
+_FILAS_POR_LOTE = 8192
+
+
+def _asignar(vectores: np.ndarray, centroides: np.ndarray) -> np.ndarray:
+    """Lista más cercana de cada fila, por lotes para acotar la memoria temporal."""
+    asignacion = np.empty(vectores.shape[0], dtype=np.int32)
+    for i in range(0, vectores.shape[0], _FILAS_POR_LOTE):
+        asignacion[i:i + _FILAS_POR_LOTE] = np.argmax(vectores[i:i + _FILAS_POR_LOTE] @ centroides.T, axis=1)
+    return asignacion
+
+
+class IndiceIVF:
+
+    def __init__(self, centroides: np.ndarray, asignacion: np.ndarray):
+        self.centroides = centroides
+        self.asignacion = asignacion
+        self.entrenado_con = asignacion.shape[0]
+        self._orden = None
+        self._offsets = None
+
+    @property
+    def nlist(self) -> int:
+        return self.centroides.shape[0]
+
+    @classmethod
+    def entrenar(cls, matriz: np.ndarray, nlist: int = None, semilla: int = 0) -> "IndiceIVF":
+        """K-means esférico sobre una muestra; luego asigna todas las filas."""
+        n = matriz.shape[0]
+        if nlist is None:
+            nlist = int(np.sqrt(n))
+        nlist = max(1, min(nlist, n))
+
+        rng = np.random.default_rng(semilla)
+        muestra = matriz[rng.choice(n, size=min(n, nlist * _MUESTRA_POR_LISTA), replace=False)]
+        centroides = muestra[rng.choice(muestra.shape[0], size=nlist, replace=False)].copy()
+
+        for _ in range(_ITERACIONES):
+            asignacion = _asignar(muestra, centroides)
+            sumas = np.zeros_like(centroides)
+            np.add.at(sumas, asignacion, muestra)
+            normas = np.linalg.norm(sumas, axis=1, keepdims=True)
+            # Listas vacías conservan su centroide anterior
+            centroides = np.where(normas > 0, sumas / np.where(normas > 0, normas, 1.0), centroides)
+
+        centroides = np.ascontiguousarray(centroides, dtype=np.float32)
+        return cls(centroides, _asignar(matriz, centroides))
+
+    def extender(self, vectores: np.ndarray):
+        """Asigna filas agregadas después del entrenamiento a su lista más cercana."""
+        self.asignacion = np.concatenate([self.asignacion, _asignar(vectores, self.centroides)])
+        self._orden = None
+
+    def compactar(self, mascara: np.ndarray):
+        self.asignacion = self.asignacion[mascara]
+        self._orden = None
+
+    def _listas(self):
+        # Listas invertidas (filas ordenadas por lista + offsets); se recalculan solo tras cambios
+        if self._orden is None:
+            self._orden = np.argsort(self.asignacion, kind="stable").astype(np.int64)
+            self._offsets = np.searchsorted(self.asignacion[self._orden], np.arange(self.nlist + 1))
+        return self._orden, self._offsets
+
+    def candidatos(self, consulta: np.ndarray, nprobe: int) -> np.ndarray:
+        """Filas de las `nprobe` listas más cercanas a la consulta (normalizada)."""
+        nprobe = max(1, min(nprobe, self.nlist))
+        cercanas = np.argpartition(-(self.centroides @ consulta), nprobe - 1)[:nprobe]
+        orden, offsets = self._listas()
+        return np.concatenate([orden[offsets[c]:offsets[c + 1]] for c in cercanas])
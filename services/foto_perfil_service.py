@@ -0,0 +1,121 @@
+"""
+Fotos de perfil servidas como imágenes (no como base64 dentro del JSON).
+
+La URL de cada foto incluye el hash de su contenido (/personal/{id}/foto/{hash}),
+así que una URL siempre corresponde a la misma imagen: el navegador puede
+cachearla indefinidamente y revalidarla con If-None-Match sin tocar la BD. Las
+imágenes decodificadas y las miniaturas se guardan en una caché LRU por proceso,
+limitada por bytes; al no cambiar nunca el contenido de una clave, no hay que
+invalidarla.
+"""
+import asyncio
+from collections import OrderedDict
+from typing import NamedTuple, Optional
+from uuid import UUID
+
+from config.fotos_config import FOTO_CACHE_MAX_MB
+from repository.foto_perfil_repository import FotoPerfilRepository
+from utils.fotos import hash_foto, decodificar, miniatura
+
+
+class Foto(NamedTuple):
+    hash: str
+    contenido: bytes
+    media_type: str
+
+
+def url_foto(personal_id, foto_hash: Optional[str]) -> Optional[str]:
+    return f"/personal/{personal_id}/foto/{foto_hash}" if foto_hash else None
+
+
+def etag_foto(foto_hash: str, tamano: Optional[int] = None) -> str:
+    return f'"{foto_hash}-{tamano}"' if tamano else f'"{foto_hash}"'
+
+
+class CacheFotos:
+
+    def __init__(self, max_bytes: int):
+        self.max_bytes = max_bytes
+        # (personal_id, hash, tamaño) -> (contenido, media_type), de la menos a la más reciente
+        self._entradas: OrderedDict[tuple, tuple] = OrderedDict()
+        self.bytes = 0
+        self.aciertos = 0
+        self.fallos = 0
+
+    def buscar(self, clave: tuple, contar: bool = True) -> Optional[tuple]:
+        entrada = self._entradas.get(clave)
+        if entrada is None:
+            if contar:
+                self.fallos += 1
+            return None
+        self._entradas.move_to_end(clave)
+        if contar:
+            self.aciertos += 1
+        return entrada
+
+    def guardar(self, clave: tuple, contenido: bytes, media_type: str):
+        if len(contenido) > self.max_bytes or clave in self._entradas:
+            return
+        self._entradas[clave] = (contenido, media_type)
+        self.bytes += len(contenido)
+        while self.bytes > self.max_bytes:
+            _, (viejo, _) = self._entradas.popitem(last=False)
+            self.bytes -= len(viejo)
+
+    def estadisticas(self) -> dict:
+        consultas = self.aciertos + self.fallos
+        return {
+            "entradas": len(self._entradas),
+            "bytes": self.bytes,
+            "max_bytes": self.max_bytes,
+            "aciertos": self.aciertos,
+            "fallos": self.fallos,
+            "tasa_aciertos": self.aciertos / consultas if consultas else 0.0,
+        }
+
+
+# Instancia única por proceso
+_cache_fotos = None
+
+def get_cache_fotos() -> CacheFotos:
+    global _cache_fotos
+
+    if _cache_fotos is None:
+        _cache_fotos = CacheFotos(int(FOTO_CACHE_MAX_MB * 1024 * 1024))
+
+    return _cache_fotos
+
+
+class FotoPerfilService:
+
+    @staticmethod
+    async def obtener(personal_id: UUID, foto_hash: str, tamano: Optional[int] = None) -> Optional[Foto]:
+        """
+        Foto (o miniatura) de un personal, o None si no tiene foto. Si `foto_hash`
+        ya no es el de su foto actual, retorna una Foto sin contenido con el hash
+        actual, para que el controller redirija a la URL vigente.
+        """
+        cache = get_cache_fotos()
+        clave = (str(personal_id), foto_hash)
+        entrada = cache.buscar((*clave, tamano))
+        if entrada is not None:
+            return Foto(foto_hash, *entrada)
+
+        # La miniatura se genera desde el original, que puede estar ya en caché
+        original = cache.buscar((*clave, None), contar=False) if tamano else None
+        if original is None:
+            row = await FotoPerfilRepository.find_by_personal_id(personal_id)
+            if not row or not row.get("foto_base64"):
+                return None
+            actual = row.get("foto_hash") or hash_foto(row["foto_base64"])
+            if actual != foto_hash:
+                return Foto(actual, b"", "")
+            original = decodificar(row["foto_base64"])
+            cache.guardar((*clave, None), *original)
+
+        contenido, media_type = original
+        if tamano:
+            # Redimensionar es CPU: fuera del event loop
+            contenido, media_type = await asyncio.to_thread(miniatura, contenido, media_type, tamano)
+            cache.guardar((*clave, tamano), contenido, media_type)
+        return Foto(foto_hash, contenido, media_type)
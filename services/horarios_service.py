@@ -1,4 +1,5 @@
 from  config.config_horarios import HORARIOS
+from services.reporte_cache import get_cache_reporte
 
 class HorariosService:
 
@@ -25,4 +26,6 @@ class HorariosService:
                         elif isinstance(valor, str):
                              HORARIOS[clave][subclave] = time.fromisoformat(valor)
 
+        # Los reportes calculados con los horarios anteriores ya no sirven
+        get_cache_reporte().limpiar()
         return True
@@ -0,0 +1,95 @@
+"""
+Caché read-through de PersonalRepository.find_by_id.
+
+Cada marcación en tiempo real consulta el personal al menos dos veces
+(procesar_realtime y registrar_asistencia) y la tabla casi no cambia. Las entradas
+vencen a los PERSONAL_CACHE_SEGUNDOS, se desalojan por LRU al superar
+PERSONAL_CACHE_MAX y PersonalService las invalida al modificar o eliminar a la
+persona. Los "no encontrado" no se cachean.
+"""
+import time
+from collections import OrderedDict
+from typing import Optional
+
+from config.cache_config import PERSONAL_CACHE_SEGUNDOS, PERSONAL_CACHE_MAX
+from repository.personal_repository import PersonalRepository
+
+
+class CachePersonal:
+
+    def __init__(self, ttl: float = PERSONAL_CACHE_SEGUNDOS, max_entradas: int = PERSONAL_CACHE_MAX):
+        self.ttl = ttl
+        self.max_entradas = max_entradas
+        # (personal_id, con_foto) -> (expira, fila), de la menos a la más reciente
+        self._entradas: OrderedDict[tuple, tuple] = OrderedDict()
+        self.aciertos = 0
+        self.fallos = 0
+        self.desalojos = 0
+        self.invalidaciones = 0
+
+    @property
+    def habilitada(self) -> bool:
+        return self.ttl > 0 and self.max_entradas > 0
+
+    async def obtener(self, personal_id, con_foto: bool = False) -> Optional[dict]:
+        """Igual que PersonalRepository.find_by_id, pero desde la caché si está vigente."""
+        if not self.habilitada:
+            return await PersonalRepository.find_by_id(personal_id, con_foto=con_foto)
+
+        clave = (str(personal_id), con_foto)
+        entrada = self._entradas.get(clave)
+        if entrada is not None:
+            expira, fila = entrada
+            if expira > time.monotonic():
+                self._entradas.move_to_end(clave)
+                self.aciertos += 1
+                # Copia: los servicios agregan o quitan claves de la fila que reciben
+                return dict(fila)
+            del self._entradas[clave]
+
+        self.fallos += 1
+        fila = await PersonalRepository.find_by_id(personal_id, con_foto=con_foto)
+        if fila is None:
+            return None
+
+        self._entradas[clave] = (time.monotonic() + self.ttl, fila)
+        self._entradas.move_to_end(clave)
+        while len(self._entradas) > self.max_entradas:
+            self._entradas.popitem(last=False)
+            self.desalojos += 1
+        return dict(fila)
+
+    def invalidar(self, personal_id):
+        """Descarta las entradas de una persona (con y sin foto)."""
+        for con_foto in (False, True):
+            if self._entradas.pop((str(personal_id), con_foto), None) is not None:
+                self.invalidaciones += 1
+
+    def limpiar(self):
+        self._entradas.clear()
+
+    def estadisticas(self) -> dict:
+        consultas = self.aciertos + self.fallos
+        return {
+            "habilitada": self.habilitada,
+            "ttl_segundos": self.ttl,
+            "max_entradas": self.max_entradas,
+            "entradas": len(self._entradas),
+            "aciertos": self.aciertos,
+            "fallos": self.fallos,
+            "desalojos": self.desalojos,
+            "invalidaciones": self.invalidaciones,
+            "tasa_aciertos": self.aciertos / consultas if consultas else 0.0,
+        }
+
+
+# Instancia única por proceso
+_cache_personal = None
+
+def get_cache_personal() -> CachePersonal:
+    global _cache_personal
+
+    if _cache_personal is None:
+        _cache_personal = CachePersonal()
+
+    return _cache_personal
@@ -13,11 +13,28 @@ from dto.personal_dto.personal_update_dto import PersonalUpdateDTO
 from dto.personal_dto.personal_response_dto import PersonalResponseDTO
 from dto.personal_dto.personal_with_encoding_dto import PersonalWithEncodingCreateDTO
 from services.encoding_face_service import EncodingFaceService
+from services.face_gallery import get_face_gallery
+from services.foto_perfil_service import url_foto, get_cache_fotos
+from services.personal_cache import get_cache_personal
+from services.asistencia_dia_cache import get_cache_asistencia_dia
 from dto.codificacion_facial_dto.endodig_face_request_dto import EncodingFaceCreateDTO
 from utils.security import hash_password, generate_token, token_expiry, verify_password
 from utils.mailer import send_password_reset_email
 
 
+def _aplanar_foto(row: dict) -> dict:
+    """
+    Reemplaza el embebido fotos_perfil por foto_hash y foto_url. Supabase devuelve
+    una lista si la relación es 1-n, o un objeto si es 1-1.
+    """
+    foto_data = row.pop("fotos_perfil", None)
+    if isinstance(foto_data, list):
+        foto_data = foto_data[0] if foto_data else None
+    row["foto_hash"] = foto_data.get("foto_hash") if isinstance(foto_data, dict) else None
+    row["foto_url"] = url_foto(row["id"], row["foto_hash"])
+    return row
+
+
 class AuthResult(TypedDict):
     access_token: str
     personal: dict
@@ -44,32 +61,18 @@ class PersonalService:
 
     @staticmethod
     async def list_all():
-        result = await PersonalRepository.find_all()
-        # Aplanar fotos_perfil
+        result = await PersonalRepository.find_all(con_foto=True)
         for row in result:
-            if "fotos_perfil" in row and row["fotos_perfil"]:
-                foto_data = row["fotos_perfil"]
-                if isinstance(foto_data, list) and len(foto_data) > 0:
-                    row["foto_base64"] = foto_data[0].get("foto_base64")
-                elif isinstance(foto_data, dict):
-                    row["foto_base64"] = foto_data.get("foto_base64")
+            _aplanar_foto(row)
         return result
 
     @staticmethod
     async def get_by_id(personal_id: UUID):
-        result = await PersonalRepository.find_by_id(personal_id)
+        result = await get_cache_personal().obtener(personal_id, con_foto=True)
         if not result:
             raise Exception("El personal no existe")
         
-        # Aplanar fotos_perfil
-        if "fotos_perfil" in result and result["fotos_perfil"]:
-            foto_data = result["fotos_perfil"]
-            if isinstance(foto_data, list) and len(foto_data) > 0:
-                result["foto_base64"] = foto_data[0].get("foto_base64")
-            elif isinstance(foto_data, dict):
-                result["foto_base64"] = foto_data.get("foto_base64")
-            
-        return result
+        return _aplanar_foto(result)
 
     @staticmethod
     async def delete(personal_id: UUID):
@@ -79,9 +82,11 @@ class PersonalService:
         """
         # 1. Eliminar asistencias
         await AsistenciaRepository.delete_by_personal_id(str(personal_id))
+        get_cache_asistencia_dia().invalidar(personal_id)
         
         # 2. Eliminar codificaciones faciales
         await EncodingFaceRepository.delete_by_personal_id(personal_id)
+        get_face_gallery().eliminar_personal(personal_id)
         
         # 3. Eliminar solicitudes (si existen)
         await SolicitudesAusenciasRepository.delete_by_personal(personal_id)
@@ -91,7 +96,9 @@ class PersonalService:
         await FotoPerfilRepository.delete_by_personal_id(personal_id)
         
         # 5. Finalmente eliminar el personal
-        return await PersonalRepository.delete(personal_id)
+        result = await PersonalRepository.delete(personal_id)
+        get_cache_personal().invalidar(personal_id)
+        return result
 
     @staticmethod
     async def update(personal_id: UUID, data: PersonalUpdateDTO):
@@ -105,7 +112,9 @@ class PersonalService:
         if password_raw:
             payload["password_hash"] = hash_password(str(password_raw))
 
-        return await PersonalRepository.update(personal_id, payload)
+        result = await PersonalRepository.update(personal_id, payload)
+        get_cache_personal().invalidar(personal_id)
+        return result
 
     @staticmethod
     async def find_by_email(email: str):
@@ -163,6 +172,7 @@ class PersonalService:
         password_hash = hash_password(new_password)
 
         await PersonalRepository.update_password(row["id"], password_hash)
+        get_cache_personal().invalidar(row["id"])
 
         return True
 
@@ -189,15 +199,7 @@ class PersonalService:
         if not valid:
             return None
 
-        # Aplanar fotos_perfil si existe
-        if "fotos_perfil" in user and user["fotos_perfil"]:
-            # Supabase devuelve una lista si es relación 1-n, o un objeto si es 1-1 configurado con .single()
-            # En find_by_email devuelve una lista de objetos si no se especifica single.
-            foto_data = user["fotos_perfil"]
-            if isinstance(foto_data, list) and len(foto_data) > 0:
-                user["foto_base64"] = foto_data[0].get("foto_base64")
-            elif isinstance(foto_data, dict):
-                user["foto_base64"] = foto_data.get("foto_base64")
+        _aplanar_foto(user)
 
         # Token simple (no persistido)
         token = generate_token()
@@ -216,6 +218,9 @@ class PersonalService:
         Returns:
             dict: Contiene personal_id, encoding_id y message
         """
+        # Validar el embedding antes de crear el personal, para no dejarlo sin codificación
+        EncodingFaceService.normalizar_embedding(data.embedding)
+
         # Separar datos del personal y del encoding
         personal_data = PersonalCreateDTO(
             dni=data.dni,
@@ -253,6 +258,7 @@ class PersonalService:
         # 3. Guardar foto de perfil si se proporcionó
         if data.foto_base64:
             await FotoPerfilRepository.create_or_update(personal_id, data.foto_base64)
+            get_cache_personal().invalidar(personal_id)
         
         return {
             "personal_id": personal_id,
@@ -266,4 +272,15 @@ class PersonalService:
 
     @staticmethod
     async def update_foto(personal_id: UUID, foto_base64: str):
-        return await FotoPerfilRepository.create_or_update(personal_id, foto_base64)
+        result = await FotoPerfilRepository.create_or_update(personal_id, foto_base64)
+        # La entrada con foto tiene el hash anterior
+        get_cache_personal().invalidar(personal_id)
+        return result
+
+    @staticmethod
+    def estado_caches() -> dict:
+        """Métricas de la caché de personal y de la de fotos de este proceso."""
+        return {
+            "personal": get_cache_personal().estadisticas(),
+            "fotos": get_cache_fotos().estadisticas(),
+        }
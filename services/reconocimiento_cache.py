@@ -0,0 +1,135 @@
+"""
+Caché de reconocimientos recientes por kiosco.
+
+El frontend llama a /asistencia/realtime en frames consecutivos de la misma persona.
+Si un kiosco envía un embedding casi idéntico (coseno >= REALTIME_DEBOUNCE_SIMILITUD)
+a uno que resolvió hace menos de REALTIME_DEBOUNCE_SEGUNDOS, se reutiliza la respuesta
+anterior sin volver a escanear la galería ni consultar la BD.
+
+Las entradas se descartan al vencer el TTL, cuando cambia la versión de la galería
+o cuando se registra una asistencia de la misma persona; los kioscos se desalojan
+por LRU.
+"""
+import time
+from collections import OrderedDict
+from typing import Optional
+
+import numpy as np
+
+from config.reconocimiento_config import (
+    REALTIME_DEBOUNCE_SEGUNDOS, REALTIME_DEBOUNCE_SIMILITUD,
+    REALTIME_DEBOUNCE_MAX_KIOSCOS, REALTIME_DEBOUNCE_MAX_POR_KIOSCO,
+)
+
+
+class _Entrada:
+    __slots__ = ("vector", "personal_id", "resultado", "version", "expira")
+
+    def __init__(self, vector: np.ndarray, personal_id: str, resultado: dict, version: int, expira: float):
+        self.vector = vector
+        self.personal_id = personal_id
+        self.resultado = resultado
+        self.version = version
+        self.expira = expira
+
+
+def _normalizar(embedding: list[float]) -> np.ndarray:
+    v = np.asarray(embedding, dtype=np.float32)
+    return v / (np.linalg.norm(v) or 1.0)
+
+
+class CacheReconocimiento:
+
+    def __init__(
+        self,
+        ttl: float = REALTIME_DEBOUNCE_SEGUNDOS,
+        similitud: float = REALTIME_DEBOUNCE_SIMILITUD,
+        max_kioscos: int = REALTIME_DEBOUNCE_MAX_KIOSCOS,
+        max_por_kiosco: int = REALTIME_DEBOUNCE_MAX_POR_KIOSCO,
+    ):
+        self.ttl = ttl
+        self.similitud = similitud
+        self.max_kioscos = max_kioscos
+        self.max_por_kiosco = max_por_kiosco
+        # clave del kiosco -> entradas, de la menos a la más reciente
+        self._kioscos: OrderedDict[tuple, list] = OrderedDict()
+        self.aciertos = 0
+        self.fallos = 0
+        self.desalojos = 0
+
+    @property
+    def habilitada(self) -> bool:
+        return self.ttl > 0
+
+    def buscar(self, clave: tuple, embedding: list[float], version: int) -> Optional[dict]:
+        """Respuesta previa del kiosco para un embedding casi idéntico, o None."""
+        if not self.habilitada:
+            return None
+
+        entradas = self._kioscos.get(clave)
+        if entradas:
+            ahora = time.monotonic()
+            entradas[:] = [e for e in entradas if e.expira > ahora and e.version == version]
+            q = _normalizar(embedding)
+            for i in range(len(entradas) - 1, -1, -1):
+                e = entradas[i]
+                if e.vector.shape == q.shape and float(e.vector @ q) >= self.similitud:
+                    entradas.append(entradas.pop(i))
+                    self._kioscos.move_to_end(clave)
+                    self.aciertos += 1
+                    return e.resultado
+            if not entradas:
+                del self._kioscos[clave]
+
+        self.fallos += 1
+        return None
+
+    def guardar(self, clave: tuple, embedding: list[float], version: int, personal_id, resultado: dict):
+        if not self.habilitada:
+            return
+        entradas = self._kioscos.setdefault(clave, [])
+        self._kioscos.move_to_end(clave)
+        entradas.append(_Entrada(_normalizar(embedding), str(personal_id), resultado, version, time.monotonic() + self.ttl))
+
+        if len(entradas) > self.max_por_kiosco:
+            del entradas[0]
+            self.desalojos += 1
+        while len(self._kioscos) > self.max_kioscos:
+            self._kioscos.popitem(last=False)
+            self.desalojos += 1
+
+    def invalidar_personal(self, personal_id):
+        """Descarta las respuestas de una persona (p. ej. tras registrar su asistencia)."""
+        personal_id = str(personal_id)
+        for clave in list(self._kioscos):
+            entradas = [e for e in self._kioscos[clave] if e.personal_id != personal_id]
+            if entradas:
+                self._kioscos[clave] = entradas
+            else:
+                del self._kioscos[clave]
+
+    def estadisticas(self) -> dict:
+        consultas = self.aciertos + self.fallos
+        return {
+            "habilitada": self.habilitada,
+            "ttl_segundos": self.ttl,
+            "similitud": self.similitud,
+            "kioscos": len(self._kioscos),
+            "entradas": sum(len(e) for e in self._kioscos.values()),
+            "aciertos": self.aciertos,
+            "fallos": self.fallos,
+            "desalojos": self.desalojos,
+            "tasa_aciertos": self.aciertos / consultas if consultas else 0.0,
+        }
+
+
+# Instancia única por proceso
+_cache_reconocimiento = None
+
+def get_cache_reconocimiento() -> CacheReconocimiento:
+    global _cache_reconocimiento
+
+    if _cache_reconocimiento is None:
+        _cache_reconocimiento = CacheReconocimiento()
+
+    return _cache_reconocimiento
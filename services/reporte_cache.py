@@ -0,0 +1,190 @@
+"""
+Caché de reportes mensuales calculados, por (mes, año, personal_id).
+
+Un reporte solo cambia si cambian las asistencias, ausencias o sobretiempos que
+tocan su mes, el personal o HORARIOS. Los triggers de migrations/007 incrementan
+la versión del mes (o la de 'personal') en cada escritura, venga de este proceso,
+de otro worker o de un script; cada consulta lee esas versiones (una consulta por
+clave primaria) y compara la huella de HORARIOS de este proceso. Si coinciden con
+las del reporte guardado, se sirve sin recalcular.
+
+Los meses cerrados (anteriores al actual en LOCAL_TIMEZONE) se guardan además en
+REPORTE_CACHE_DIR como JSON, con sus versiones, y se reutilizan tras un reinicio
+mientras sigan vigentes. En memoria se guardan hasta REPORTE_CACHE_MAX reportes
+(LRU). Pedidos simultáneos del mismo reporte esperan un único cálculo.
+"""
+import asyncio
+import calendar
+import hashlib
+import json
+import os
+from collections import OrderedDict
+from datetime import date, datetime
+from typing import Awaitable, Callable, List, Optional
+
+from config.cache_config import REPORTE_CACHE_MAX, REPORTE_CACHE_DIR
+from config.config_horarios import HORARIOS
+from config.timezone_config import LOCAL_TIMEZONE
+from dto.reporte_dto.reporte_mensual_item_dto import ReporteMensualItemDTO
+from repository.reporte_version_repository import ReporteVersionRepository
+
+
+def huella_horarios() -> str:
+    """Identifica la configuración actual de HORARIOS (cambia con update_horarios)."""
+    texto = json.dumps(
+        {turno: {k: v.isoformat() for k, v in cfg.items()} for turno, cfg in HORARIOS.items()},
+        sort_keys=True,
+    )
+    return hashlib.sha1(texto.encode()).hexdigest()[:16]
+
+
+class CacheReporteMensual:
+
+    def __init__(self, max_entradas: int = REPORTE_CACHE_MAX, directorio: str = REPORTE_CACHE_DIR):
+        self.max_entradas = max_entradas
+        self.directorio = directorio
+        # (anio, mes, personal_id) -> (versiones, huella de HORARIOS, reporte), de la menos a la más reciente
+        self._entradas: OrderedDict[tuple, tuple] = OrderedDict()
+        # Cálculos en curso, clave -> (versiones, futuro): los pedidos simultáneos esperan el mismo
+        self._en_curso: dict[tuple, tuple] = {}
+        self.aciertos = 0
+        self.aciertos_disco = 0
+        self.fallos = 0
+        self.desalojos = 0
+
+    @property
+    def habilitada(self) -> bool:
+        return self.max_entradas > 0
+
+    def _archivo(self, clave: tuple) -> str:
+        anio, mes, personal_id = clave
+        return os.path.join(self.directorio, f"{anio}-{mes:02d}_{personal_id or 'todos'}.json")
+
+    @staticmethod
+    def _cerrado(mes: int, anio: int) -> bool:
+        fin = date(anio, mes, calendar.monthrange(anio, mes)[1])
+        return fin < datetime.now(LOCAL_TIMEZONE).date()
+
+    async def obtener(
+        self,
+        mes: int,
+        anio: int,
+        personal_id,
+        generar: Callable[[], Awaitable[List[ReporteMensualItemDTO]]],
+    ) -> List[ReporteMensualItemDTO]:
+        """El reporte de (mes, anio, personal_id) desde la caché si sigue vigente; si no, generar()."""
+        if not self.habilitada:
+            return await generar()
+
+        clave = (anio, mes, str(personal_id) if personal_id else None)
+        claves_version = [f"{anio}-{mes:02d}", "personal"]
+        versiones_bd = await ReporteVersionRepository.obtener(claves_version)
+        vigente = ([versiones_bd[c] for c in claves_version], huella_horarios())
+
+        entrada = self._entradas.get(clave)
+        if entrada is not None and entrada[:2] == vigente:
+            self._entradas.move_to_end(clave)
+            self.aciertos += 1
+            return list(entrada[2])
+
+        cerrado = bool(self.directorio) and self._cerrado(mes, anio)
+        if cerrado:
+            reporte = await asyncio.to_thread(self._leer_disco, clave, vigente)
+            if reporte is not None:
+                self.aciertos_disco += 1
+                self._guardar(clave, vigente, reporte)
+                return list(reporte)
+
+        # Un solo cálculo por reporte y versión, aunque lleguen varios pedidos a la vez
+        en_curso = self._en_curso.get(clave)
+        if en_curso is not None and en_curso[0] == vigente:
+            self.aciertos += 1
+            return list(await asyncio.shield(en_curso[1]))
+
+        self.fallos += 1
+        futuro = asyncio.get_running_loop().create_future()
+        self._en_curso[clave] = (vigente, futuro)
+        try:
+            reporte = await generar()
+        except asyncio.CancelledError:
+            futuro.cancel()
+            raise
+        except Exception as e:
+            futuro.set_exception(e)
+            # Nadie más la espera: evita el aviso de excepción no recuperada
+            futuro.exception()
+            raise
+        finally:
+            if self._en_curso.get(clave, (None, None))[1] is futuro:
+                del self._en_curso[clave]
+
+        futuro.set_result(reporte)
+        # Las versiones se leyeron antes de calcular: si hubo una escritura entretanto,
+        # la próxima consulta verá otra versión y no usará este reporte
+        self._guardar(clave, vigente, reporte)
+        if cerrado:
+            await asyncio.to_thread(self._escribir_disco, clave, vigente, reporte)
+        return list(reporte)
+
+    def _guardar(self, clave: tuple, vigente: tuple, reporte: list):
+        self._entradas[clave] = (*vigente, list(reporte))
+        self._entradas.move_to_end(clave)
+        while len(self._entradas) > self.max_entradas:
+            self._entradas.popitem(last=False)
+            self.desalojos += 1
+
+    def _leer_disco(self, clave: tuple, vigente: tuple) -> Optional[list]:
+        try:
+            with open(self._archivo(clave), encoding="utf-8") as f:
+                datos = json.load(f)
+        except (OSError, ValueError):
+            return None
+        if (datos.get("versiones"), datos.get("horarios")) != vigente:
+            return None
+        return [ReporteMensualItemDTO.model_validate(item) for item in datos.get("reporte", [])]
+
+    def _escribir_disco(self, clave: tuple, vigente: tuple, reporte: list):
+        """Escritura atómica (archivo temporal + os.replace): varios workers pueden escribir a la vez."""
+        path = self._archivo(clave)
+        try:
+            os.makedirs(self.directorio, exist_ok=True)
+            temporal = f"{path}.{os.getpid()}.tmp"
+            with open(temporal, "w", encoding="utf-8") as f:
+                json.dump({
+                    "versiones": vigente[0],
+                    "horarios": vigente[1],
+                    "reporte": [item.model_dump(mode="json") for item in reporte],
+                }, f, ensure_ascii=False)
+            os.replace(temporal, path)
+        except OSError as e:
+            print(f"[REPORTES] No se pudo guardar {path}: {e}")
+
+    def limpiar(self):
+        """Vacía la memoria (p. ej. al cambiar HORARIOS); los archivos se descartan por su huella."""
+        self._entradas.clear()
+
+    def estadisticas(self) -> dict:
+        consultas = self.aciertos + self.aciertos_disco + self.fallos
+        return {
+            "habilitada": self.habilitada,
+            "max_entradas": self.max_entradas,
+            "directorio": self.directorio or None,
+            "entradas": len(self._entradas),
+            "aciertos": self.aciertos,
+            "aciertos_disco": self.aciertos_disco,
+            "fallos": self.fallos,
+            "desalojos": self.desalojos,
+            "tasa_aciertos": (self.aciertos + self.aciertos_disco) / consultas if consultas else 0.0,
+        }
+
+
+# Instancia única por proceso
+_cache_reporte = None
+
+def get_cache_reporte() -> CacheReporteMensual:
+    global _cache_reporte
+
+    if _cache_reporte is None:
+        _cache_reporte = CacheReporteMensual()
+
+    return _cache_reporte
@@ -0,0 +1,376 @@
+"""
+Cálculo del reporte de asistencia sobre columnas (numpy) en lugar de recorrer las
+asistencias de todo el mes una vez por persona.
+
+Las marcaciones se convierten una sola vez a arreglos paralelos (índice de la
+persona, índice del día, código de tipo, código de estado y marca de tiempo en
+microsegundos) y los totales salen de operaciones agrupadas: bincount para los
+conteos y sumas por persona y una grilla persona × día para la asistencia.
+
+Las ausencias aprobadas de cada persona se fusionan en intervalos de días
+ordenados y disjuntos; los días justificados y las faltas se obtienen restando
+sumas acumuladas (días laborables, días laborables sin marcar) en los extremos de
+cada intervalo. Los permisos por horas (hora_inicio/hora_fin) no justifican el
+día: justifican la tardanza o salida anticipada del turno que cubren.
+
+Las horas de cada persona se suman en el mismo orden que en el cálculo registro
+por registro (por día, en el orden en que aparece cada día en las asistencias,
+mañana y luego tarde) y bincount acumula en el orden de entrada, así que los
+redondeos coinciden.
+
+calcular_reporte_resumen hace lo mismo desde asistencia_resumen_diario (una fila
+por persona y día, migrations/006) en lugar de las marcaciones: los reportes de
+varios meses leen y convierten una fila por día en vez de cuatro marcas.
+"""
+from collections import defaultdict
+from datetime import date, datetime, time, timedelta, timezone
+from typing import List, NamedTuple, Optional
+
+import numpy as np
+
+from config.config_horarios import HORARIOS
+from dto.reporte_dto.reporte_mensual_item_dto import ReporteMensualItemDTO
+
+# Códigos de tipo_registro (índice en la grilla de horas) y de estado
+TIPOS = {"ENTRADA_M": 0, "SALIDA_M": 1, "ENTRADA_T": 2, "SALIDA_T": 3}
+TARDE, SALIDA_ANTICIPADA = 1, 2
+ESTADOS = {"TARDE": TARDE, "SALIDA_ANTICIPADA": SALIDA_ANTICIPADA}
+
+_EPOCA = datetime(1970, 1, 1, tzinfo=timezone.utc)
+_MICROSEGUNDO = timedelta(microseconds=1)
+
+
+def _microsegundos(marca_tiempo: str) -> int:
+    """Marca de tiempo ISO en microsegundos desde 1970 (entero, sin perder precisión)."""
+    t = datetime.fromisoformat(marca_tiempo)  # acepta el sufijo Z desde Python 3.11
+    try:
+        return (t - _EPOCA) // _MICROSEGUNDO
+    except TypeError:
+        # Sin zona horaria: solo importan las diferencias entre marcas del mismo día
+        return (t.replace(tzinfo=timezone.utc) - _EPOCA) // _MICROSEGUNDO
+
+
+class ColumnasAsistencia(NamedTuple):
+    personal: np.ndarray   # índice de la persona en la lista del reporte
+    dia: np.ndarray        # días desde el inicio del periodo
+    tipo: np.ndarray       # código de TIPOS, -1 si es otro
+    estado: np.ndarray     # código de ESTADOS, 0 si es otro
+    tiempo: np.ndarray     # marca_tiempo en microsegundos desde 1970 (0 si el tipo es otro)
+
+
+def columnas_asistencias(asistencias: list[dict], indice_personal: dict[str, int], fecha_inicio: date, dias: int) -> ColumnasAsistencia:
+    """Convierte las asistencias (en el orden recibido) a columnas; descarta las de otras personas o fechas."""
+    personal = np.array([indice_personal.get(str(a['personal_id']), -1) for a in asistencias], dtype=np.int64)
+    fechas = [a['fecha'] for a in asistencias]
+    # Pocas fechas distintas: cada una se convierte una sola vez
+    dias_por_fecha = {f: (date.fromisoformat(f) - fecha_inicio).days for f in set(fechas)}
+    dia = np.array([dias_por_fecha[f] for f in fechas], dtype=np.int64)
+    validas = np.flatnonzero((personal >= 0) & (dia >= 0) & (dia < dias))
+    if len(validas) < len(asistencias):
+        asistencias = [asistencias[i] for i in validas.tolist()]
+
+    tipos = [TIPOS.get(a['tipo_registro'], -1) for a in asistencias]
+    estados = [ESTADOS.get(a.get('estado', ''), 0) for a in asistencias]
+    tiempos = [_microsegundos(a['marca_tiempo']) if t >= 0 else 0 for a, t in zip(asistencias, tipos)]
+    return ColumnasAsistencia(
+        personal[validas],
+        dia[validas],
+        np.array(tipos, dtype=np.int8),
+        np.array(estados, dtype=np.int8),
+        np.array(tiempos, dtype=np.int64),
+    )
+
+
+def _horas_trabajadas(c: ColumnasAsistencia, personas: int, dias: int) -> np.ndarray:
+    """Horas de mañana (ENTRADA_M a SALIDA_M) más tarde (ENTRADA_T a SALIDA_T) por persona."""
+    if not len(c.personal):
+        return np.zeros(personas)
+
+    # Primera marcación de cada (persona, día, tipo) en el orden recibido
+    conocido = c.tipo >= 0
+    clave = ((c.personal * dias + c.dia) * 4 + c.tipo)[conocido]
+    claves, primeras = np.unique(clave, return_index=True)
+    presente = np.zeros(personas * dias * 4, dtype=bool)
+    tiempo = np.zeros(personas * dias * 4, dtype=np.int64)
+    presente[claves] = True
+    tiempo[claves] = c.tiempo[conocido][primeras]
+    presente = presente.reshape(-1, 4)
+    tiempo = tiempo.reshape(-1, 4)
+
+    # Igual que timedelta.total_seconds() / 3600
+    manana = np.where(presente[:, 0] & presente[:, 1], (tiempo[:, 1] - tiempo[:, 0]) / 1e6 / 3600, 0.0)
+    tarde = np.where(presente[:, 2] & presente[:, 3], (tiempo[:, 3] - tiempo[:, 2]) / 1e6 / 3600, 0.0)
+
+    # Días de cada persona en el orden de su primera marcación, mañana y luego tarde
+    persona_dia, primeras = np.unique(c.personal * dias + c.dia, return_index=True)
+    persona_dia = persona_dia[np.argsort(primeras, kind="stable")]
+    horas = np.empty(2 * len(persona_dia))
+    horas[0::2] = manana[persona_dia]
+    horas[1::2] = tarde[persona_dia]
+    return np.bincount(np.repeat(persona_dia // dias, 2), weights=horas, minlength=personas)
+
+
+def _hora(valor) -> Optional[time]:
+    if not valor:
+        return None
+    return valor if isinstance(valor, time) else time.fromisoformat(valor)
+
+
+def fusionar_intervalos(intervalos: list[tuple[int, int]]) -> list[tuple[int, int]]:
+    """Ordena y une intervalos de días (inclusivos) que se superponen o son contiguos."""
+    fusionados = []
+    for inicio, fin in sorted(intervalos):
+        if fusionados and inicio <= fusionados[-1][1] + 1:
+            if fin > fusionados[-1][1]:
+                fusionados[-1] = (fusionados[-1][0], fin)
+        else:
+            fusionados.append((inicio, fin))
+    return fusionados
+
+
+class AusenciasPeriodo(NamedTuple):
+    # Días completos justificados: intervalos fusionados por persona (días desde el
+    # inicio del periodo, inclusivos), ordenados por persona e inicio
+    personal: np.ndarray
+    inicio: np.ndarray
+    fin: np.ndarray
+    # Permisos por horas: (persona, día) -> ventanas (hora_inicio, hora_fin)
+    parciales: dict[tuple[int, int], list[tuple[time, time]]]
+
+
+def ausencias_periodo(ausencias: list[dict], indice_personal: dict[str, int], fecha_inicio: date, dias: int) -> AusenciasPeriodo:
+    """
+    Separa las ausencias aprobadas en días completos y permisos por horas. Una
+    ausencia con hora_inicio u hora_fin es un permiso por horas en cada día de su
+    rango, salvo que cubra toda la jornada (de la entrada de la mañana a la salida
+    de la tarde según HORARIOS): entonces cuenta como día completo. Sin hora_inicio
+    la ventana empieza a las 00:00 y sin hora_fin termina a las 23:59:59.
+    """
+    jornada_inicio = HORARIOS["ENTRADA_M"]["entrada"]
+    jornada_fin = HORARIOS["SALIDA_T"]["a_tiempo"]
+
+    completos: dict[int, list] = defaultdict(list)
+    parciales: dict[tuple[int, int], list] = defaultdict(list)
+    for aus in ausencias:
+        p = indice_personal.get(str(aus['personal_id']))
+        if p is None:
+            continue
+        inicio = max((date.fromisoformat(aus['fecha_inicio']) - fecha_inicio).days, 0)
+        fin = min((date.fromisoformat(aus['fecha_fin']) - fecha_inicio).days, dias - 1)
+        if inicio > fin:
+            continue
+        desde, hasta = _hora(aus.get('hora_inicio')), _hora(aus.get('hora_fin'))
+        if desde is None and hasta is None:
+            completos[p].append((inicio, fin))
+            continue
+        desde, hasta = desde or time.min, hasta or time.max
+        if desde <= jornada_inicio and hasta >= jornada_fin:
+            completos[p].append((inicio, fin))
+        else:
+            for d in range(inicio, fin + 1):
+                parciales[(p, d)].append((desde, hasta))
+
+    personal, inicios, fines = [], [], []
+    for p in sorted(completos):
+        for inicio, fin in fusionar_intervalos(completos[p]):
+            personal.append(p)
+            inicios.append(inicio)
+            fines.append(fin)
+    return AusenciasPeriodo(
+        np.array(personal, dtype=np.int64),
+        np.array(inicios, dtype=np.int64),
+        np.array(fines, dtype=np.int64),
+        dict(parciales),
+    )
+
+
+# Hora programada que debe cubrir un permiso por horas para justificar la marcación:
+# el inicio del turno para una tardanza, el fin del turno para una salida anticipada
+_HORA_PROGRAMADA = {
+    "ENTRADA_M": ("ENTRADA_M", "entrada"),
+    "SALIDA_M": ("SALIDA_M", "a_tiempo"),
+    "ENTRADA_T": ("ENTRADA_T", "entrada"),
+    "SALIDA_T": ("SALIDA_T", "a_tiempo"),
+}
+
+
+def _marcas_justificadas(c: ColumnasAsistencia, parciales: dict) -> np.ndarray:
+    """Tardanzas y salidas anticipadas cuyo horario programado cae dentro de un permiso por horas."""
+    justificada = np.zeros(len(c.personal), dtype=bool)
+    if not parciales:
+        return justificada
+
+    hora_programada = {
+        TIPOS[tipo]: HORARIOS.get(turno, {}).get(campo) for tipo, (turno, campo) in _HORA_PROGRAMADA.items()
+    }
+    for i in np.flatnonzero(c.estado != 0).tolist():
+        ventanas = parciales.get((int(c.personal[i]), int(c.dia[i])))
+        hora = hora_programada.get(int(c.tipo[i]))
+        if ventanas and hora and any(desde <= hora <= hasta for desde, hasta in ventanas):
+            justificada[i] = True
+    return justificada
+
+
+# Banderas del resumen diario: (columna, tipo_registro del turno, estado)
+_BANDERAS_RESUMEN = [
+    ("tardanza_m", "ENTRADA_M", TARDE),
+    ("salida_anticipada_m", "SALIDA_M", SALIDA_ANTICIPADA),
+    ("tardanza_t", "ENTRADA_T", TARDE),
+    ("salida_anticipada_t", "SALIDA_T", SALIDA_ANTICIPADA),
+]
+
+
+def columnas_resumen(resumenes: list[dict], indice_personal: dict[str, int], fecha_inicio: date, dias: int):
+    """
+    Columnas equivalentes a las de las marcaciones a partir del resumen diario
+    (asistencia_resumen_diario): una entrada por día con marcas más una por cada
+    tardanza o salida anticipada, con el tipo de su turno. Retorna también las horas
+    trabajadas de cada entrada (minutos de mañana y tarde del día, 0 en las banderas).
+    """
+    personal, dia, tipo, estado, horas = [], [], [], [], []
+    for r in resumenes:
+        p = indice_personal.get(str(r['personal_id']))
+        d = (date.fromisoformat(r['fecha']) - fecha_inicio).days
+        if p is None or not 0 <= d < dias:
+            continue
+        personal.append(p)
+        dia.append(d)
+        tipo.append(-1)
+        estado.append(0)
+        horas.append((float(r['minutos_manana']) + float(r['minutos_tarde'])) / 60)
+        for columna, tipo_registro, codigo in _BANDERAS_RESUMEN:
+            if r.get(columna):
+                personal.append(p)
+                dia.append(d)
+                tipo.append(TIPOS[tipo_registro])
+                estado.append(codigo)
+                horas.append(0.0)
+
+    personal = np.array(personal, dtype=np.int64)
+    c = ColumnasAsistencia(
+        personal,
+        np.array(dia, dtype=np.int64),
+        np.array(tipo, dtype=np.int8),
+        np.array(estado, dtype=np.int8),
+        np.zeros(len(personal), dtype=np.int64),
+    )
+    return c, np.array(horas)
+
+
+def calcular_reporte(
+    lista_personal: list[dict],
+    asistencias: list[dict],
+    ausencias: list[dict],
+    sobretiempos: list[dict],
+    fecha_inicio: date,
+    fecha_fin: date,
+) -> List[ReporteMensualItemDTO]:
+    """
+    Reporte de asistencia de `lista_personal` entre fecha_inicio y fecha_fin
+    (inclusive) a partir de las marcaciones. `ausencias` y `sobretiempos` son
+    solicitudes ya aprobadas.
+    """
+    dias = (fecha_fin - fecha_inicio).days + 1
+    indice_personal = {str(p['id']): i for i, p in enumerate(lista_personal)}
+    c = columnas_asistencias(asistencias, indice_personal, fecha_inicio, dias)
+    horas_trabajadas = _horas_trabajadas(c, len(lista_personal), dias)
+    return _reporte(lista_personal, indice_personal, c, horas_trabajadas, ausencias, sobretiempos, fecha_inicio, fecha_fin)
+
+
+def calcular_reporte_resumen(
+    lista_personal: list[dict],
+    resumenes: list[dict],
+    ausencias: list[dict],
+    sobretiempos: list[dict],
+    fecha_inicio: date,
+    fecha_fin: date,
+) -> List[ReporteMensualItemDTO]:
+    """Mismo reporte que calcular_reporte, leyendo una fila del resumen diario por persona y día."""
+    dias = (fecha_fin - fecha_inicio).days + 1
+    indice_personal = {str(p['id']): i for i, p in enumerate(lista_personal)}
+    c, horas = columnas_resumen(resumenes, indice_personal, fecha_inicio, dias)
+    horas_trabajadas = np.bincount(c.personal, weights=horas, minlength=len(lista_personal))
+    return _reporte(lista_personal, indice_personal, c, horas_trabajadas, ausencias, sobretiempos, fecha_inicio, fecha_fin)
+
+
+def _reporte(
+    lista_personal: list[dict],
+    indice_personal: dict[str, int],
+    c: ColumnasAsistencia,
+    horas_trabajadas: np.ndarray,
+    ausencias: list[dict],
+    sobretiempos: list[dict],
+    fecha_inicio: date,
+    fecha_fin: date,
+) -> List[ReporteMensualItemDTO]:
+    personas = len(lista_personal)
+    dias = (fecha_fin - fecha_inicio).days + 1
+
+    # Días laborables (Lunes a Viernes) del periodo y sus sumas acumuladas
+    laborable = (fecha_inicio.weekday() + np.arange(dias)) % 7 < 5
+    laborables_acumulados = np.concatenate(([0], np.cumsum(laborable)))
+
+    a = ausencias_periodo(ausencias, indice_personal, fecha_inicio, dias)
+
+    # Tardanzas y salidas anticipadas, sin las cubiertas por un permiso por horas
+    justificada = _marcas_justificadas(c, a.parciales)
+    tardanzas = np.bincount(c.personal[(c.estado == TARDE) & ~justificada], minlength=personas)
+    salidas_anticipadas = np.bincount(c.personal[(c.estado == SALIDA_ANTICIPADA) & ~justificada], minlength=personas)
+    asistido = np.zeros((personas, dias), dtype=bool)
+    asistido[c.personal, c.dia] = True
+
+    # Días laborables justificados: los de la unión de intervalos de cada persona
+    justificadas = np.bincount(
+        a.personal, weights=laborables_acumulados[a.fin + 1] - laborables_acumulados[a.inicio], minlength=personas
+    ).astype(np.int64)
+
+    # Faltas: días laborables sin marcación, menos los que caen en un intervalo justificado
+    sin_marcar = np.zeros((personas, dias + 1), dtype=np.int64)
+    np.cumsum(laborable & ~asistido, axis=1, out=sin_marcar[:, 1:])
+    faltas = sin_marcar[:, dias] - np.bincount(
+        a.personal, weights=sin_marcar[a.personal, a.fin + 1] - sin_marcar[a.personal, a.inicio], minlength=personas
+    ).astype(np.int64)
+
+    # Sobretiempo aprobado con fecha de trabajo en el periodo, sumado en el orden recibido
+    s_personal, s_horas = [], []
+    for st in sobretiempos:
+        p = indice_personal.get(str(st['personal_id']))
+        if p is not None and fecha_inicio <= date.fromisoformat(st['fecha_trabajo']) <= fecha_fin:
+            s_personal.append(p)
+            s_horas.append(float(st['horas_solicitadas']))
+    horas_sobretiempo = np.bincount(np.array(s_personal, dtype=np.int64), weights=np.array(s_horas), minlength=personas)
+
+    dias_laborables = int(laborable.sum())
+    dias_asistidos = asistido.sum(axis=1)
+
+    reporte = []
+    for i, p in enumerate(lista_personal):
+        horas = float(horas_trabajadas[i])
+        sobretiempo = float(horas_sobretiempo[i])
+
+        # Observaciones
+        obs = []
+        if tardanzas[i] > 2:
+            obs.append("Tardanza reiterada")
+        if justificadas[i] > 0:
+            obs.append("Ausencia justificada")
+        if sobretiempo > 5:
+            obs.append("Sobretiempo frecuente")
+
+        reporte.append(ReporteMensualItemDTO(
+            numero=i + 1,
+            dni=p.get('dni', ''),
+            apellidos_y_nombres=f"{p.get('apellido_paterno', '')} {p.get('apellido_materno', '')} {p.get('nombre', '')}".strip(),
+            dias_laborables=dias_laborables,
+            dias_asistidos=int(dias_asistidos[i]),
+            tardanzas=int(tardanzas[i]),
+            faltas=int(faltas[i]),
+            ausencias_justificadas=int(justificadas[i]),
+            salidas_anticipadas=int(salidas_anticipadas[i]),
+            horas_sobretiempo=sobretiempo,
+            horas_trabajadas=round(horas, 2),
+            total_horas=round(horas + sobretiempo, 2),
+            observaciones=", ".join(obs),
+        ))
+
+    return reporte
@@ -1,178 +1,91 @@
-from datetime import date, timedelta, datetime
+import asyncio
+from datetime import date, timedelta
 from uuid import UUID
 import calendar
-from typing import List
+from typing import Awaitable, Callable, List, Optional
 
 from repository.personal_repository import PersonalRepository
-from repository.asistencia_repository import AsistenciaRepository
+from repository.asistencia_resumen_repository import AsistenciaResumenRepository
 from repository.solicitudes_ausencias_repository import SolicitudesAusenciasRepository
 from repository.solicitudes_sobretiempo_repository import SolicitudesSobretiempoRepository
+from services.personal_cache import get_cache_personal
+from services.reporte_cache import get_cache_reporte
+from services.reporte_columnar import calcular_reporte_resumen
 from dto.reporte_dto.reporte_mensual_item_dto import ReporteMensualItemDTO
 
 class ReporteService:
 
     @staticmethod
     async def generar_reporte_mensual(mes: int, anio: int, personal_id: UUID = None) -> List[ReporteMensualItemDTO]:
-        
-        # 1. Obtener lista de personal
-        if personal_id:
-            personal = await PersonalRepository.find_by_id(personal_id)
-            lista_personal = [personal] if personal else []
-        else:
-            lista_personal = await PersonalRepository.find_all()
-
-        reporte = []
-        
         # Fechas inicio y fin del mes
         fecha_inicio = date(anio, mes, 1)
         _, last_day = calendar.monthrange(anio, mes)
         fecha_fin = date(anio, mes, last_day)
+        # Desde la caché mientras no cambien los datos del mes ni HORARIOS
+        return await get_cache_reporte().obtener(
+            mes, anio, personal_id,
+            lambda: ReporteService.generar_reporte_periodo(fecha_inicio, fecha_fin, personal_id),
+        )
 
-        # Calcular días laborables (Lunes a Viernes)
-        dias_laborables_mes = 0
-        current = fecha_inicio
-        while current <= fecha_fin:
-            if current.weekday() < 5: # 0-4 son Lun-Vie
-                dias_laborables_mes += 1
-            current += timedelta(days=1)
-
-        # Obtener todas las asistencias del mes (optimizacion: podria hacerse una sola query y filtrar en codigo, 
-        # pero por ahora iteramos o consultamos por rango si el repo lo permite.
-        # El repo permite obtener por rango y opcional personal_id.
-        # Si personal_id es None, trae de todos? Revisemos AsistenciaRepository.obtener_registros_por_rango
-        # Si, parece que si.
-        
-        asistencias_mes = await AsistenciaRepository.obtener_registros_por_rango(fecha_inicio, fecha_fin, str(personal_id) if personal_id else None)
-        
-        # Obtener solicitudes (traemos todas y filtramos, o mejor, iteramos por persona)
-        # Para ser eficientes con la base de datos, lo ideal seria traer todo el rango, pero los repos de solicitudes 
-        # actualmente no tienen metodo por rango. Usaremos find_by_personal dentro del loop o find_all y filtramos.
-        # Como no voy a modificar los repos de solicitudes ahora, usare find_all o find_by_personal.
-        # Para evitar N+1 queries masivos, si son muchos empleados, mejor find_all y filtrar en memoria.
-        # Asumiremos trafico moderado y usare find_by_personal por simplicidad y claridad, 
-        # ya que find_all de solicitudes podria crecer mucho historicamente.
-        # OJO: find_by_personal trae TODO el historial. Si es muy grande, sera lento.
-        # TODO: Agregar filtro de fecha a los repos de solicitudes en el futuro.
-
-        numero_correlativo = 1
-
-        for p in lista_personal:
-            p_id = str(p['id'])
-            
-            # Filtrar asistencias de esta persona
-            asistencias_p = [a for a in asistencias_mes if a['personal_id'] == p_id]
-            
-            # Contadores
-            dias_asistidos = set()
-            tardanzas = 0
-            salidas_anticipadas = 0
-            horas_trabajadas = 0.0
-            
-            # Agrupar por fecha para calcular horas
-            by_date = {}
-            for a in asistencias_p:
-                d_fecha_str = a['fecha']
-                d_fecha = date.fromisoformat(d_fecha_str)
-                dias_asistidos.add(d_fecha)
-                
-                if d_fecha_str not in by_date: by_date[d_fecha_str] = []
-                by_date[d_fecha_str].append(a)
-                
-                estado = a.get('estado', '')
-                if estado == 'TARDE':
-                    tardanzas += 1
-                elif estado == 'SALIDA_ANTICIPADA':
-                    salidas_anticipadas += 1
-            
-            # Calcular horas trabajadas por día
-            for d_str, regs in by_date.items():
-                # Tipos: 'ENTRADA_M' | 'SALIDA_M' | 'ENTRADA_T' | 'SALIDA_T'
-                e_m = next((r for r in regs if r['tipo_registro'] == 'ENTRADA_M'), None)
-                s_m = next((r for r in regs if r['tipo_registro'] == 'SALIDA_M'), None)
-                e_t = next((r for r in regs if r['tipo_registro'] == 'ENTRADA_T'), None)
-                s_t = next((r for r in regs if r['tipo_registro'] == 'SALIDA_T'), None)
-                
-                if e_m and s_m:
-                    t1 = datetime.fromisoformat(e_m['marca_tiempo'].replace('Z', '+00:00'))
-                    t2 = datetime.fromisoformat(s_m['marca_tiempo'].replace('Z', '+00:00'))
-                    horas_trabajadas += (t2 - t1).total_seconds() / 3600
-                if e_t and s_t:
-                    t1 = datetime.fromisoformat(e_t['marca_tiempo'].replace('Z', '+00:00'))
-                    t2 = datetime.fromisoformat(s_t['marca_tiempo'].replace('Z', '+00:00'))
-                    horas_trabajadas += (t2 - t1).total_seconds() / 3600
+    @staticmethod
+    async def generar_reporte_periodo(
+        fecha_inicio: date,
+        fecha_fin: date,
+        personal_id: UUID = None,
+        progreso: Optional[Callable[[float, str], Awaitable[None]]] = None,
+    ) -> List[ReporteMensualItemDTO]:
+        """
+        Mismo reporte que el mensual para un rango de fechas cualquiera (p. ej. varios
+        meses). Con `progreso` (trabajos en segundo plano) el resumen diario se lee mes
+        por mes, una consulta a la vez, y se informa el avance (fracción 0-1 y etapa).
+        """
+        async def aviso(fraccion: float, etapa: str):
+            if progreso is not None:
+                await progreso(fraccion, etapa)
 
-            # Solicitudes Ausencias
-            ausencias = await SolicitudesAusenciasRepository.find_by_personal(p_id)
-            dias_ausencia_justificada = 0
-            
-            for aus in ausencias:
-                if aus['estado_solicitud'] == 'APROBADA':
-                    ai = date.fromisoformat(aus['fecha_inicio'])
-                    af = date.fromisoformat(aus['fecha_fin'])
-                    rango_inicio = max(ai, fecha_inicio)
-                    rango_fin = min(af, fecha_fin)
-                    if rango_inicio <= rango_fin:
-                        curr = rango_inicio
-                        while curr <= rango_fin:
-                            if curr.weekday() < 5:
-                                dias_ausencia_justificada += 1
-                            curr += timedelta(days=1)
+        # 1. Obtener lista de personal
+        if personal_id:
+            personal = await get_cache_personal().obtener(personal_id)
+            lista_personal = [personal] if personal else []
+        else:
+            lista_personal = await PersonalRepository.find_all()
+        await aviso(0.05, "Personal")
 
-            # Solicitudes Sobretiempo
-            sobretiempos = await SolicitudesSobretiempoRepository.find_by_personal(p_id)
-            horas_sobretiempo = 0.0
-            for st in sobretiempos:
-                if st['estado_solicitud'] == 'APROBADA':
-                    fecha_st = date.fromisoformat(st['fecha_trabajo'])
-                    if fecha_inicio <= fecha_st <= fecha_fin:
-                        horas_sobretiempo += float(st['horas_solicitadas'])
+        # 2. Resumen diario de asistencia (una fila por persona y día) y solicitudes
+        # aprobadas del periodo: una consulta por tabla para todo el personal
+        filtro_personal = str(personal_id) if personal_id else None
+        if progreso is None:
+            consulta_resumen = AsistenciaResumenRepository.obtener_por_rango(fecha_inicio, fecha_fin, filtro_personal)
+        else:
+            consulta_resumen = ReporteService._resumen_por_mes(fecha_inicio, fecha_fin, filtro_personal, aviso)
+        resumenes, ausencias, sobretiempos = await asyncio.gather(
+            consulta_resumen,
+            SolicitudesAusenciasRepository.find_aprobadas_por_rango(fecha_inicio, fecha_fin, filtro_personal),
+            SolicitudesSobretiempoRepository.find_aprobadas_por_rango(fecha_inicio, fecha_fin, filtro_personal),
+        )
 
-            # Calculo de Faltas
-            dias_falta = 0
-            curr = fecha_inicio
-            while curr <= fecha_fin:
-                if curr.weekday() < 5: # Es laborable
-                    if curr not in dias_asistidos:
-                        justificado = False
-                        for aus in ausencias:
-                            if aus['estado_solicitud'] == 'APROBADA':
-                                ai = date.fromisoformat(aus['fecha_inicio'])
-                                af = date.fromisoformat(aus['fecha_fin'])
-                                if ai <= curr <= af:
-                                    justificado = True
-                                    break
-                        if not justificado:
-                            dias_falta += 1
-                curr += timedelta(days=1)
+        # 3. Totales por persona (cálculo por columnas, CPU: fuera del event loop)
+        await aviso(0.9, "Calculando")
+        return await asyncio.to_thread(
+            calcular_reporte_resumen, lista_personal, resumenes, ausencias, sobretiempos, fecha_inicio, fecha_fin
+        )
 
-            # Observaciones
-            obs = []
-            if tardanzas > 2:
-                obs.append("Tardanza reiterada")
-            if dias_ausencia_justificada > 0:
-                obs.append("Ausencia justificada")
-            if horas_sobretiempo > 5:
-                obs.append("Sobretiempo frecuente")
-            
-            observaciones_str = ", ".join(obs)
+    @staticmethod
+    async def _resumen_por_mes(fecha_inicio: date, fecha_fin: date, personal_id: Optional[str], aviso) -> list:
+        """Resumen diario del periodo en tramos de un mes calendario, en orden de fecha."""
+        tramos = []
+        inicio = fecha_inicio
+        while inicio <= fecha_fin:
+            fin = min(date(inicio.year, inicio.month, calendar.monthrange(inicio.year, inicio.month)[1]), fecha_fin)
+            tramos.append((inicio, fin))
+            inicio = fin + timedelta(days=1)
 
-            item = ReporteMensualItemDTO(
-                numero=numero_correlativo,
-                dni=p.get('dni', ''),
-                apellidos_y_nombres=f"{p.get('apellido_paterno', '')} {p.get('apellido_materno', '')} {p.get('nombre', '')}".strip(),
-                dias_laborables=dias_laborables_mes,
-                dias_asistidos=len(dias_asistidos),
-                tardanzas=tardanzas,
-                faltas=dias_falta,
-                ausencias_justificadas=dias_ausencia_justificada,
-                salidas_anticipadas=salidas_anticipadas,
-                horas_sobretiempo=horas_sobretiempo,
-                horas_trabajadas=round(horas_trabajadas, 2),
-                total_horas=round(horas_trabajadas + horas_sobretiempo, 2),
-                observaciones=observaciones_str
-            )
-            
-            reporte.append(item)
-            numero_correlativo += 1
+        resumenes = []
+        for i, (inicio, fin) in enumerate(tramos, start=1):
+            resumenes.extend(await AsistenciaResumenRepository.obtener_por_rango(inicio, fin, personal_id))
+            await aviso(0.05 + 0.85 * i / len(tramos), f"Asistencias: {i} de {len(tramos)} meses")
+        return resumenes
 
-        return reporte
+    @staticmethod
+    def estado_cache() -> dict:
+        return get_cache_reporte().estadisticas()
@@ -0,0 +1,303 @@
+"""
+Reportes en segundo plano: POST de la especificación, consulta del estado y del
+avance, y descarga del resultado cuando termina.
+
+Los trabajos se encolan en una asyncio.Queue de este proceso y los ejecutan
+REPORTE_TRABAJOS_WORKERS tareas a la vez. Antes de empezar, cada trabajo reserva
+su memoria estimada (personas × días × REPORTE_TRABAJOS_BYTES_POR_DIA) de un total
+de REPORTE_TRABAJOS_MEMORIA_MB: si no hay suficiente espera a que terminen otros,
+y si no cabe ni con todo libre termina con error.
+
+El estado de cada trabajo se escribe en REPORTE_TRABAJOS_DIR/<id>.json y el
+resultado en <id>.resultado.json, así que cualquier worker que comparta el
+directorio puede responder la consulta y la descarga. Los archivos sin
+modificar por más de REPORTE_TRABAJOS_EXPIRA_SEGUNDOS se eliminan: una tarea los
+busca cada REPORTE_TRABAJOS_LIMPIEZA_SEGUNDOS (y tras cada trabajo), y la consulta
+elimina el que encuentra vencido.
+"""
+import asyncio
+import calendar
+import json
+import os
+import threading
+import time
+import uuid
+from datetime import date, datetime
+from typing import Optional
+
+from config.reportes_config import (
+    REPORTE_TRABAJOS_WORKERS, REPORTE_TRABAJOS_MAX_PENDIENTES, REPORTE_TRABAJOS_MEMORIA_MB,
+    REPORTE_TRABAJOS_BYTES_POR_DIA, REPORTE_TRABAJOS_DIR, REPORTE_TRABAJOS_EXPIRA_SEGUNDOS,
+    REPORTE_TRABAJOS_LIMPIEZA_SEGUNDOS,
+)
+from config.timezone_config import LOCAL_TIMEZONE
+from repository.personal_repository import PersonalRepository
+from services.reporte_service import ReporteService
+
+PENDIENTE, EN_PROCESO, COMPLETADO, ERROR = "PENDIENTE", "EN_PROCESO", "COMPLETADO", "ERROR"
+
+
+class ColaLlena(Exception):
+    pass
+
+
+class ColaReportes:
+
+    def __init__(
+        self,
+        workers: int = REPORTE_TRABAJOS_WORKERS,
+        max_pendientes: int = REPORTE_TRABAJOS_MAX_PENDIENTES,
+        memoria_mb: float = REPORTE_TRABAJOS_MEMORIA_MB,
+        directorio: str = REPORTE_TRABAJOS_DIR,
+        expira_segundos: float = REPORTE_TRABAJOS_EXPIRA_SEGUNDOS,
+        limpieza_segundos: float = REPORTE_TRABAJOS_LIMPIEZA_SEGUNDOS,
+    ):
+        self.workers = max(workers, 1)
+        self.max_pendientes = max_pendientes
+        self.memoria_mb = memoria_mb
+        self.directorio = directorio
+        self.expira_segundos = expira_segundos
+        self.limpieza_segundos = limpieza_segundos
+        # id -> estado del trabajo (el mismo dict que se escribe en disco)
+        self._trabajos: dict[str, dict] = {}
+        # Se crean con el primer trabajo, dentro del event loop
+        self._cola: Optional[asyncio.Queue] = None
+        self._tareas: list[asyncio.Task] = []
+        self._limpieza: Optional[asyncio.Task] = None
+        self._memoria: Optional[asyncio.Condition] = None
+        self._memoria_en_uso = 0.0
+        # Serializa las escrituras de estado: la última escrita es la más reciente
+        self._escritura = threading.Lock()
+        self.completados = 0
+        self.errores = 0
+
+    def _archivo(self, trabajo_id: str) -> str:
+        return os.path.join(self.directorio, f"{trabajo_id}.json")
+
+    def ruta_resultado(self, trabajo_id: str) -> str:
+        return os.path.join(self.directorio, f"{trabajo_id}.resultado.json")
+
+    def iniciar(self):
+        """Arranca los workers y la limpieza periódica (al iniciar la app)."""
+        self._asegurar_workers()
+
+    def _asegurar_workers(self):
+        if self._cola is None:
+            self._cola = asyncio.Queue()
+            self._memoria = asyncio.Condition()
+        self._tareas = [t for t in self._tareas if not t.done()]
+        while len(self._tareas) < self.workers:
+            self._tareas.append(asyncio.create_task(self._worker()))
+        if self._limpieza is None or self._limpieza.done():
+            self._limpieza = asyncio.create_task(self._limpiar_periodicamente())
+
+    async def _limpiar_periodicamente(self):
+        while True:
+            await asyncio.to_thread(self._eliminar_expirados)
+            await asyncio.sleep(self.limpieza_segundos)
+
+    async def encolar(self, spec: dict) -> dict:
+        """Registra el trabajo y lo deja en la cola; lanza ColaLlena si hay demasiados pendientes."""
+        self._asegurar_workers()
+        if self._cola.qsize() >= self.max_pendientes:
+            raise ColaLlena(f"Hay {self._cola.qsize()} reportes en cola; intente más tarde")
+        await asyncio.to_thread(self._eliminar_expirados)
+
+        ahora = datetime.now(LOCAL_TIMEZONE).isoformat()
+        trabajo = {
+            "id": uuid.uuid4().hex,
+            "estado": PENDIENTE,
+            "progreso": 0.0,
+            "etapa": "En cola",
+            "spec": spec,
+            "creado_en": ahora,
+            "iniciado_en": None,
+            "terminado_en": None,
+            "filas": None,
+            "error": None,
+        }
+        self._trabajos[trabajo["id"]] = trabajo
+        await asyncio.to_thread(self._escribir_estado, trabajo)
+        self._cola.put_nowait(trabajo["id"])
+        return dict(trabajo)
+
+    async def obtener(self, trabajo_id: str) -> Optional[dict]:
+        """Estado del trabajo (de este proceso o, si no, del disco); None si no existe o expiró."""
+        trabajo = self._trabajos.get(trabajo_id)
+        if trabajo is not None:
+            return dict(trabajo)
+        return await asyncio.to_thread(self._leer_estado, trabajo_id)
+
+    async def _worker(self):
+        while True:
+            trabajo_id = await self._cola.get()
+            try:
+                trabajo = self._trabajos.get(trabajo_id)
+                if trabajo is not None:
+                    await self._ejecutar(trabajo)
+            finally:
+                self._cola.task_done()
+
+    async def _ejecutar(self, trabajo: dict):
+        spec = trabajo["spec"]
+        reservado = 0.0
+        try:
+            fecha_inicio, fecha_fin = _fechas(spec)
+            personas = 1 if spec.get("personal_id") else await PersonalRepository.contar()
+            necesario = personas * ((fecha_fin - fecha_inicio).days + 1) * REPORTE_TRABAJOS_BYTES_POR_DIA / 1e6
+            if necesario > self.memoria_mb:
+                raise MemoryError(
+                    f"El reporte necesita unos {necesario:.0f} MB y el límite es {self.memoria_mb:.0f} MB; "
+                    "divida el periodo o filtre por persona"
+                )
+            await self._actualizar(trabajo, etapa="Esperando memoria")
+            await self._reservar(necesario)
+            reservado = necesario
+
+            trabajo["iniciado_en"] = datetime.now(LOCAL_TIMEZONE).isoformat()
+            await self._actualizar(trabajo, estado=EN_PROCESO, etapa="Iniciando")
+            progreso = lambda fraccion, etapa: self._actualizar(trabajo, progreso=fraccion, etapa=etapa)
+            if spec.get("mes"):
+                reporte = await ReporteService.generar_reporte_mensual(spec["mes"], spec["anio"], spec.get("personal_id"))
+            else:
+                reporte = await ReporteService.generar_reporte_periodo(fecha_inicio, fecha_fin, spec.get("personal_id"), progreso)
+
+            await self._actualizar(trabajo, progreso=0.95, etapa="Guardando")
+            await asyncio.to_thread(self._escribir_resultado, trabajo["id"], reporte)
+            trabajo["filas"] = len(reporte)
+            trabajo["terminado_en"] = datetime.now(LOCAL_TIMEZONE).isoformat()
+            self.completados += 1
+            await self._actualizar(trabajo, estado=COMPLETADO, progreso=1.0, etapa="Completado")
+        except Exception as e:
+            print(f"[REPORTES] Trabajo {trabajo['id']} falló: {e}")
+            trabajo["error"] = str(e)
+            trabajo["terminado_en"] = datetime.now(LOCAL_TIMEZONE).isoformat()
+            self.errores += 1
+            await self._actualizar(trabajo, estado=ERROR, etapa="Error")
+        finally:
+            if reservado:
+                await self._liberar(reservado)
+            # Ya está en disco: el proceso no guarda los trabajos terminados
+            self._trabajos.pop(trabajo["id"], None)
+            await asyncio.to_thread(self._eliminar_expirados)
+
+    async def _reservar(self, mb: float):
+        async with self._memoria:
+            await self._memoria.wait_for(lambda: self._memoria_en_uso + mb <= self.memoria_mb)
+            self._memoria_en_uso += mb
+
+    async def _liberar(self, mb: float):
+        async with self._memoria:
+            self._memoria_en_uso -= mb
+            self._memoria.notify_all()
+
+    async def _actualizar(self, trabajo: dict, **cambios):
+        trabajo.update(cambios)
+        trabajo["progreso"] = round(trabajo["progreso"], 3)
+        await asyncio.to_thread(self._escribir_estado, trabajo)
+
+    def _escribir_json(self, path: str, datos):
+        """Escritura atómica (archivo temporal + os.replace)."""
+        os.makedirs(self.directorio, exist_ok=True)
+        temporal = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(temporal, "w", encoding="utf-8") as f:
+            json.dump(datos, f, ensure_ascii=False)
+        os.replace(temporal, path)
+
+    def _escribir_estado(self, trabajo: dict):
+        try:
+            # Se copia al tomar el turno: si el estado cambió mientras esperaba, se escribe el último
+            with self._escritura:
+                self._escribir_json(self._archivo(trabajo["id"]), dict(trabajo))
+        except OSError as e:
+            # El trabajo sigue; solo otros workers no verán este avance
+            print(f"[REPORTES] No se pudo guardar el estado de {trabajo['id']}: {e}")
+
+    def _escribir_resultado(self, trabajo_id: str, reporte: list):
+        self._escribir_json(self.ruta_resultado(trabajo_id), [item.model_dump(mode="json") for item in reporte])
+
+    def _leer_estado(self, trabajo_id: str) -> Optional[dict]:
+        # El id viene de la URL: solo se aceptan los que genera encolar()
+        if len(trabajo_id) != 32 or any(c not in "0123456789abcdef" for c in trabajo_id):
+            return None
+        path = self._archivo(trabajo_id)
+        try:
+            if time.time() - os.path.getmtime(path) > self.expira_segundos:
+                for vencido in (path, self.ruta_resultado(trabajo_id)):
+                    try:
+                        os.remove(vencido)
+                    except OSError:
+                        pass
+                return None
+            with open(path, encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def _eliminar_expirados(self):
+        try:
+            nombres = os.listdir(self.directorio)
+        except OSError:
+            return
+        limite = time.time() - self.expira_segundos
+        for nombre in nombres:
+            path = os.path.join(self.directorio, nombre)
+            try:
+                if os.path.getmtime(path) < limite:
+                    os.remove(path)
+            except OSError:
+                pass
+
+    async def cerrar(self):
+        """Detiene los workers (al apagar la app); los trabajos sin terminar quedan en ERROR."""
+        interrumpidos = list(self._trabajos.values())
+        ahora = datetime.now(LOCAL_TIMEZONE).isoformat()
+        for trabajo in interrumpidos:
+            trabajo.update(
+                estado=ERROR, etapa="Interrumpido", terminado_en=ahora,
+                error="Trabajo interrumpido al detener el servidor",
+            )
+        self.errores += len(interrumpidos)
+
+        tareas = self._tareas + ([self._limpieza] if self._limpieza else [])
+        for tarea in tareas:
+            tarea.cancel()
+        await asyncio.gather(*tareas, return_exceptions=True)
+        self._tareas = []
+        self._limpieza = None
+        # Después de cancelar: ninguna escritura pendiente del worker puede pisar el ERROR
+        for trabajo in interrumpidos:
+            await asyncio.to_thread(self._escribir_estado, trabajo)
+
+    def estadisticas(self) -> dict:
+        return {
+            "workers": self.workers,
+            "pendientes": self._cola.qsize() if self._cola else 0,
+            "en_proceso": sum(1 for t in self._trabajos.values() if t["estado"] == EN_PROCESO),
+            "max_pendientes": self.max_pendientes,
+            "memoria_mb": self.memoria_mb,
+            "memoria_en_uso_mb": round(self._memoria_en_uso, 1),
+            "completados": self.completados,
+            "errores": self.errores,
+            "expira_segundos": self.expira_segundos,
+            "limpieza_segundos": self.limpieza_segundos,
+        }
+
+
+def _fechas(spec: dict) -> tuple[date, date]:
+    if spec.get("mes"):
+        anio, mes = spec["anio"], spec["mes"]
+        return date(anio, mes, 1), date(anio, mes, calendar.monthrange(anio, mes)[1])
+    return date.fromisoformat(spec["fecha_inicio"]), date.fromisoformat(spec["fecha_fin"])
+
+
+# Instancia única por proceso
+_cola_reportes = None
+
+def get_cola_reportes() -> ColaReportes:
+    global _cola_reportes
+
+    if _cola_reportes is None:
+        _cola_reportes = ColaReportes()
+
+    return _cola_reportes
@@ -0,0 +1,68 @@
+import base64
+import binascii
+import hashlib
+import io
+import logging
+
+logger = logging.getLogger(__name__)
+
+try:
+    from PIL import Image
+except ImportError:  # Sin Pillow se sirve la imagen original en lugar de la miniatura
+    Image = None
+
+# Firmas de los formatos que envía el frontend
+_FIRMAS = [
+    (b"\x89PNG\r\n\x1a\n", "image/png"),
+    (b"\xff\xd8\xff", "image/jpeg"),
+    (b"GIF8", "image/gif"),
+    (b"RIFF", "image/webp"),
+]
+
+
+def hash_foto(foto_base64: str) -> str:
+    """
+    Hash del contenido de la foto tal como se guarda en fotos_perfil.foto_base64.
+    Debe coincidir con el que calcula migrations/003_foto_hash.sql.
+    """
+    return hashlib.sha256(foto_base64.encode("utf-8")).hexdigest()[:16]
+
+
+def decodificar(foto_base64: str) -> tuple[bytes, str]:
+    """Bytes y media type de una foto en base64, con o sin prefijo data:image/...;base64,"""
+    media_type = None
+    datos = foto_base64.strip()
+    if datos.startswith("data:"):
+        cabecera, _, datos = datos.partition(",")
+        media_type = cabecera[5:].split(";")[0] or None
+    try:
+        contenido = base64.b64decode(datos)
+    except (binascii.Error, ValueError) as e:
+        raise ValueError("La foto de perfil no es base64 válido") from e
+
+    if media_type is None:
+        media_type = next((m for firma, m in _FIRMAS if contenido.startswith(firma)), "application/octet-stream")
+    return contenido, media_type
+
+
+def miniatura(contenido: bytes, media_type: str, tamano: int) -> tuple[bytes, str]:
+    """
+    Reduce la imagen para que su lado mayor sea `tamano` px. Las imágenes con
+    transparencia quedan en PNG y el resto en JPEG.
+    """
+    if Image is None:
+        logger.warning("Pillow no está instalado: se sirve la foto original en lugar de la miniatura")
+        return contenido, media_type
+
+    try:
+        with Image.open(io.BytesIO(contenido)) as imagen:
+            imagen.thumbnail((tamano, tamano))
+            salida = io.BytesIO()
+            if imagen.mode in ("RGBA", "LA", "P"):
+                imagen.save(salida, format="PNG", optimize=True)
+                return salida.getvalue(), "image/png"
+            imagen.convert("RGB").save(salida, format="JPEG", quality=85, optimize=True)
+            return salida.getvalue(), "image/jpeg"
+    except Exception as e:
+        logger.warning(f"No se pudo generar la miniatura: {e}")
+        return contenido, media_type
@@ -0,0 +1,111 @@
+"""
+Verifica que los repositorios no bloquean el event loop: varias consultas
+concurrentes deben solaparse en lugar de ejecutarse una tras otra.
+
+Por defecto levanta un PostgREST simulado en localhost que tarda DEMORA segundos
+en responder cada request, apunta SUPABASE_URL a él y compara:
+  - N consultas en secuencia  (~ N * DEMORA)
+  - N consultas con asyncio.gather (~ DEMORA si se solapan)
+Además cuenta cuántas veces avanza un "latido" de 10 ms mientras esperan: con
+un cliente bloqueante el latido se congela durante cada consulta.
+
+Uso:
+    python verify_concurrencia.py
+    python verify_concurrencia.py --real     # contra el Supabase configurado en .env
+"""
+import argparse
+import asyncio
+import os
+import socket
+import sys
+import threading
+import time
+
+CONSULTAS = 10
+DEMORA = 0.3
+
+
+def _puerto_libre() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def iniciar_postgrest_simulado(puerto: int):
+    import uvicorn
+    from fastapi import FastAPI
+
+    app = FastAPI()
+
+    @app.get("/rest/v1/{tabla}")
+    async def select(tabla: str):
+        await asyncio.sleep(DEMORA)
+        return []
+
+    server = uvicorn.Server(uvicorn.Config(app, host="127.0.0.1", port=puerto, log_level="warning"))
+    threading.Thread(target=server.run, daemon=True).start()
+    while not server.started:
+        time.sleep(0.05)
+    return server
+
+
+async def latido(contador: list, fin: asyncio.Event):
+    while not fin.is_set():
+        await asyncio.sleep(0.01)
+        contador[0] += 1
+
+
+async def medir(consulta, concurrente: bool):
+    contador, fin = [0], asyncio.Event()
+    tarea = asyncio.create_task(latido(contador, fin))
+    inicio = time.perf_counter()
+    if concurrente:
+        await asyncio.gather(*(consulta() for _ in range(CONSULTAS)))
+    else:
+        for _ in range(CONSULTAS):
+            await consulta()
+    total = time.perf_counter() - inicio
+    fin.set()
+    await tarea
+    return total, contador[0]
+
+
+async def main():
+    from repository.asistencia_repository import AsistenciaRepository
+    from datetime import date
+
+    async def consulta():
+        return await AsistenciaRepository.obtener_registros_del_dia("00000000-0000-0000-0000-000000000000", date.today())
+
+    await consulta()  # crea el cliente y abre la conexión
+
+    secuencial, latidos_sec = await medir(consulta, concurrente=False)
+    concurrente, latidos_conc = await medir(consulta, concurrente=True)
+
+    print(f"{CONSULTAS} consultas en secuencia:   {secuencial:.2f}s (latidos: {latidos_sec})")
+    print(f"{CONSULTAS} consultas concurrentes:  {concurrente:.2f}s (latidos: {latidos_conc})")
+
+    # Se solapan si el total concurrente se acerca a una sola consulta y no a la suma
+    solapadas = concurrente < secuencial / 3
+    # El event loop siguió atendiendo otras tareas mientras esperaba la red
+    loop_libre = latidos_sec >= secuencial / 0.01 * 0.5
+    print(f"Consultas solapadas: {'✓' if solapadas else '✗'}")
+    print(f"Event loop libre durante la espera: {'✓' if loop_libre else '✗'}")
+    return solapadas and loop_libre
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Verifica que el acceso a Supabase no bloquea el event loop")
+    parser.add_argument("--real", action="store_true", help="Usar el Supabase de .env en vez del simulado")
+    args = parser.parse_args()
+
+    if not args.real:
+        puerto = _puerto_libre()
+        iniciar_postgrest_simulado(puerto)
+        os.environ["SUPABASE_URL"] = f"http://127.0.0.1:{puerto}"
+        # El cliente solo valida el formato (JWT) de la clave
+        os.environ["SUPABASE_KEY"] = "eyJhbGciOiJIUzI1NiJ9.eyJyb2xlIjoiYW5vbiJ9.simulado"
+        print(f"PostgREST simulado en http://127.0.0.1:{puerto} (demora {DEMORA}s por request)")
+
+    ok = asyncio.run(main())
+    sys.exit(0 if ok else 1)
@@ -0,0 +1,148 @@
+"""
+Control de tamaño de respuestas: mide los bytes por fila de cada endpoint de
+lectura y de las consultas de repositorio que los alimentan (lo que viaja desde la
+BD), y verifica que ninguna incluya columnas sensibles o pesadas que no usan
+(password_hash, tokens de recuperación, codificacion_facial, fotos en base64).
+
+Usa la app en proceso (TestClient) con el backend configurado en .env
+(DB_BACKEND=supabase o postgres). Para una BD local con datos sintéticos ver
+benchmark_backends.py --preparar.
+
+Uso:
+    python verify_payload.py --guardar payload_base.json      # registrar la línea base
+    python verify_payload.py --comparar payload_base.json     # falla si algo crece más de --tolerancia
+"""
+import argparse
+import json
+import sys
+from datetime import date, timedelta
+
+from fastapi.testclient import TestClient
+
+# No deben viajar en ninguna respuesta ni en los embebidos de las consultas
+PROHIBIDAS = {"password_hash", "password_reset_token", "password_reset_expires_at", "codificacion_facial", "foto_base64"}
+
+
+def claves(valor, encontradas: set) -> set:
+    if isinstance(valor, dict):
+        for k, v in valor.items():
+            encontradas.add(k)
+            claves(v, encontradas)
+    elif isinstance(valor, list):
+        for v in valor:
+            claves(v, encontradas)
+    return encontradas
+
+
+def filas(valor) -> int:
+    if isinstance(valor, list):
+        return len(valor)
+    return 1 if valor else 0
+
+
+def medicion(nombre: str, datos, tamano: int) -> dict:
+    n = filas(datos)
+    return {
+        "nombre": nombre,
+        "filas": n,
+        "bytes": tamano,
+        "bytes_por_fila": round(tamano / n, 1) if n else 0.0,
+        "prohibidas": sorted(claves(datos, set()) & PROHIBIDAS),
+    }
+
+
+def medir_endpoints(client: TestClient, hoy: date, dias: int) -> list[dict]:
+    desde = hoy - timedelta(days=dias - 1)
+    personal = client.get("/personal/").json()
+    endpoints = [
+        ("/personal/", {}),
+        ("/asistencia/personal", {"fecha": hoy.isoformat()}),
+        ("/asistencia/historial", {"fecha_inicio": desde.isoformat(), "fecha_fin": hoy.isoformat()}),
+        ("/asistencia/recientes", {"limite": 20}),
+        ("/reportes/mensual", {"mes": hoy.month, "anio": hoy.year}),
+    ]
+    if personal:
+        endpoints.append((f"/personal/{personal[0]['id']}", {}))
+
+    resultados = []
+    for ruta, params in endpoints:
+        respuesta = client.get(ruta, params=params)
+        if respuesta.status_code != 200:
+            print(f"  {ruta}: HTTP {respuesta.status_code} {respuesta.text[:200]}")
+            continue
+        nombre = "/personal/{id}" if ruta.startswith("/personal/") and ruta != "/personal/" else ruta
+        resultados.append(medicion(f"GET {nombre}", respuesta.json(), len(respuesta.content)))
+    return resultados
+
+
+def medir_consultas(client: TestClient, hoy: date, dias: int) -> list[dict]:
+    from repository.asistencia_repository import AsistenciaRepository
+    from repository.personal_repository import PersonalRepository
+
+    desde = hoy - timedelta(days=dias - 1)
+    personal = client.portal.call(PersonalRepository.find_all) or []
+    ids = [p["id"] for p in personal]
+    consultas = [
+        ("AsistenciaRepository.obtener_registros_por_rango", lambda: AsistenciaRepository.obtener_registros_por_rango(desde, hoy)),
+        ("AsistenciaRepository.obtener_registros_por_rango(con_personal=False)",
+         lambda: AsistenciaRepository.obtener_registros_por_rango(desde, hoy, con_personal=False)),
+        ("AsistenciaRepository.obtener_historial", lambda: AsistenciaRepository.obtener_historial(fecha=hoy)),
+        ("AsistenciaRepository.obtener_recientes", lambda: AsistenciaRepository.obtener_recientes(20)),
+        ("PersonalRepository.find_all", PersonalRepository.find_all),
+        ("PersonalRepository.find_all(con_foto=True)", lambda: PersonalRepository.find_all(con_foto=True)),
+        ("PersonalRepository.find_by_ids", lambda: PersonalRepository.find_by_ids(ids)),
+    ]
+
+    resultados = []
+    for nombre, consulta in consultas:
+        datos = client.portal.call(consulta) or []
+        resultados.append(medicion(nombre, datos, len(json.dumps(datos, ensure_ascii=False).encode())))
+    return resultados
+
+
+def comparar(resultados: list[dict], path: str, tolerancia: float) -> list[str]:
+    """Mediciones cuyo tamaño por fila creció más que la tolerancia respecto de la línea base."""
+    with open(path, encoding="utf-8") as f:
+        base = {r["nombre"]: r for r in json.load(f)["resultados"]}
+    regresiones = []
+    for r in resultados:
+        anterior = base.get(r["nombre"])
+        if anterior and anterior["bytes_por_fila"] and r["bytes_por_fila"] > anterior["bytes_por_fila"] * (1 + tolerancia):
+            regresiones.append(
+                f"{r['nombre']}: {anterior['bytes_por_fila']} -> {r['bytes_por_fila']} bytes por fila"
+            )
+    return regresiones
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Control de tamaño de las respuestas por endpoint")
+    parser.add_argument("--dias", type=int, default=31, help="Días del rango del historial")
+    parser.add_argument("--guardar", help="Guardar las mediciones como línea base")
+    parser.add_argument("--comparar", help="Línea base para detectar regresiones")
+    parser.add_argument("--tolerancia", type=float, default=0.1, help="Aumento máximo de bytes por fila (0.1 = 10%%)")
+    args = parser.parse_args()
+
+    from main import app
+
+    hoy = date.today()
+    with TestClient(app) as client:
+        resultados = medir_endpoints(client, hoy, args.dias) + medir_consultas(client, hoy, args.dias)
+
+    fallas = []
+    for r in resultados:
+        print(f"  {r['nombre']:70s} filas={r['filas']:6d} bytes={r['bytes']:10d} por_fila={r['bytes_por_fila']:9.1f}")
+        if r["prohibidas"]:
+            fallas.append(f"{r['nombre']} incluye {', '.join(r['prohibidas'])}")
+
+    if args.guardar:
+        with open(args.guardar, "w", encoding="utf-8") as f:
+            json.dump({"fecha": hoy.isoformat(), "dias": args.dias, "resultados": resultados}, f, indent=2, ensure_ascii=False)
+        print(f"Línea base guardada en {args.guardar}")
+    if args.comparar:
+        fallas.extend(comparar(resultados, args.comparar, args.tolerancia))
+
+    for falla in fallas:
+        print(f"FALLA: {falla}")
+    if fallas:
+        sys.exit(1)
+    print("Tamaños de respuesta dentro de lo esperado")